@@ -7,9 +7,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import inspect, text
+from sqlalchemy import inspect, text, update
 from app.core.database import engine, SessionLocal, Base
+from app.core.sql import segundos_epoch
 from app.models import *  # Importar todos los modelos
+from app.models.paciente import Paciente, PacienteHospital, crear_indices_busqueda
+from app.core.texto import normalizar_texto
+from datetime import datetime
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +34,21 @@ def check_column_exists(engine, table_name, column_name):
     except Exception:
         return False
 
+def segundos_primera_respuesta(codigo):
+    """Segundos hasta el primer respondedor de un código registrado antes de la columna numérica"""
+    personal = codigo.personal_respondio or []
+    if isinstance(personal, str):
+        try:
+            personal = json.loads(personal)
+        except ValueError:
+            personal = []
+    fechas = [p["fecha_respuesta"] for p in personal if isinstance(p, dict) and p.get("fecha_respuesta")]
+    if fechas:
+        return int((datetime.fromisoformat(min(fechas)) - codigo.fecha_activacion).total_seconds())
+    if codigo.tiempo_respuesta and codigo.tiempo_respuesta.split()[0].isdigit():
+        return int(codigo.tiempo_respuesta.split()[0]) * 60
+    return None
+
 def actualizar_base_datos():
     """Actualizar la base de datos con los nuevos campos del workflow"""
     logger.info("🔄 Iniciando actualización de base de datos...")
@@ -44,6 +64,7 @@ def actualizar_base_datos():
         logger.info("📋 Actualizando tabla episodios...")
         
         nuevos_campos_episodios = [
+            ("prioridad_triaje", "INTEGER"),
             ("triaje_realizado_por", "VARCHAR(255)"),
             ("fecha_triaje", "DATETIME"),
             ("signos_vitales_triaje", "JSON"),
@@ -110,6 +131,120 @@ def actualizar_base_datos():
         except Exception as e:
             logger.warning(f"⚠️  Error actualizando estados: {e}")
         
+        # Rellenar prioridad numérica de triaje y su índice de listas
+        logger.info("🔢 Calculando prioridad_triaje desde color_triaje...")
+        try:
+            db.execute(text("""
+                UPDATE episodios
+                SET prioridad_triaje = CASE color_triaje
+                    WHEN 'ROJO' THEN 1
+                    WHEN 'NARANJA' THEN 2
+                    WHEN 'AMARILLO' THEN 3
+                    WHEN 'VERDE' THEN 4
+                    WHEN 'AZUL' THEN 5
+                    ELSE 6
+                END
+            """))
+            db.commit()
+            
+            # Reemplazado por ix_episodios_hospital_estado_prioridad_inicio (ordenaba por fecha_triaje)
+            db.execute(text("DROP INDEX IF EXISTS ix_episodios_hospital_estado_prioridad"))
+            db.commit()
+            for indice in Episodio.__table__.indexes:
+                indice.create(bind=engine, checkfirst=True)
+            
+            logger.info("✅ prioridad_triaje calculada e índices de episodios verificados")
+        except Exception as e:
+            logger.warning(f"⚠️  Error calculando prioridad_triaje: {e}")
+        
+        # Claves (fecha, id) de los listados paginados e índices compuestos de listados y tableros
+        logger.info("📑 Preparando paginación por keyset...")
+        try:
+            if not check_column_exists(engine, "pacientes_hospital", "fecha_creacion"):
+                db.execute(text("ALTER TABLE pacientes_hospital ADD COLUMN fecha_creacion DATETIME"))
+                logger.info("✅ Campo 'fecha_creacion' agregado a pacientes_hospital")
+            
+            db.execute(text("""
+                UPDATE pacientes_hospital
+                SET fecha_creacion = COALESCE(
+                    fecha_primera_atencion,
+                    (SELECT p.fecha_creacion FROM pacientes p WHERE p.id = pacientes_hospital.paciente_id),
+                    CURRENT_TIMESTAMP
+                )
+                WHERE fecha_creacion IS NULL
+            """))
+            db.commit()
+            
+            for modelo in (PacienteHospital, RegistroAdmision, CodigoEmergencia, ShockroomAlerta, ShockroomCama,
+                           ShockroomAsignacion, SignosVitales, RegistroEnfermeria):
+                for indice in modelo.__table__.indexes:
+                    indice.create(bind=engine, checkfirst=True)
+            
+            logger.info("✅ Índices de listados y tableros verificados")
+        except Exception as e:
+            logger.warning(f"⚠️  Error preparando paginación: {e}")
+        
+        # Tiempos de respuesta numéricos de los códigos de emergencia
+        logger.info("⏱️  Calculando tiempos de respuesta de códigos de emergencia...")
+        try:
+            for campo in ("segundos_primera_respuesta", "segundos_hasta_cierre"):
+                if not check_column_exists(engine, "codigos_emergencia", campo):
+                    db.execute(text(f"ALTER TABLE codigos_emergencia ADD COLUMN {campo} INTEGER"))
+                    logger.info(f"✅ Campo '{campo}' agregado a codigos_emergencia")
+            
+            db.execute(update(CodigoEmergencia).where(
+                CodigoEmergencia.fecha_cierre.isnot(None),
+                CodigoEmergencia.segundos_hasta_cierre.is_(None)
+            ).values(
+                segundos_hasta_cierre=segundos_epoch(CodigoEmergencia.fecha_cierre)
+                - segundos_epoch(CodigoEmergencia.fecha_activacion)
+            ))
+            
+            # La primera respuesta sale del JSON de personal (o del texto legado "N min")
+            pendientes = db.query(CodigoEmergencia).filter(
+                CodigoEmergencia.segundos_primera_respuesta.is_(None),
+                CodigoEmergencia.estado != "activo"
+            ).all()
+            for codigo in pendientes:
+                codigo.segundos_primera_respuesta = segundos_primera_respuesta(codigo)
+            db.commit()
+            
+            logger.info(f"✅ Tiempos de respuesta calculados ({len(pendientes)} códigos revisados)")
+        except Exception as e:
+            logger.warning(f"⚠️  Error calculando tiempos de respuesta: {e}")
+        
+        # Nombre normalizado e índices de búsqueda de pacientes
+        logger.info("🔎 Preparando búsqueda de pacientes...")
+        try:
+            if not check_column_exists(engine, "pacientes", "nombre_normalizado"):
+                db.execute(text("ALTER TABLE pacientes ADD COLUMN nombre_normalizado VARCHAR(255)"))
+                db.commit()
+                logger.info("✅ Campo 'nombre_normalizado' agregado a pacientes")
+            
+            # Por lotes para no cargar el registro completo en memoria
+            normalizados = 0
+            while True:
+                lote = db.query(Paciente.id, Paciente.nombre_completo).filter(
+                    Paciente.nombre_normalizado.is_(None)
+                ).limit(5000).all()
+                if not lote:
+                    break
+                db.execute(update(Paciente), [
+                    {"id": paciente_id, "nombre_normalizado": normalizar_texto(nombre)}
+                    for paciente_id, nombre in lote
+                ])
+                db.commit()
+                normalizados += len(lote)
+            
+            crear_indices_busqueda(db.connection())
+            db.commit()
+            for indice in Paciente.__table__.indexes:
+                indice.create(bind=engine, checkfirst=True)
+            
+            logger.info(f"✅ Índices de búsqueda verificados ({normalizados} nombres normalizados)")
+        except Exception as e:
+            logger.warning(f"⚠️  Error preparando búsqueda de pacientes: {e}")
+        
         # Verificar que las tablas de códigos de emergencia se crean
         if check_table_exists(engine, "codigos_emergencia"):
             logger.info("✅ Tabla codigos_emergencia creada")
@@ -161,7 +296,7 @@ def verificar_estructura():
         logger.info(f"📋 Tabla episodios tiene {len(columns)} columnas")
         
         campos_importantes = [
-            "estado", "color_triaje", "triaje_realizado_por", "decision_post_triaje",
+            "estado", "color_triaje", "prioridad_triaje", "triaje_realizado_por", "decision_post_triaje",
             "en_shockroom", "cama_shockroom", "decision_final", "prescripciones",
             "procedimientos", "estudios_solicitados", "evoluciones_medicas"
         ]
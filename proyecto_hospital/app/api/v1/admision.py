@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
 from app.core.database import get_db
-from app.api.v1.auth import get_hospital_id, get_current_user_token
+from app.core.paginacion import Paginacion
+from app.api.v1.auth import get_hospital_id, get_current_user_token, get_verified_token
 from app.schemas.admision import (
     RegistroAdmisionCreate, RegistroAdmisionUpdate, RegistroAdmisionResponse,
     RegistroAdmisionCompleto, PacienteAdmisionUpdate
@@ -65,10 +66,12 @@ async def crear_registro_admision(
 
 @router.get("/", response_model=List[RegistroAdmisionCompleto])
 async def obtener_registros_admision(
+    response: Response,
     estado: Optional[str] = None,
+    paginacion: Paginacion = Depends(),
     hospital_id: str = Depends(get_hospital_id),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener registros de admisión del hospital"""
     try:
@@ -92,7 +95,11 @@ async def obtener_registros_admision(
         if estado:
             query = query.filter(RegistroAdmision.estado_admision == estado)
         
-        resultados = query.order_by(RegistroAdmision.fecha_admision.desc()).all()
+        resultados = paginacion.pagina(
+            paginacion.keyset(query, RegistroAdmision.fecha_admision, RegistroAdmision.id).all(),
+            response,
+            lambda fila: (fila[0].fecha_admision, fila[0].id)
+        )
         
         # Construir respuesta
         registros = []
@@ -108,6 +115,8 @@ async def obtener_registros_admision(
         logger.debug(f"Encontrados {len(registros)} registros de admisión")
         return registros
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo registros de admisión: {e}", exc_info=True)
         raise HTTPException(
@@ -120,7 +129,7 @@ async def obtener_registro_admision(
     registro_id: str,
     hospital_id: str = Depends(get_hospital_id),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener un registro de admisión específico"""
     try:
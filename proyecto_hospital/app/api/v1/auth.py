@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import verify_token
 from app.schemas.auth import LoginRequest, Token, TokenData
 from app.services.auth_service import AuthService
+from app.services.eventos import evento_usuario
 
 router = APIRouter()
 security = HTTPBearer()
@@ -17,26 +19,74 @@ async def login(
     """Endpoint para autenticación de usuarios"""
     return AuthService.authenticate_user(db, login_data)
 
-async def get_current_user_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+def _build_auth_data(payload: dict, user=None) -> dict:
+    return {
+        "user": user,
+        "token_data": payload,
+        "username": payload.get("sub"),
+        "hospital_id": payload.get("hospital_id"),
+        "user_id": payload.get("user_id"),
+        "rol": payload.get("rol")
+    }
+
+async def get_verified_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
-    """Dependency para obtener el usuario actual desde el token"""
-    token = credentials.credentials
-    payload = verify_token(token)
+    """Dependency de firma: valida el JWT sin consultar la base de datos.
+    
+    Pensada para endpoints de lectura consultados con alta frecuencia
+    (listas, tableros). Los usuarios desactivados se rechazan con el conjunto
+    en memoria de AuthService (lo mantienen los eventos 'usuario' de todos
+    los workers); los endpoints de escritura además usan
+    get_current_user_token.
+    """
+    payload = verify_token(credentials.credentials)
     
-    if payload is None:
+    if payload is None or AuthService.esta_revocado(payload.get("user_id")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = AuthService.get_current_user(db, payload)
-    return {"user": user, "token_data": payload, "username": payload.get("sub")}
+    return _build_auth_data(payload)
+
+async def get_current_user_token(
+    token_auth: dict = Depends(get_verified_token),
+    db: Session = Depends(get_db)
+):
+    """Dependency para obtener el usuario actual desde el token
+    
+    La consulta (solo ante un fallo de caché) corre en el threadpool para no
+    bloquear el event loop de los routers async.
+    """
+    payload = token_auth["token_data"]
+    user = await run_in_threadpool(AuthService.get_current_user, db, payload)
+    return _build_auth_data(payload, user)
 
 async def get_hospital_id(
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Dependency para extraer el hospital_id del token"""
-    return auth_data["token_data"]["hospital_id"] 
\ No newline at end of file
+    return auth_data["token_data"]["hospital_id"] 
+
+@router.put("/usuarios/{usuario_id}/desactivar")
+async def desactivar_usuario(
+    usuario_id: str,
+    auth_data: dict = Depends(get_current_user_token),
+    db: Session = Depends(get_db)
+):
+    """Desactivar un usuario del hospital (solo administradores).
+
+    El usuario pierde el acceso de escritura en todos los workers apenas se
+    publica el evento, sin esperar a que venza AUTH_CACHE_TTL_SECONDS.
+    """
+    if auth_data["user"].rol != "administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un administrador puede desactivar usuarios"
+        )
+    
+    user = await run_in_threadpool(AuthService.desactivar_usuario, db, usuario_id, auth_data["hospital_id"])
+    await evento_usuario(user, "desactivado")
+    return {"message": "Usuario desactivado exitosamente", "usuario_id": usuario_id}
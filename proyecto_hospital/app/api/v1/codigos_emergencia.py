@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, case, desc, func, select
 from typing import List, Optional
 from datetime import datetime, timedelta
 import json
 
 from app.core.database import get_db
-from app.api.v1.auth import get_current_user_token
+from app.core.paginacion import Paginacion
+from app.api.v1.auth import get_current_user_token, get_verified_token
 from app.models.codigo_emergencia import CodigoEmergencia, EpisodioEmergencia
 from app.models.paciente import Paciente
 from app.models.hospital import Hospital
+from app.services.estadisticas import estadisticas
+from app.services.eventos import publicar_evento
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -46,6 +49,16 @@ class EpisodioEmergenciaCreate(BaseModel):
     codigo_emergencia_id: str
     paciente_id: Optional[str] = None
 
+# Percentiles de los tiempos de respuesta
+PERCENTILES = (("p50_segundos", 0.5), ("p90_segundos", 0.9))
+
+async def _evento_codigo(codigo: CodigoEmergencia, accion: str, **datos):
+    await publicar_evento(codigo.hospital_id, "codigo_emergencia", accion, codigo.id, {
+        "tipo_codigo": codigo.tipo_codigo,
+        "estado": codigo.estado,
+        **datos
+    })
+
 # ENDPOINTS PRINCIPALES
 
 @router.get("/tipos-codigo", response_model=List[dict])
@@ -107,8 +120,7 @@ async def activar_codigo_emergencia(
     # Calcular tiempo transcurrido
     tiempo_transcurrido = int((datetime.utcnow() - codigo.fecha_activacion).total_seconds() / 60)
     
-    # TODO: Enviar notificación WebSocket a todo el personal
-    # await websocket_manager.broadcast_codigo_emergencia(hospital_id, codigo)
+    await _evento_codigo(codigo, "activado", ubicacion=codigo.ubicacion, descripcion=codigo.descripcion)
     
     return CodigoEmergenciaResponse(
         id=codigo.id,
@@ -125,7 +137,7 @@ async def activar_codigo_emergencia(
 @router.get("/activos", response_model=List[CodigoEmergenciaResponse])
 async def get_codigos_activos(
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener códigos de emergencia activos"""
     hospital_id = auth_data["hospital_id"]
@@ -190,10 +202,11 @@ async def responder_codigo(
     # Si es la primera respuesta, actualizar estado
     if codigo.estado == "activo":
         codigo.estado = "atendido"
-        tiempo_primera_respuesta = int((datetime.utcnow() - codigo.fecha_activacion).total_seconds() / 60)
-        codigo.tiempo_respuesta = f"{tiempo_primera_respuesta} min"
+        codigo.segundos_primera_respuesta = int((datetime.utcnow() - codigo.fecha_activacion).total_seconds())
+        codigo.tiempo_respuesta = f"{codigo.segundos_primera_respuesta // 60} min"
     
     db.commit()
+    await _evento_codigo(codigo, "respondido", usuario=username)
     
     return {"message": "Respuesta registrada exitosamente"}
 
@@ -223,6 +236,7 @@ async def cerrar_codigo(
     # Actualizar código
     codigo.estado = "cerrado"
     codigo.fecha_cierre = datetime.utcnow()
+    codigo.segundos_hasta_cierre = int((codigo.fecha_cierre - codigo.fecha_activacion).total_seconds())
     if codigo_update.notas_evento:
         codigo.notas_evento = codigo_update.notas_evento
     if codigo_update.resultado:
@@ -239,25 +253,33 @@ async def cerrar_codigo(
         episodio.resultado_final = codigo_update.resultado
     
     db.commit()
+    await _evento_codigo(codigo, "cerrado", resultado=codigo.resultado)
     
     return {"message": "Código de emergencia cerrado exitosamente"}
 
 @router.get("/historial", response_model=List[CodigoEmergenciaResponse])
 async def get_historial_codigos(
+    response: Response,
     dias: int = 7,
+    paginacion: Paginacion = Depends(),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener historial de códigos de emergencia"""
     hospital_id = auth_data["hospital_id"]
     fecha_limite = datetime.utcnow() - timedelta(days=dias)
     
-    codigos = db.query(CodigoEmergencia).filter(
+    query = db.query(CodigoEmergencia).filter(
         and_(
             CodigoEmergencia.hospital_id == hospital_id,
             CodigoEmergencia.fecha_activacion >= fecha_limite
         )
-    ).order_by(desc(CodigoEmergencia.fecha_activacion)).all()
+    )
+    codigos = paginacion.pagina(
+        paginacion.keyset(query, CodigoEmergencia.fecha_activacion, CodigoEmergencia.id).all(),
+        response,
+        lambda codigo: (codigo.fecha_activacion, codigo.id)
+    )
     
     response = []
     for codigo in codigos:
@@ -324,42 +346,95 @@ async def asociar_paciente_codigo(
         episodio.paciente_id = paciente_id
     
     db.commit()
+    await _evento_codigo(codigo, "paciente_asociado", paciente_id=paciente_id)
     
     return {"message": "Paciente asociado al código exitosamente"}
 
+def _consulta_tiempos(filtros: list, columna, grupo=None):
+    """Cantidad, promedio y percentiles de `columna` (segundos), por `grupo` o en total.
+
+    Todo se calcula en la base de datos con funciones de ventana (portables
+    entre SQLite y PostgreSQL): cada valor recibe su posición dentro del grupo
+    y el percentil p es el menor valor cuya posición alcanza p * total
+    (método del rango más cercano). Sin `grupo` la consulta externa solo
+    selecciona agregados: PostgreSQL rechaza una columna sin GROUP BY.
+    """
+    particion = {"partition_by": grupo} if grupo is not None else {}
+    columnas_grupo = [grupo.label("grupo")] if grupo is not None else []
+    valores = select(
+        *columnas_grupo,
+        columna.label("valor"),
+        func.row_number().over(order_by=columna, **particion).label("posicion"),
+        func.count().over(**particion).label("total")
+    ).where(*filtros, columna.isnot(None)).subquery()
+    
+    query = select(
+        *([valores.c.grupo] if grupo is not None else []),
+        func.count().label("codigos"),
+        func.avg(valores.c.valor).label("promedio_segundos"),
+        *[
+            func.min(case((valores.c.posicion >= valores.c.total * fraccion, valores.c.valor))).label(nombre)
+            for nombre, fraccion in PERCENTILES
+        ]
+    )
+    if grupo is not None:
+        query = query.group_by(valores.c.grupo)
+    return query
+
+def _tiempos(db: Session, filtros: list, columna, grupo=None) -> dict:
+    """Resultado de _consulta_tiempos indexado por grupo (None sin agrupar)"""
+    resultado = {}
+    for fila in db.execute(_consulta_tiempos(filtros, columna, grupo)):
+        if not fila.codigos:
+            continue
+        datos = fila._asdict()
+        grupo_fila = datos.pop("grupo", None)
+        datos["promedio_segundos"] = round(float(datos["promedio_segundos"]), 1)
+        resultado[grupo_fila] = datos
+    return resultado
+
 @router.get("/estadisticas")
 async def get_estadisticas_codigos(
-    dias: int = 30,
+    dias: int = Query(30, ge=1, le=3660),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener estadísticas de códigos de emergencia"""
+    """Obtener estadísticas de códigos de emergencia (conteos y tiempos de respuesta en segundos)"""
     hospital_id = auth_data["hospital_id"]
     fecha_limite = datetime.utcnow() - timedelta(days=dias)
+    # Rango sobre ix_codigos_emergencia_hospital_activacion
+    filtros = [
+        CodigoEmergencia.hospital_id == hospital_id,
+        CodigoEmergencia.fecha_activacion >= fecha_limite
+    ]
     
-    # Códigos por tipo
-    codigos = db.query(CodigoEmergencia).filter(
-        and_(
-            CodigoEmergencia.hospital_id == hospital_id,
-            CodigoEmergencia.fecha_activacion >= fecha_limite
-        )
-    ).all()
-    
-    estadisticas = {
-        "total_codigos": len(codigos),
-        "codigos_por_tipo": {},
-        "tiempo_respuesta_promedio": 0,
-        "codigos_activos": 0
+    # Códigos por tipo en la ventana, agrupados en la base de datos
+    codigos_por_tipo = dict(db.execute(
+        select(CodigoEmergencia.tipo_codigo, func.count())
+        .where(*filtros)
+        .group_by(CodigoEmergencia.tipo_codigo)
+    ).all())
+    
+    respuesta = _tiempos(db, filtros, CodigoEmergencia.segundos_primera_respuesta).get(None)
+    cierre = _tiempos(db, filtros, CodigoEmergencia.segundos_hasta_cierre).get(None)
+    respuesta_por_tipo = _tiempos(db, filtros, CodigoEmergencia.segundos_primera_respuesta, CodigoEmergencia.tipo_codigo)
+    cierre_por_tipo = _tiempos(db, filtros, CodigoEmergencia.segundos_hasta_cierre, CodigoEmergencia.tipo_codigo)
+    
+    return {
+        "dias": dias,
+        "total_codigos": sum(codigos_por_tipo.values()),
+        "codigos_por_tipo": codigos_por_tipo,
+        # Minutos, como el campo legado tiempo_respuesta
+        "tiempo_respuesta_promedio": round(respuesta["promedio_segundos"] / 60, 1) if respuesta else 0,
+        "tiempo_primera_respuesta": respuesta,
+        "tiempo_hasta_cierre": cierre,
+        "tiempos_por_tipo": {
+            tipo: {
+                "primera_respuesta": respuesta_por_tipo.get(tipo),
+                "hasta_cierre": cierre_por_tipo.get(tipo)
+            }
+            for tipo in codigos_por_tipo
+        },
+        # Códigos abiertos ahora mismo (contadores en memoria)
+        "codigos_activos": estadisticas.snapshot(hospital_id)["codigos_activos"]
     }
-    
-    for codigo in codigos:
-        # Por tipo
-        if codigo.tipo_codigo not in estadisticas["codigos_por_tipo"]:
-            estadisticas["codigos_por_tipo"][codigo.tipo_codigo] = 0
-        estadisticas["codigos_por_tipo"][codigo.tipo_codigo] += 1
-        
-        # Activos
-        if codigo.estado in ["activo", "atendido"]:
-            estadisticas["codigos_activos"] += 1
-    
-    return estadisticas 
\ No newline at end of file
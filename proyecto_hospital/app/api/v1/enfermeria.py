@@ -1,31 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy import desc, func, select, insert, literal_column, Integer
 from typing import List, Optional
 import logging
+import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
-from app.api.v1.auth import get_hospital_id, get_current_user_token
+from app.core.database import get_async_db
+from app.core.fechas import utc_sin_zona
+from app.core.sql import segundos_epoch
+from app.api.v1.auth import get_hospital_id, get_current_user_token, get_verified_token
 from app.schemas.enfermeria import (
     SignosVitalesCreate, SignosVitalesUpdate, SignosVitalesResponse,
+    SignosVitalesLote, SignosVitalesLoteResponse, ResultadoSignosVitalesLote,
+    TendenciaSignosVitales, IntervaloSignosVitales, PuntoTendencia, ResumenSignoVital,
     RegistroEnfermeriaCreate, RegistroEnfermeriaUpdate, RegistroEnfermeriaResponse,
     VistaEnfermeriaCompleta
 )
 from app.models.enfermeria import SignosVitales, RegistroEnfermeria
 from app.models.paciente import Paciente
 from app.models.episodio import Episodio
+from app.services.tendencia import lttb, parsear_intervalo
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Signos numéricos que se grafican en las tendencias
+SIGNOS_TENDENCIA = [
+    "presion_arterial_sistolica", "presion_arterial_diastolica",
+    "frecuencia_cardiaca", "frecuencia_respiratoria",
+    "temperatura", "saturacion_oxigeno", "dolor_escala"
+]
+
+async def _episodio_del_hospital(db: AsyncSession, episodio_id: str, hospital_id: str):
+    """Id del episodio si pertenece al hospital, None si no"""
+    return await db.scalar(
+        select(Episodio.id).where(
+            Episodio.id == episodio_id,
+            Episodio.hospital_id == hospital_id
+        )
+    )
+
 # ==================== ENDPOINTS SIGNOS VITALES ====================
 
 @router.post("/signos-vitales", response_model=SignosVitalesResponse)
 async def registrar_signos_vitales(
     signos_data: SignosVitalesCreate,
     hospital_id: str = Depends(get_hospital_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Registrar signos vitales para un episodio"""
@@ -33,10 +57,7 @@ async def registrar_signos_vitales(
         logger.debug(f"Registrando signos vitales para episodio: {signos_data.episodio_id}")
         
         # Verificar que el episodio pertenece al hospital
-        episodio = db.query(Episodio).filter(
-            Episodio.id == signos_data.episodio_id,
-            Episodio.hospital_id == hospital_id
-        ).first()
+        episodio = await _episodio_del_hospital(db, signos_data.episodio_id, hospital_id)
         
         if not episodio:
             raise HTTPException(
@@ -52,8 +73,8 @@ async def registrar_signos_vitales(
         )
         
         db.add(signos_vitales)
-        db.commit()
-        db.refresh(signos_vitales)
+        await db.commit()
+        await db.refresh(signos_vitales)
         
         logger.info(f"Signos vitales registrados exitosamente: {signos_vitales.id}")
         return signos_vitales
@@ -62,7 +83,80 @@ async def registrar_signos_vitales(
         raise
     except Exception as e:
         logger.error(f"Error registrando signos vitales: {e}", exc_info=True)
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al registrar signos vitales: {str(e)}"
+        )
+
+@router.post("/signos-vitales/bulk", response_model=SignosVitalesLoteResponse)
+async def registrar_signos_vitales_lote(
+    lote: SignosVitalesLote,
+    hospital_id: str = Depends(get_hospital_id),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_current_user_token)
+):
+    """Registrar muchos signos vitales (de uno o varios episodios) en una transacción
+    
+    La pertenencia de todos los episodios al hospital se verifica con una
+    sola consulta IN y las filas válidas se insertan con un executemany.
+    Los registros de episodios ajenos o inexistentes se informan como
+    rechazados en su posición, sin impedir el resto.
+    """
+    try:
+        episodio_ids = {registro.episodio_id for registro in lote.registros}
+        episodios_validos = set(await db.scalars(
+            select(Episodio.id).where(
+                Episodio.id.in_(episodio_ids),
+                Episodio.hospital_id == hospital_id
+            )
+        ))
+        
+        ahora = datetime.utcnow()
+        usuario = auth_data.get("username", "Enfermero/a")
+        filas = []
+        resultados = []
+        for indice, registro in enumerate(lote.registros):
+            if registro.episodio_id not in episodios_validos:
+                resultados.append(ResultadoSignosVitalesLote(
+                    indice=indice,
+                    episodio_id=registro.episodio_id,
+                    creado=False,
+                    error="Episodio no encontrado en este hospital"
+                ))
+                continue
+            
+            fecha = utc_sin_zona(registro.fecha_hora_registro) or ahora
+            
+            fila = {
+                **registro.dict(exclude={"fecha_hora_registro"}),
+                "id": str(uuid.uuid4()),
+                "hospital_id": hospital_id,
+                "fecha_hora_registro": fecha,
+                "usuario_registro": usuario
+            }
+            filas.append(fila)
+            resultados.append(ResultadoSignosVitalesLote(
+                indice=indice,
+                episodio_id=registro.episodio_id,
+                creado=True,
+                id=fila["id"]
+            ))
+        
+        if filas:
+            await db.execute(insert(SignosVitales), filas)
+            await db.commit()
+        
+        logger.info(f"Lote de signos vitales: {len(filas)} registrados, {len(resultados) - len(filas)} rechazados")
+        return SignosVitalesLoteResponse(
+            creados=len(filas),
+            rechazados=len(resultados) - len(filas),
+            resultados=resultados
+        )
+        
+    except Exception as e:
+        logger.error(f"Error registrando lote de signos vitales: {e}", exc_info=True)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al registrar signos vitales: {str(e)}"
@@ -72,16 +166,13 @@ async def registrar_signos_vitales(
 async def obtener_signos_vitales_episodio(
     episodio_id: str,
     hospital_id: str = Depends(get_hospital_id),
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener todos los signos vitales de un episodio"""
     try:
         # Verificar que el episodio pertenece al hospital
-        episodio = db.query(Episodio).filter(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        ).first()
+        episodio = await _episodio_del_hospital(db, episodio_id, hospital_id)
         
         if not episodio:
             raise HTTPException(
@@ -89,10 +180,12 @@ async def obtener_signos_vitales_episodio(
                 detail="Episodio no encontrado en este hospital"
             )
         
-        signos_vitales = db.query(SignosVitales).filter(
-            SignosVitales.episodio_id == episodio_id,
-            SignosVitales.hospital_id == hospital_id
-        ).order_by(desc(SignosVitales.fecha_hora_registro)).all()
+        signos_vitales = (await db.scalars(
+            select(SignosVitales).where(
+                SignosVitales.episodio_id == episodio_id,
+                SignosVitales.hospital_id == hospital_id
+            ).order_by(desc(SignosVitales.fecha_hora_registro))
+        )).all()
         
         return signos_vitales
         
@@ -105,13 +198,119 @@ async def obtener_signos_vitales_episodio(
             detail=f"Error al obtener signos vitales: {str(e)}"
         )
 
+@router.get("/signos-vitales/episodio/{episodio_id}/tendencia", response_model=TendenciaSignosVitales)
+async def obtener_tendencia_signos_vitales(
+    episodio_id: str,
+    bucket: str = Query("5m", description="Ancho del intervalo: 30s, 5m, 1h, 1d"),
+    desde: Optional[datetime] = Query(None, alias="from"),
+    hasta: Optional[datetime] = Query(None, alias="to"),
+    modo: str = Query("agregado", pattern="^(agregado|lttb)$"),
+    puntos: int = Query(200, ge=3, le=5000, description="Puntos por serie en modo lttb"),
+    hospital_id: str = Depends(get_hospital_id),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Tendencia de signos vitales de un episodio para gráficos
+    
+    - modo=agregado: min/max/promedio de cada signo por intervalo de `bucket`,
+      calculado en la base de datos (un punto por intervalo con datos).
+    - modo=lttb: cada signo submuestreado a `puntos` lecturas reales con
+      Largest-Triangle-Three-Buckets, que conserva picos y valles.
+    """
+    try:
+        episodio = await _episodio_del_hospital(db, episodio_id, hospital_id)
+        
+        if not episodio:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Episodio no encontrado en este hospital"
+            )
+        
+        desde = utc_sin_zona(desde)
+        hasta = utc_sin_zona(hasta)
+        condiciones = [
+            SignosVitales.episodio_id == episodio_id,
+            SignosVitales.hospital_id == hospital_id
+        ]
+        if desde:
+            condiciones.append(SignosVitales.fecha_hora_registro >= desde)
+        if hasta:
+            condiciones.append(SignosVitales.fecha_hora_registro <= hasta)
+        
+        tendencia = TendenciaSignosVitales(episodio_id=episodio_id, modo=modo, desde=desde, hasta=hasta)
+        
+        if modo == "lttb":
+            filas = (await db.execute(
+                select(
+                    SignosVitales.fecha_hora_registro,
+                    *(getattr(SignosVitales, campo) for campo in SIGNOS_TENDENCIA)
+                ).where(*condiciones).order_by(SignosVitales.fecha_hora_registro)
+            )).all()
+            
+            tendencia.puntos = puntos
+            for posicion, campo in enumerate(SIGNOS_TENDENCIA, start=1):
+                serie = [
+                    (fila[0].timestamp(), float(fila[posicion]), fila[0])
+                    for fila in filas if fila[posicion] is not None
+                ]
+                if serie:
+                    tendencia.series[campo] = [
+                        PuntoTendencia(timestamp=fecha, valor=valor)
+                        for _, valor, fecha in lttb(serie, puntos)
+                    ]
+            return tendencia
+        
+        bucket_segundos = parsear_intervalo(bucket)
+        if bucket_segundos is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="bucket inválido: use un número seguido de s, m, h o d (p. ej. 5m)"
+            )
+        tendencia.bucket_segundos = bucket_segundos
+        
+        # El intervalo va literal para que SELECT y GROUP BY sean la misma expresión en PostgreSQL
+        grupo = (
+            segundos_epoch(SignosVitales.fecha_hora_registro) // literal_column(str(bucket_segundos), Integer)
+        ).label("grupo")
+        columnas = [grupo, func.count().label("registros")]
+        for campo in SIGNOS_TENDENCIA:
+            columna = getattr(SignosVitales, campo)
+            columnas += [func.min(columna), func.max(columna), func.avg(columna)]
+        
+        filas = await db.execute(
+            select(*columnas).where(*condiciones).group_by(grupo).order_by(grupo)
+        )
+        for fila in filas:
+            valores = {}
+            for posicion, campo in enumerate(SIGNOS_TENDENCIA):
+                minimo, maximo, promedio = fila[2 + posicion * 3:5 + posicion * 3]
+                if promedio is not None:
+                    valores[campo] = ResumenSignoVital(
+                        min=minimo, max=maximo, promedio=round(float(promedio), 2)
+                    )
+            tendencia.intervalos.append(IntervaloSignosVitales(
+                timestamp=datetime.utcfromtimestamp(fila.grupo * bucket_segundos),
+                registros=fila.registros,
+                valores=valores
+            ))
+        return tendencia
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo tendencia de signos vitales: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener tendencia de signos vitales: {str(e)}"
+        )
+
 # ==================== ENDPOINTS REGISTROS ENFERMERÍA ====================
 
 @router.post("/registros", response_model=RegistroEnfermeriaResponse)
 async def crear_registro_enfermeria(
     registro_data: RegistroEnfermeriaCreate,
     hospital_id: str = Depends(get_hospital_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear un nuevo registro de enfermería"""
@@ -119,10 +318,7 @@ async def crear_registro_enfermeria(
         logger.debug(f"Creando registro de enfermería para episodio: {registro_data.episodio_id}")
         
         # Verificar que el episodio pertenece al hospital
-        episodio = db.query(Episodio).filter(
-            Episodio.id == registro_data.episodio_id,
-            Episodio.hospital_id == hospital_id
-        ).first()
+        episodio = await _episodio_del_hospital(db, registro_data.episodio_id, hospital_id)
         
         if not episodio:
             raise HTTPException(
@@ -138,8 +334,8 @@ async def crear_registro_enfermeria(
         )
         
         db.add(registro)
-        db.commit()
-        db.refresh(registro)
+        await db.commit()
+        await db.refresh(registro)
         
         logger.info(f"Registro de enfermería creado exitosamente: {registro.id}")
         return registro
@@ -148,7 +344,7 @@ async def crear_registro_enfermeria(
         raise
     except Exception as e:
         logger.error(f"Error creando registro de enfermería: {e}", exc_info=True)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear registro de enfermería: {str(e)}"
@@ -159,16 +355,13 @@ async def obtener_registros_enfermeria_episodio(
     episodio_id: str,
     tipo_registro: Optional[str] = Query(None, description="Filtrar por tipo de registro"),
     hospital_id: str = Depends(get_hospital_id),
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener registros de enfermería de un episodio"""
     try:
         # Verificar que el episodio pertenece al hospital
-        episodio = db.query(Episodio).filter(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        ).first()
+        episodio = await _episodio_del_hospital(db, episodio_id, hospital_id)
         
         if not episodio:
             raise HTTPException(
@@ -176,15 +369,17 @@ async def obtener_registros_enfermeria_episodio(
                 detail="Episodio no encontrado en este hospital"
             )
         
-        query = db.query(RegistroEnfermeria).filter(
+        query = select(RegistroEnfermeria).where(
             RegistroEnfermeria.episodio_id == episodio_id,
             RegistroEnfermeria.hospital_id == hospital_id
         )
         
         if tipo_registro:
-            query = query.filter(RegistroEnfermeria.tipo_registro == tipo_registro)
+            query = query.where(RegistroEnfermeria.tipo_registro == tipo_registro)
         
-        registros = query.order_by(desc(RegistroEnfermeria.fecha_hora_registro)).all()
+        registros = (await db.scalars(
+            query.order_by(desc(RegistroEnfermeria.fecha_hora_registro))
+        )).all()
         
         return registros
         
@@ -203,48 +398,94 @@ async def obtener_registros_enfermeria_episodio(
 async def obtener_dashboard_enfermeria(
     estado_episodio: str = Query("activo", description="Estado de los episodios"),
     hospital_id: str = Depends(get_hospital_id),
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener vista completa para el dashboard de enfermería"""
+    """Obtener vista completa para el dashboard de enfermería
+    
+    Usa tres consultas fijas (episodios, últimos signos vitales y registros
+    recientes) en lugar de dos consultas por episodio.
+    """
     try:
         logger.debug(f"Obteniendo dashboard de enfermería - hospital: {hospital_id}")
         
         # Obtener episodios activos con información del paciente
-        episodios = db.query(
-            Episodio.id.label('episodio_id'),
-            Paciente.nombre_completo.label('paciente_nombre'),
-            Paciente.dni.label('paciente_dni'),
-            Episodio.numero_episodio_local.label('habitacion')
-        ).join(
-            Paciente, Episodio.paciente_id == Paciente.id
-        ).filter(
+        episodios = (await db.execute(
+            select(
+                Episodio.id.label('episodio_id'),
+                Paciente.nombre_completo.label('paciente_nombre'),
+                Paciente.dni.label('paciente_dni'),
+                Episodio.numero_episodio_local.label('habitacion')
+            ).join(
+                Paciente, Episodio.paciente_id == Paciente.id
+            ).where(
+                Episodio.hospital_id == hospital_id,
+                Episodio.estado == estado_episodio
+            )
+        )).all()
+        
+        if not episodios:
+            return []
+        
+        episodio_ids = select(Episodio.id).where(
             Episodio.hospital_id == hospital_id,
             Episodio.estado == estado_episodio
-        ).all()
+        )
+        
+        # Últimos signos vitales por episodio (ROW_NUMBER() = 1)
+        signos_rankeados = select(
+            SignosVitales,
+            func.row_number().over(
+                partition_by=SignosVitales.episodio_id,
+                order_by=desc(SignosVitales.fecha_hora_registro)
+            ).label('rn')
+        ).where(
+            SignosVitales.hospital_id == hospital_id,
+            SignosVitales.episodio_id.in_(episodio_ids)
+        ).subquery()
+        ultimos_signos = aliased(SignosVitales, signos_rankeados)
+        
+        signos_por_episodio = {
+            signos.episodio_id: signos
+            for signos in await db.scalars(
+                select(ultimos_signos).where(signos_rankeados.c.rn == 1)
+            )
+        }
+        
+        # Registros recientes (últimas 24 horas, máximo 5 por episodio)
+        hace_24h = datetime.utcnow() - timedelta(hours=24)
+        registros_rankeados = select(
+            RegistroEnfermeria,
+            func.row_number().over(
+                partition_by=RegistroEnfermeria.episodio_id,
+                order_by=desc(RegistroEnfermeria.fecha_hora_registro)
+            ).label('rn')
+        ).where(
+            RegistroEnfermeria.hospital_id == hospital_id,
+            RegistroEnfermeria.episodio_id.in_(episodio_ids),
+            RegistroEnfermeria.fecha_hora_registro >= hace_24h
+        ).subquery()
+        registros_recientes_q = aliased(RegistroEnfermeria, registros_rankeados)
+        
+        registros_por_episodio = defaultdict(list)
+        for registro in await db.scalars(
+            select(registros_recientes_q).where(
+                registros_rankeados.c.rn <= 5
+            ).order_by(desc(registros_rankeados.c.fecha_hora_registro))
+        ):
+            registros_por_episodio[registro.episodio_id].append(registro)
         
         dashboard_data = []
+        ahora = datetime.utcnow()
         
         for episodio in episodios:
-            # Obtener últimos signos vitales
-            ultimo_signos = db.query(SignosVitales).filter(
-                SignosVitales.episodio_id == episodio.episodio_id,
-                SignosVitales.hospital_id == hospital_id
-            ).order_by(desc(SignosVitales.fecha_hora_registro)).first()
-            
-            # Obtener registros recientes (últimas 24 horas)
-            hace_24h = datetime.utcnow() - timedelta(hours=24)
-            registros_recientes = db.query(RegistroEnfermeria).filter(
-                RegistroEnfermeria.episodio_id == episodio.episodio_id,
-                RegistroEnfermeria.hospital_id == hospital_id,
-                RegistroEnfermeria.fecha_hora_registro >= hace_24h
-            ).order_by(desc(RegistroEnfermeria.fecha_hora_registro)).limit(5).all()
+            registros_recientes = registros_por_episodio.get(episodio.episodio_id, [])
             
             # Calcular tiempo desde último registro
             tiempo_ultimo_registro = None
             if registros_recientes:
                 ultimo_registro = registros_recientes[0]
-                delta = datetime.utcnow() - ultimo_registro.fecha_hora_registro
+                delta = ahora - ultimo_registro.fecha_hora_registro
                 tiempo_ultimo_registro = int(delta.total_seconds() / 60)  # minutos
             
             dashboard_item = VistaEnfermeriaCompleta(
@@ -252,7 +493,7 @@ async def obtener_dashboard_enfermeria(
                 paciente_nombre=episodio.paciente_nombre,
                 paciente_dni=episodio.paciente_dni,
                 habitacion=episodio.habitacion,
-                ultimo_signos_vitales=ultimo_signos,
+                ultimo_signos_vitales=signos_por_episodio.get(episodio.episodio_id),
                 registros_recientes=registros_recientes,
                 tiempo_desde_ultimo_registro=tiempo_ultimo_registro
             )
@@ -267,4 +508,4 @@ async def obtener_dashboard_enfermeria(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener dashboard de enfermería: {str(e)}"
-        ) 
\ No newline at end of file
+        )
\ No newline at end of file
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, desc, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, or_, exists, inspect, select, update
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 import json
 import logging
 
-from app.core.database import get_db
-from app.api.v1.auth import get_hospital_id, get_current_user_token
+from app.core.database import get_async_db
+from app.core.paginacion import Paginacion
+from app.api.v1.auth import get_hospital_id, get_current_user_token, get_verified_token
 from app.models.episodio import Episodio
 from app.models.paciente import Paciente
 from app.models.shockroom import ShockroomCama, ShockroomAsignacion
+from app.services.cola_triaje import cola_triaje
+from app.services.eventos import evento_cama, evento_episodio, publicar_evento
+from app.models.atencion_medica import (
+    Prescripcion, Procedimiento, EstudioSolicitado, EvolucionMedica, IndicacionMonitoreo
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -89,54 +96,102 @@ class DecisionFinalRequest(BaseModel):
     area_internacion: Optional[str] = None
     motivo_continuacion: Optional[str] = None
 
+class PrescripcionResponse(PrescripcionCreate):
+    id: str
+    episodio_id: str
+    estado: str
+    prescrito_por: Optional[str] = None
+    fecha_prescripcion: datetime
+    administrado: bool = False
+    
+    class Config:
+        from_attributes = True
+
+class ProcedimientoResponse(ProcedimientoCreate):
+    id: str
+    episodio_id: str
+    estado: str
+    indicado_por: Optional[str] = None
+    fecha_indicacion: datetime
+    completado: bool = False
+    
+    class Config:
+        from_attributes = True
+
+class EstudioResponse(EstudioCreate):
+    id: str
+    episodio_id: str
+    estado: str
+    solicitado_por: Optional[str] = None
+    fecha_solicitud: datetime
+    completado: bool = False
+    
+    class Config:
+        from_attributes = True
+
+class EvolucionMedicaResponse(EvolucionMedicaCreate):
+    id: str
+    episodio_id: str
+    medico: Optional[str] = None
+    fecha: datetime
+    
+    class Config:
+        from_attributes = True
+
+class IndicacionMonitoreoResponse(IndicacionMonitoreoCreate):
+    id: str
+    episodio_id: str
+    estado: str
+    indicado_por: Optional[str] = None
+    fecha_indicacion: datetime
+    
+    class Config:
+        from_attributes = True
+
 # ENDPOINTS PRINCIPALES DEL WORKFLOW
 
+def _pagina_cola(hospital_id: str, estado: str, paginacion: Paginacion, response: Response):
+    """Página de una cola en memoria; el cursor es la clave (prioridad, fecha_inicio, id)"""
+    episodios = cola_triaje.listar(
+        hospital_id,
+        estado,
+        despues_de=paginacion.clave(int, datetime, str),
+        limite=paginacion.limit + 1
+    )
+    return paginacion.pagina(episodios, response, cola_triaje.clave)
+
 @router.get("/espera-triaje", response_model=List[EpisodioResponse])
 async def get_episodios_espera_triaje(
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    response: Response,
+    paginacion: Paginacion = Depends(),
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener episodios en espera de triaje (para enfermería)"""
-    hospital_id = auth_data["hospital_id"]
+    """Obtener episodios en espera de triaje (para enfermería)
     
-    episodios = db.query(Episodio).options(
-        joinedload(Episodio.paciente)
-    ).filter(
-        and_(
-            Episodio.hospital_id == hospital_id,
-            Episodio.estado == "espera_triaje"
-        )
-    ).order_by(Episodio.fecha_inicio).all()
+    Se sirve desde la cola en memoria (app/services/cola_triaje.py).
+    """
+    hospital_id = auth_data["hospital_id"]
     
-    return episodios
+    return _pagina_cola(hospital_id, "espera_triaje", paginacion, response)
 
 @router.get("/lista-medica", response_model=List[EpisodioResponse])
 async def get_episodios_lista_medica(
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    response: Response,
+    paginacion: Paginacion = Depends(),
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener episodios en lista médica (para médicos)"""
-    hospital_id = auth_data["hospital_id"]
+    """Obtener episodios en lista médica (para médicos)
     
-    episodios = db.query(Episodio).options(
-        joinedload(Episodio.paciente)
-    ).filter(
-        and_(
-            Episodio.hospital_id == hospital_id,
-            Episodio.estado == "en_lista_medica"
-        )
-    ).order_by(
-        # Ordenar por prioridad de triaje
-        Episodio.color_triaje.desc(),
-        Episodio.fecha_triaje
-    ).all()
+    Ordenados por prioridad de triaje y hora de llegada, desde la cola en memoria.
+    """
+    hospital_id = auth_data["hospital_id"]
     
-    return episodios
+    return _pagina_cola(hospital_id, "en_lista_medica", paginacion, response)
 
 @router.post("/", response_model=EpisodioResponse)
 async def create_episodio(
     episodio_data: EpisodioCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear nuevo episodio (después de admisión)"""
@@ -144,7 +199,7 @@ async def create_episodio(
     username = auth_data["username"]
     
     # Verificar que el paciente existe
-    paciente = db.query(Paciente).filter(Paciente.id == episodio_data.paciente_id).first()
+    paciente = await db.get(Paciente, episodio_data.paciente_id)
     if not paciente:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -164,8 +219,11 @@ async def create_episodio(
     )
     
     db.add(episodio)
-    db.commit()
-    db.refresh(episodio)
+    await db.commit()
+    await db.refresh(episodio)
+    
+    cola_triaje.actualizar(episodio, paciente)
+    await evento_episodio(episodio, "creado")
     
     return episodio
 
@@ -173,20 +231,20 @@ async def create_episodio(
 async def asignar_triaje(
     episodio_id: str,
     triaje_data: TriajeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Asignar triaje a un episodio (enfermería)"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
+    episodio = await db.scalar(select(Episodio).where(
         and_(
             Episodio.id == episodio_id,
             Episodio.hospital_id == hospital_id,
             Episodio.estado == "espera_triaje"
         )
-    ).first()
+    ))
     
     if not episodio:
         raise HTTPException(
@@ -210,7 +268,9 @@ async def asignar_triaje(
     episodio.evaluacion_enfermeria = triaje_data.evaluacion_enfermeria
     episodio.modificado_por = username
     
-    db.commit()
+    await db.commit()
+    await cola_triaje.actualizar_async(db, episodio)
+    await evento_episodio(episodio, "triaje")
     
     return {"message": "Triaje asignado exitosamente"}
 
@@ -218,20 +278,20 @@ async def asignar_triaje(
 async def tomar_decision_post_triaje(
     episodio_id: str,
     decision_data: DecisionPostTriajeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Tomar decisión después del triaje (enfermería)"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
+    episodio = await db.scalar(select(Episodio).where(
         and_(
             Episodio.id == episodio_id,
             Episodio.hospital_id == hospital_id,
             Episodio.color_triaje.isnot(None)  # Debe tener triaje asignado
         )
-    ).first()
+    ))
     
     if not episodio:
         raise HTTPException(
@@ -248,6 +308,7 @@ async def tomar_decision_post_triaje(
         )
     
     # Procesar según la decisión
+    cama = None
     if decision_data.decision == "lista_medica":
         episodio.estado = "en_lista_medica"
         episodio.decision_post_triaje = "lista_medica"
@@ -265,13 +326,13 @@ async def tomar_decision_post_triaje(
             )
         
         # Verificar que la cama esté disponible
-        cama = db.query(ShockroomCama).filter(
+        cama = await db.scalar(select(ShockroomCama).where(
             and_(
                 ShockroomCama.hospital_id == hospital_id,
                 ShockroomCama.numero_cama == decision_data.cama_shockroom,
                 ShockroomCama.estado == "disponible"
             )
-        ).first()
+        ))
         
         if not cama:
             raise HTTPException(
@@ -302,29 +363,31 @@ async def tomar_decision_post_triaje(
     episodio.fecha_decision = datetime.utcnow()
     episodio.modificado_por = username
     
-    db.commit()
-    
-    # TODO: Enviar notificación al médico si es shockroom
+    await db.commit()
+    await cola_triaje.actualizar_async(db, episodio)
+    await evento_episodio(episodio, "decision_post_triaje")
+    if cama is not None:
+        await evento_cama(cama, "ocupada", episodio_id=episodio.id)
     
     return {"message": f"Decisión '{decision_data.decision}' aplicada exitosamente"}
 
 @router.put("/{episodio_id}/tomar-paciente")
 async def tomar_paciente(
     episodio_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Médico toma un paciente de la lista médica"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
+    episodio = await db.scalar(select(Episodio).where(
         and_(
             Episodio.id == episodio_id,
             Episodio.hospital_id == hospital_id,
             Episodio.estado == "en_lista_medica"
         )
-    ).first()
+    ))
     
     if not episodio:
         raise HTTPException(
@@ -338,252 +401,287 @@ async def tomar_paciente(
     episodio.fecha_inicio_atencion = datetime.utcnow()
     episodio.modificado_por = username
     
-    db.commit()
+    await db.commit()
+    await cola_triaje.actualizar_async(db, episodio)
+    await evento_episodio(episodio, "tomado")
     
     return {"message": "Paciente tomado exitosamente"}
 
+# Columnas JSON legadas de Episodio que ya no se escriben: el detalle del
+# episodio sirve esas claves desde las tablas de atencion_medica.
+_ATENCION_MEDICA = (
+    ("prescripciones", Prescripcion, PrescripcionResponse, Prescripcion.fecha_prescripcion),
+    ("procedimientos", Procedimiento, ProcedimientoResponse, Procedimiento.fecha_indicacion),
+    ("estudios_solicitados", EstudioSolicitado, EstudioResponse, EstudioSolicitado.fecha_solicitud),
+    ("evoluciones_medicas", EvolucionMedica, EvolucionMedicaResponse, EvolucionMedica.fecha),
+    ("indicaciones_monitoreo", IndicacionMonitoreo, IndicacionMonitoreoResponse, IndicacionMonitoreo.fecha_indicacion),
+)
+
 # ENDPOINTS PARA ATENCIÓN MÉDICA
 
+async def _registrar_modificacion(db: AsyncSession, episodio_id: str, hospital_id: str, username: str):
+    """Verificar que el episodio pertenece al hospital y dejar la traza de última modificación.
+
+    Un UPDATE sin cargar la fila; queda en la misma transacción que el alta
+    del ítem de atención médica.
+    """
+    resultado = await db.execute(
+        update(Episodio).where(
+            and_(
+                Episodio.id == episodio_id,
+                Episodio.hospital_id == hospital_id
+            )
+        ).values(
+            modificado_por=username,
+            ultima_modificacion=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    )
+    
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Episodio no encontrado")
+
+def _datos_evento(item) -> dict:
+    """Campos compactos de un ítem de atención médica para el evento de dominio"""
+    return {
+        campo: getattr(item, campo)
+        for campo in ("estado", "prioridad", "tipo", "nombre", "medicamento")
+        if hasattr(item, campo)
+    }
+
 @router.post("/{episodio_id}/prescripciones")
 async def crear_prescripcion(
     episodio_id: str,
     prescripcion_data: PrescripcionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear prescripción médica"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        )
-    ).first()
+    await _registrar_modificacion(db, episodio_id, hospital_id, username)
     
-    if not episodio:
-        raise HTTPException(status_code=404, detail="Episodio no encontrado")
-    
-    # Obtener prescripciones existentes
-    prescripciones = json.loads(episodio.prescripciones or "[]")
-    
-    # Crear nueva prescripción
-    nueva_prescripcion = {
-        "id": f"pre_{int(datetime.now().timestamp() * 1000)}",
-        "medicamento": prescripcion_data.medicamento,
-        "dosis": prescripcion_data.dosis,
-        "frecuencia": prescripcion_data.frecuencia,
-        "via_administracion": prescripcion_data.via_administracion,
-        "duracion": prescripcion_data.duracion,
-        "observaciones": prescripcion_data.observaciones,
-        "estado": "pendiente",
-        "prescrito_por": username,
-        "fecha_prescripcion": datetime.now().isoformat(),
-        "administrado": False
+    # Insertar la prescripción como fila propia (sin reescribir el episodio)
+    prescripcion = Prescripcion(
+        episodio_id=episodio_id,
+        hospital_id=hospital_id,
+        **prescripcion_data.dict(),
+        estado="pendiente",
+        prescrito_por=username,
+        administrado=False
+    )
+    db.add(prescripcion)
+    await db.commit()
+    await db.refresh(prescripcion)
+    await publicar_evento(hospital_id, "prescripcion", "creado", prescripcion.id, {"episodio_id": episodio_id, **_datos_evento(prescripcion)})
+    
+    return {
+        "message": "Prescripción creada exitosamente",
+        "prescripcion": PrescripcionResponse.model_validate(prescripcion)
     }
+
+@router.get("/{episodio_id}/prescripciones", response_model=List[PrescripcionResponse])
+async def get_prescripciones(
+    episodio_id: str,
+    estado: Optional[str] = Query(None, description="Filtrar por estado (pendiente, administrada, ...)"),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Obtener prescripciones de un episodio"""
+    hospital_id = auth_data["hospital_id"]
     
-    prescripciones.append(nueva_prescripcion)
-    episodio.prescripciones = json.dumps(prescripciones)
-    episodio.modificado_por = username
-    
-    db.commit()
+    query = select(Prescripcion).where(
+        and_(
+            Prescripcion.episodio_id == episodio_id,
+            Prescripcion.hospital_id == hospital_id
+        )
+    )
+    if estado:
+        query = query.where(Prescripcion.estado == estado)
     
-    return {"message": "Prescripción creada exitosamente", "prescripcion": nueva_prescripcion}
+    return (await db.scalars(query.order_by(Prescripcion.fecha_prescripcion))).all()
 
 @router.post("/{episodio_id}/procedimientos")
 async def crear_procedimiento(
     episodio_id: str,
     procedimiento_data: ProcedimientoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear indicación de procedimiento"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        )
-    ).first()
-    
-    if not episodio:
-        raise HTTPException(status_code=404, detail="Episodio no encontrado")
+    await _registrar_modificacion(db, episodio_id, hospital_id, username)
     
-    # Obtener procedimientos existentes
-    procedimientos = json.loads(episodio.procedimientos or "[]")
-    
-    # Crear nuevo procedimiento
-    nuevo_procedimiento = {
-        "id": f"proc_{int(datetime.now().timestamp() * 1000)}",
-        "nombre": procedimiento_data.nombre,
-        "descripcion": procedimiento_data.descripcion,
-        "prioridad": procedimiento_data.prioridad,
-        "observaciones": procedimiento_data.observaciones,
-        "estado": "pendiente",
-        "indicado_por": username,
-        "fecha_indicacion": datetime.now().isoformat(),
-        "completado": False
+    procedimiento = Procedimiento(
+        episodio_id=episodio_id,
+        hospital_id=hospital_id,
+        **procedimiento_data.dict(),
+        estado="pendiente",
+        indicado_por=username,
+        completado=False
+    )
+    db.add(procedimiento)
+    await db.commit()
+    await db.refresh(procedimiento)
+    await publicar_evento(hospital_id, "procedimiento", "creado", procedimiento.id, {"episodio_id": episodio_id, **_datos_evento(procedimiento)})
+    
+    return {
+        "message": "Procedimiento indicado exitosamente",
+        "procedimiento": ProcedimientoResponse.model_validate(procedimiento)
     }
+
+@router.get("/{episodio_id}/procedimientos", response_model=List[ProcedimientoResponse])
+async def get_procedimientos(
+    episodio_id: str,
+    estado: Optional[str] = Query(None, description="Filtrar por estado (pendiente, completado, ...)"),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Obtener procedimientos indicados en un episodio"""
+    hospital_id = auth_data["hospital_id"]
     
-    procedimientos.append(nuevo_procedimiento)
-    episodio.procedimientos = json.dumps(procedimientos)
-    episodio.modificado_por = username
-    
-    db.commit()
+    query = select(Procedimiento).where(
+        and_(
+            Procedimiento.episodio_id == episodio_id,
+            Procedimiento.hospital_id == hospital_id
+        )
+    )
+    if estado:
+        query = query.where(Procedimiento.estado == estado)
     
-    return {"message": "Procedimiento indicado exitosamente", "procedimiento": nuevo_procedimiento}
+    return (await db.scalars(query.order_by(Procedimiento.fecha_indicacion))).all()
 
 @router.post("/{episodio_id}/estudios")
 async def solicitar_estudio(
     episodio_id: str,
     estudio_data: EstudioCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Solicitar estudio médico"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        )
-    ).first()
-    
-    if not episodio:
-        raise HTTPException(status_code=404, detail="Episodio no encontrado")
+    await _registrar_modificacion(db, episodio_id, hospital_id, username)
     
-    # Obtener estudios existentes
-    estudios = json.loads(episodio.estudios_solicitados or "[]")
-    
-    # Crear nuevo estudio
-    nuevo_estudio = {
-        "id": f"est_{int(datetime.now().timestamp() * 1000)}",
-        "tipo": estudio_data.tipo,
-        "nombre": estudio_data.nombre,
-        "prioridad": estudio_data.prioridad,
-        "observaciones": estudio_data.observaciones,
-        "estado": "pendiente",
-        "solicitado_por": username,
-        "fecha_solicitud": datetime.now().isoformat(),
-        "completado": False
+    estudio = EstudioSolicitado(
+        episodio_id=episodio_id,
+        hospital_id=hospital_id,
+        **estudio_data.dict(),
+        estado="pendiente",
+        solicitado_por=username,
+        completado=False
+    )
+    db.add(estudio)
+    await db.commit()
+    await db.refresh(estudio)
+    await publicar_evento(hospital_id, "estudio", "creado", estudio.id, {"episodio_id": episodio_id, **_datos_evento(estudio)})
+    
+    return {
+        "message": "Estudio solicitado exitosamente",
+        "estudio": EstudioResponse.model_validate(estudio)
     }
+
+@router.get("/{episodio_id}/estudios", response_model=List[EstudioResponse])
+async def get_estudios(
+    episodio_id: str,
+    estado: Optional[str] = Query(None, description="Filtrar por estado (pendiente, completado, ...)"),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Obtener estudios solicitados en un episodio"""
+    hospital_id = auth_data["hospital_id"]
     
-    estudios.append(nuevo_estudio)
-    episodio.estudios_solicitados = json.dumps(estudios)
-    episodio.modificado_por = username
-    
-    db.commit()
+    query = select(EstudioSolicitado).where(
+        and_(
+            EstudioSolicitado.episodio_id == episodio_id,
+            EstudioSolicitado.hospital_id == hospital_id
+        )
+    )
+    if estado:
+        query = query.where(EstudioSolicitado.estado == estado)
     
-    return {"message": "Estudio solicitado exitosamente", "estudio": nuevo_estudio}
+    return (await db.scalars(query.order_by(EstudioSolicitado.fecha_solicitud))).all()
 
 @router.post("/{episodio_id}/evoluciones")
 async def crear_evolucion_medica(
     episodio_id: str,
     evolucion_data: EvolucionMedicaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear evolución médica"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        )
-    ).first()
+    await _registrar_modificacion(db, episodio_id, hospital_id, username)
     
-    if not episodio:
-        raise HTTPException(status_code=404, detail="Episodio no encontrado")
-    
-    # Obtener evoluciones existentes
-    evoluciones = json.loads(episodio.evoluciones_medicas or "[]")
-    
-    # Crear nueva evolución
-    nueva_evolucion = {
-        "id": f"evo_{int(datetime.now().timestamp() * 1000)}",
-        "evolucion": evolucion_data.evolucion,
-        "plan": evolucion_data.plan,
-        "estado_paciente": evolucion_data.estado_paciente,
-        "medico": username,
-        "fecha": datetime.now().isoformat()
+    evolucion = EvolucionMedica(
+        episodio_id=episodio_id,
+        hospital_id=hospital_id,
+        **evolucion_data.dict(),
+        medico=username
+    )
+    db.add(evolucion)
+    await db.commit()
+    await db.refresh(evolucion)
+    await publicar_evento(hospital_id, "evolucion", "creado", evolucion.id, {"episodio_id": episodio_id, **_datos_evento(evolucion)})
+    
+    return {
+        "message": "Evolución médica registrada exitosamente",
+        "evolucion": EvolucionMedicaResponse.model_validate(evolucion)
     }
-    
-    evoluciones.append(nueva_evolucion)
-    episodio.evoluciones_medicas = json.dumps(evoluciones)
-    episodio.modificado_por = username
-    
-    db.commit()
-    
-    return {"message": "Evolución médica registrada exitosamente", "evolucion": nueva_evolucion}
 
 @router.post("/{episodio_id}/indicaciones-monitoreo")
 async def crear_indicacion_monitoreo(
     episodio_id: str,
     indicacion_data: IndicacionMonitoreoCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear indicación de monitoreo (para enfermería)"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
-        )
-    ).first()
+    await _registrar_modificacion(db, episodio_id, hospital_id, username)
     
-    if not episodio:
-        raise HTTPException(status_code=404, detail="Episodio no encontrado")
-    
-    # Obtener indicaciones existentes
-    indicaciones = json.loads(episodio.indicaciones_monitoreo or "[]")
-    
-    # Crear nueva indicación
-    nueva_indicacion = {
-        "id": f"mon_{int(datetime.now().timestamp() * 1000)}",
-        "tipo_control": indicacion_data.tipo_control,
-        "frecuencia_minutos": indicacion_data.frecuencia_minutos,
-        "observaciones": indicacion_data.observaciones,
-        "estado": "activa",
-        "indicado_por": username,
-        "fecha_indicacion": datetime.now().isoformat()
+    indicacion = IndicacionMonitoreo(
+        episodio_id=episodio_id,
+        hospital_id=hospital_id,
+        **indicacion_data.dict(),
+        estado="activa",
+        indicado_por=username
+    )
+    db.add(indicacion)
+    await db.commit()
+    await db.refresh(indicacion)
+    await publicar_evento(hospital_id, "indicacion_monitoreo", "creado", indicacion.id, {"episodio_id": episodio_id, **_datos_evento(indicacion)})
+    
+    return {
+        "message": "Indicación de monitoreo creada exitosamente",
+        "indicacion": IndicacionMonitoreoResponse.model_validate(indicacion)
     }
-    
-    indicaciones.append(nueva_indicacion)
-    episodio.indicaciones_monitoreo = json.dumps(indicaciones)
-    episodio.modificado_por = username
-    
-    db.commit()
-    
-    return {"message": "Indicación de monitoreo creada exitosamente", "indicacion": nueva_indicacion}
 
 @router.put("/{episodio_id}/enviar-shockroom")
 async def enviar_a_shockroom(
     episodio_id: str,
     cama_shockroom: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Médico envía paciente al shockroom"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
+    episodio = await db.scalar(select(Episodio).where(
         and_(
             Episodio.id == episodio_id,
             Episodio.hospital_id == hospital_id,
             Episodio.estado == "en_atencion"
         )
-    ).first()
+    ))
     
     if not episodio:
         raise HTTPException(
@@ -592,13 +690,13 @@ async def enviar_a_shockroom(
         )
     
     # Verificar cama disponible
-    cama = db.query(ShockroomCama).filter(
+    cama = await db.scalar(select(ShockroomCama).where(
         and_(
             ShockroomCama.hospital_id == hospital_id,
             ShockroomCama.numero_cama == cama_shockroom,
             ShockroomCama.estado == "disponible"
         )
-    ).first()
+    ))
     
     if not cama:
         raise HTTPException(
@@ -626,7 +724,10 @@ async def enviar_a_shockroom(
     # Cambiar estado cama
     cama.estado = "ocupada"
     
-    db.commit()
+    await db.commit()
+    await cola_triaje.actualizar_async(db, episodio)
+    await evento_episodio(episodio, "enviado_shockroom")
+    await evento_cama(cama, "ocupada", episodio_id=episodio.id)
     
     return {"message": f"Paciente enviado al shockroom, cama {cama_shockroom}"}
 
@@ -634,20 +735,20 @@ async def enviar_a_shockroom(
 async def tomar_decision_final(
     episodio_id: str,
     decision_data: DecisionFinalRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Tomar decisión médica final (OBLIGATORIA para cerrar episodio)"""
     hospital_id = auth_data["hospital_id"]
     username = auth_data["username"]
     
-    episodio = db.query(Episodio).filter(
+    episodio = await db.scalar(select(Episodio).where(
         and_(
             Episodio.id == episodio_id,
             Episodio.hospital_id == hospital_id,
             Episodio.medico_responsable == username  # Solo el médico responsable
         )
-    ).first()
+    ))
     
     if not episodio:
         raise HTTPException(
@@ -683,32 +784,37 @@ async def tomar_decision_final(
         episodio.motivo_continuacion = decision_data.motivo_continuacion
     
     # Si estaba en shockroom, liberar cama
+    cama = None
     if episodio.en_shockroom and decision_data.decision in ["alta", "internacion"]:
         episodio.fecha_salida_shockroom = datetime.utcnow()
         episodio.en_shockroom = False
         
         # Liberar cama
         if episodio.cama_shockroom:
-            cama = db.query(ShockroomCama).filter(
+            cama = await db.scalar(select(ShockroomCama).where(
                 and_(
                     ShockroomCama.hospital_id == hospital_id,
                     ShockroomCama.numero_cama == episodio.cama_shockroom
                 )
-            ).first()
+            ))
             if cama:
                 cama.estado = "limpieza"
         
         # Cerrar asignación
-        asignacion = db.query(ShockroomAsignacion).filter(
+        asignacion = await db.scalar(select(ShockroomAsignacion).where(
             and_(
                 ShockroomAsignacion.episodio_id == episodio.id,
                 ShockroomAsignacion.fecha_salida.is_(None)
             )
-        ).first()
+        ))
         if asignacion:
             asignacion.fecha_salida = datetime.utcnow()
     
-    db.commit()
+    await db.commit()
+    await cola_triaje.actualizar_async(db, episodio)
+    await evento_episodio(episodio, "decision_final")
+    if cama is not None:
+        await evento_cama(cama, "liberada", episodio_id=episodio.id)
     
     return {"message": f"Decisión final '{decision_data.decision}' aplicada exitosamente"}
 
@@ -717,63 +823,97 @@ async def tomar_decision_final(
 @router.get("/{episodio_id}")
 async def get_episodio(
     episodio_id: str,
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener detalles completos de un episodio"""
+    """Obtener detalles completos de un episodio.
+
+    prescripciones, procedimientos, estudios_solicitados, evoluciones_medicas
+    e indicaciones_monitoreo salen de sus tablas (las mismas que escriben los
+    POST), no de las columnas JSON legadas del episodio.
+    """
     hospital_id = auth_data["hospital_id"]
     
-    episodio = db.query(Episodio).options(
-        joinedload(Episodio.paciente)
-    ).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
+    episodio = await db.scalar(
+        select(Episodio).options(
+            joinedload(Episodio.paciente)
+        ).where(
+            and_(
+                Episodio.id == episodio_id,
+                Episodio.hospital_id == hospital_id
+            )
         )
-    ).first()
+    )
     
     if not episodio:
         raise HTTPException(status_code=404, detail="Episodio no encontrado")
     
-    return episodio
+    detalle = {
+        atributo.key: getattr(episodio, atributo.key)
+        for atributo in inspect(Episodio).column_attrs
+    }
+    detalle["paciente"] = episodio.paciente
+    for clave, modelo, schema, orden in _ATENCION_MEDICA:
+        filas = await db.scalars(select(modelo).where(
+            and_(
+                modelo.episodio_id == episodio_id,
+                modelo.hospital_id == hospital_id
+            )
+        ).order_by(orden))
+        detalle[clave] = [schema.model_validate(fila) for fila in filas]
+    
+    return detalle
 
 @router.get("/{episodio_id}/evoluciones-previas")
 async def get_evoluciones_previas(
     episodio_id: str,
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener evoluciones de episodios previos del mismo paciente"""
     hospital_id = auth_data["hospital_id"]
     
-    # Obtener el episodio actual
-    episodio_actual = db.query(Episodio).filter(
-        and_(
-            Episodio.id == episodio_id,
-            Episodio.hospital_id == hospital_id
+    # Obtener el paciente del episodio actual
+    paciente_id = await db.scalar(
+        select(Episodio.paciente_id).where(
+            and_(
+                Episodio.id == episodio_id,
+                Episodio.hospital_id == hospital_id
+            )
         )
-    ).first()
+    )
     
-    if not episodio_actual:
+    if not paciente_id:
         raise HTTPException(status_code=404, detail="Episodio no encontrado")
     
-    # Buscar episodios previos del mismo paciente
-    episodios_previos = db.query(Episodio).filter(
+    # Últimos 5 episodios previos del mismo paciente que tengan evoluciones
+    episodios_previos = select(Episodio.id).where(
         and_(
-            Episodio.paciente_id == episodio_actual.paciente_id,
+            Episodio.paciente_id == paciente_id,
             Episodio.hospital_id == hospital_id,
             Episodio.id != episodio_id,
-            Episodio.evoluciones_medicas.isnot(None)
+            exists().where(EvolucionMedica.episodio_id == Episodio.id)
         )
-    ).order_by(desc(Episodio.fecha_inicio)).limit(5).all()
+    ).order_by(desc(Episodio.fecha_inicio)).limit(5).subquery()
+    
+    resultados = (await db.execute(
+        select(
+            EvolucionMedica,
+            Episodio.fecha_inicio,
+            Episodio.motivo_consulta
+        ).join(
+            Episodio, EvolucionMedica.episodio_id == Episodio.id
+        ).where(
+            EvolucionMedica.episodio_id.in_(select(episodios_previos.c.id))
+        ).order_by(desc(Episodio.fecha_inicio), EvolucionMedica.fecha)
+    )).all()
     
     evoluciones_previas = []
-    for episodio in episodios_previos:
-        if episodio.evoluciones_medicas:
-            evoluciones = json.loads(episodio.evoluciones_medicas)
-            for evolucion in evoluciones:
-                evolucion["fecha_episodio"] = episodio.fecha_inicio.isoformat()
-                evolucion["motivo_consulta"] = episodio.motivo_consulta
-                evoluciones_previas.append(evolucion)
-    
-    return evoluciones_previas 
\ No newline at end of file
+    for evolucion, fecha_episodio, motivo_consulta in resultados:
+        evoluciones_previas.append({
+            **EvolucionMedicaResponse.model_validate(evolucion).dict(),
+            "fecha_episodio": fecha_episodio.isoformat(),
+            "motivo_consulta": motivo_consulta
+        })
+    
+    return evoluciones_previas
\ No newline at end of file
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import logging
 
 from app.core.database import get_db
-from app.api.v1.auth import get_hospital_id, get_current_user_token
+from app.core.paginacion import Paginacion
+from app.api.v1.auth import get_hospital_id, get_current_user_token, get_verified_token
 from app.schemas.paciente import (
-    PacienteCreate, PacienteResponse, PacienteHospitalResponse,
+    PacienteCreate, PacienteResponse, PacienteHospitalResponse, PacienteBusquedaResponse,
     PacienteCompletoCreate, PacienteCompletoResponse
 )
 from app.services.paciente_service import PacienteService
@@ -16,16 +17,24 @@ logger = logging.getLogger(__name__)
 
 @router.get("/", response_model=List[PacienteHospitalResponse])
 async def get_pacientes(
+    response: Response,
+    paginacion: Paginacion = Depends(),
     hospital_id: str = Depends(get_hospital_id),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener lista de todos los pacientes del hospital"""
     try:
         logger.debug(f"Obteniendo pacientes para hospital: {hospital_id}")
-        pacientes = PacienteService.get_all_pacientes(db, hospital_id)
+        pacientes = paginacion.pagina(
+            PacienteService.get_all_pacientes(db, hospital_id, paginacion),
+            response,
+            lambda paciente: (paciente.fecha_creacion, paciente.id)
+        )
         logger.debug(f"Encontrados {len(pacientes)} pacientes")
         return pacientes
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo pacientes: {e}", exc_info=True)
         raise HTTPException(
@@ -33,12 +42,38 @@ async def get_pacientes(
             detail=f"Error al obtener pacientes: {str(e)}"
         )
 
+@router.get("/buscar", response_model=List[PacienteBusquedaResponse])
+async def buscar_pacientes(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=100, description="DNI (o su comienzo) o parte del nombre"),
+    paginacion: Paginacion = Depends(),
+    hospital_id: str = Depends(get_hospital_id),
+    db: Session = Depends(get_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Buscar pacientes de todos los hospitales por DNI o nombre, ordenados por relevancia"""
+    try:
+        logger.debug(f"Buscando pacientes: '{q}' desde hospital: {hospital_id}")
+        return paginacion.pagina(
+            PacienteService.buscar_pacientes(db, q, hospital_id, paginacion),
+            response,
+            lambda resultado: (resultado.puntaje, resultado.id)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error buscando pacientes: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar pacientes: {str(e)}"
+        )
+
 @router.get("/{dni}", response_model=PacienteHospitalResponse)
 async def get_paciente_by_dni(
     dni: str,
     hospital_id: str = Depends(get_hospital_id),
     db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Buscar paciente por DNI en el contexto del hospital actual"""
     try:
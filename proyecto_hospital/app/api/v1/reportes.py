@@ -0,0 +1,138 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import AsyncIterator, Optional
+from datetime import datetime
+import csv
+import io
+import json
+import logging
+
+from app.core.database import AsyncSessionLocal
+from app.core.fechas import utc_sin_zona
+from app.api.v1.auth import get_verified_token
+from app.models.episodio import Episodio
+from app.models.paciente import Paciente
+from app.services.estadisticas import estadisticas
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Filas por lote leídas del cursor y escritas al cliente
+TAMANO_LOTE_EXPORTACION = 1000
+
+# Columnas exportadas, en orden (también es la cabecera del CSV)
+COLUMNAS_EPISODIO = [
+    Episodio.id,
+    Episodio.numero_episodio_local,
+    Episodio.hospital_id,
+    Episodio.paciente_id,
+    Paciente.dni.label("paciente_dni"),
+    Paciente.nombre_completo.label("paciente_nombre"),
+    Paciente.sexo.label("paciente_sexo"),
+    Paciente.fecha_nacimiento.label("paciente_fecha_nacimiento"),
+    Episodio.tipo,
+    Episodio.estado,
+    Episodio.color_triaje,
+    Episodio.motivo_consulta,
+    Episodio.diagnostico_principal,
+    Episodio.decision_post_triaje,
+    Episodio.decision_final,
+    Episodio.area_internacion,
+    Episodio.en_shockroom,
+    Episodio.medico_responsable,
+    Episodio.fecha_inicio,
+    Episodio.fecha_triaje,
+    Episodio.fecha_inicio_atencion,
+    Episodio.fecha_decision_final,
+    Episodio.fecha_cierre
+]
+NOMBRES_COLUMNAS = [columna.key for columna in COLUMNAS_EPISODIO]
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8"
+}
+
+def _valor(valor):
+    """Fechas (date y datetime) en ISO 8601"""
+    return valor.isoformat() if hasattr(valor, "isoformat") else valor
+
+def _lineas_ndjson(filas) -> str:
+    return "".join(
+        json.dumps(dict(zip(NOMBRES_COLUMNAS, map(_valor, fila))), ensure_ascii=False) + "\n"
+        for fila in filas
+    )
+
+def _lineas_csv(filas) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerows([_valor(valor) for valor in fila] for fila in filas)
+    return buffer.getvalue()
+
+async def _exportar_episodios(
+    hospital_id: str,
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    formato: str
+) -> AsyncIterator[str]:
+    """Generador del cuerpo de la respuesta.
+
+    Usa su propia sesión (la de la dependencia se cerraría antes de terminar
+    de transmitir) y un cursor del lado del servidor: la memoria usada es la
+    de un lote, sin importar cuántos episodios abarque el rango.
+    """
+    query = select(*COLUMNAS_EPISODIO).join(
+        Paciente, Paciente.id == Episodio.paciente_id
+    ).where(Episodio.hospital_id == hospital_id)
+    if desde:
+        query = query.where(Episodio.fecha_inicio >= desde)
+    if hasta:
+        query = query.where(Episodio.fecha_inicio < hasta)
+    query = query.order_by(Episodio.fecha_inicio, Episodio.id)
+
+    if formato == "csv":
+        yield _lineas_csv([NOMBRES_COLUMNAS])
+    lineas = _lineas_csv if formato == "csv" else _lineas_ndjson
+
+    total = 0
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(
+            query.execution_options(yield_per=TAMANO_LOTE_EXPORTACION)
+        )
+        async for lote in resultado.partitions():
+            total += len(lote)
+            yield lineas(lote)
+
+    logger.info(f"📤 Exportados {total} episodios del hospital {hospital_id} ({formato})")
+
+@router.get("/episodios/export")
+async def exportar_episodios(
+    desde: Optional[datetime] = Query(None, description="fecha_inicio desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="fecha_inicio hasta (exclusive)"),
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Exportar los episodios del hospital en streaming (NDJSON o CSV)"""
+    desde = utc_sin_zona(desde)
+    hasta = utc_sin_zona(hasta)
+    if desde and hasta and desde >= hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'desde' debe ser anterior a 'hasta'"
+        )
+
+    hospital_id = auth_data["hospital_id"]
+    nombre = f"episodios_{hospital_id}_{(desde or datetime.min).date()}_{(hasta or datetime.utcnow()).date()}.{formato}"
+    return StreamingResponse(
+        _exportar_episodios(hospital_id, desde, hasta, formato),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
+
+@router.get("/estadisticas")
+async def get_estadisticas_hospital(
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Contadores pre-agregados del hospital para los tableros (sin consultar la base de datos)"""
+    return estadisticas.snapshot(auth_data["hospital_id"])
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, select, exists, update, literal_column, Integer
+from sqlalchemy.dialects import postgresql, sqlite
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import json
 
-from app.core.database import get_db
-from app.api.v1.auth import get_current_user_token
-from app.models.shockroom import ShockroomCama, ShockroomAsignacion, ShockroomAlerta
+from app.core.database import get_async_db
+from app.core.paginacion import Paginacion
+from app.core.sql import segundos_epoch
+from app.api.v1.auth import get_current_user_token, get_verified_token
+from app.models.shockroom import ShockroomCama, ShockroomAsignacion, ShockroomAlerta, ShockroomLecturaVital
 from app.models.paciente import Paciente
 from app.models.episodio import Episodio
+from app.services.cola_triaje import cola_triaje
+from app.services.estadisticas import estadisticas
+from app.services.eventos import evento_cama, evento_episodio, publicar_evento
 from app.schemas.shockroom import (
     ShockroomCama as ShockroomCamaSchema,
     ShockroomCamaCreate,
@@ -23,60 +29,210 @@ from app.schemas.shockroom import (
     ShockroomAlertaUpdate,
     ShockroomEstadisticas,
     ShockroomPacienteInfo,
-    MonitorizacionDatos
+    MonitorizacionDatos,
+    MonitorizacionLote,
+    MonitorizacionSerie,
+    LecturaVital,
+    LecturaVitalAgregada,
+    ResumenSignoVital
 )
 
 router = APIRouter()
 
+# Estados en los que un episodio crítico puede pasar al shockroom
+# (nombres del workflow actual y los heredados del workflow anterior)
+ESTADOS_CANDIDATOS_SHOCKROOM = [
+    "espera_triaje", "en_lista_medica", "en_atencion",
+    "En espera de atención", "En atención"
+]
+
+# Signos numéricos de la serie temporal (se agregan por intervalo)
+SIGNOS_NUMERICOS = [
+    "presion_arterial_sistolica", "presion_arterial_diastolica",
+    "frecuencia_cardiaca", "frecuencia_respiratoria",
+    "temperatura", "saturacion_oxigeno", "escala_dolor"
+]
+CAMPOS_LECTURA = SIGNOS_NUMERICOS + ["estado_conciencia"]
+
+def _cargar_json(valor, por_defecto):
+    """Columnas JSON guardadas como texto serializado (json.dumps) o como objeto"""
+    if valor is None:
+        return por_defecto
+    if isinstance(valor, str):
+        try:
+            return json.loads(valor)
+        except ValueError:
+            return por_defecto
+    return valor
+
+async def _marcar_cama_actualizada(db: AsyncSession, asignacion_id: str):
+    """Actualizar fecha_actualizacion de la cama para que el modo ?since= la incluya"""
+    await db.execute(
+        update(ShockroomCama).where(
+            ShockroomCama.id == select(ShockroomAsignacion.cama_id).where(
+                ShockroomAsignacion.id == asignacion_id
+            ).scalar_subquery()
+        ).values(fecha_actualizacion=datetime.utcnow()).execution_options(synchronize_session=False)
+    )
+
+async def _asignacion_del_hospital(db: AsyncSession, asignacion_id: str, hospital_id: str) -> ShockroomAsignacion:
+    asignacion = await db.scalar(select(ShockroomAsignacion).join(ShockroomCama).where(
+        ShockroomAsignacion.id == asignacion_id,
+        ShockroomCama.hospital_id == hospital_id
+    ))
+    if not asignacion:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Asignación no encontrada"
+        )
+    return asignacion
+
+def _utc(fecha: datetime) -> datetime:
+    """Las lecturas se guardan en UTC sin zona horaria"""
+    if fecha.tzinfo is not None:
+        return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+async def _guardar_lecturas(db: AsyncSession, asignacion_id: str, lecturas: List[MonitorizacionDatos]):
+    """Insertar lecturas en un solo executemany; una lectura reenviada con el
+    mismo timestamp reemplaza a la anterior"""
+    dialecto = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    filas = {}
+    for lectura in lecturas:
+        timestamp = _utc(lectura.timestamp)
+        filas[timestamp] = {
+            "asignacion_id": asignacion_id,
+            "timestamp": timestamp,
+            **lectura.dict(include=set(CAMPOS_LECTURA))
+        }
+    
+    sentencia = dialecto.insert(ShockroomLecturaVital)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=[ShockroomLecturaVital.asignacion_id, ShockroomLecturaVital.timestamp],
+        set_={campo: sentencia.excluded[campo] for campo in CAMPOS_LECTURA}
+    )
+    await db.execute(sentencia, list(filas.values()))
+    return max(filas)
+
+async def _ultimas_lecturas(db: AsyncSession, asignacion_ids: List[str]) -> dict:
+    """Última lectura de cada asignación, en el formato {timestamp: datos} de
+    datos_monitorizacion"""
+    if not asignacion_ids:
+        return {}
+    ultimas = select(
+        ShockroomLecturaVital.asignacion_id,
+        func.max(ShockroomLecturaVital.timestamp).label("timestamp")
+    ).where(
+        ShockroomLecturaVital.asignacion_id.in_(asignacion_ids)
+    ).group_by(ShockroomLecturaVital.asignacion_id).subquery()
+    
+    lecturas = await db.scalars(select(ShockroomLecturaVital).join(
+        ultimas,
+        and_(
+            ShockroomLecturaVital.asignacion_id == ultimas.c.asignacion_id,
+            ShockroomLecturaVital.timestamp == ultimas.c.timestamp
+        )
+    ))
+    return {
+        lectura.asignacion_id: {
+            lectura.timestamp.isoformat(): {campo: getattr(lectura, campo) for campo in CAMPOS_LECTURA}
+        }
+        for lectura in lecturas
+    }
+
+async def _evento_alerta(hospital_id: str, alerta: ShockroomAlerta, accion: str):
+    await publicar_evento(hospital_id, "alerta", accion, alerta.id, {
+        "asignacion_id": alerta.asignacion_id,
+        "tipo_alerta": alerta.tipo_alerta,
+        "prioridad": alerta.prioridad,
+        "titulo": alerta.titulo,
+        "estado": alerta.estado
+    })
+
 # ENDPOINTS PARA CAMAS
 
 @router.get("/camas", response_model=List[ShockroomCamaDetallada])
 async def get_shockroom_camas(
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    since: Optional[datetime] = Query(
+        None,
+        description="Devolver solo las camas con fecha_actualizacion posterior a esta fecha"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener todas las camas del shockroom con información detallada"""
+    """Obtener todas las camas del shockroom con información detallada
+    
+    Una sola consulta trae cada cama junto con su asignación activa, el
+    nombre del paciente y sus alertas activas. Con ?since= se devuelven solo
+    las camas modificadas desde esa fecha; el cliente puede usar la mayor
+    fecha_actualizacion recibida como próximo valor de since.
+    """
     hospital_id = auth_data["hospital_id"]
     
-    # Obtener camas con asignaciones activas
-    camas = db.query(ShockroomCama).options(
-        joinedload(ShockroomCama.asignaciones)
-    ).filter(ShockroomCama.hospital_id == hospital_id).all()
+    query = select(
+        ShockroomCama,
+        ShockroomAsignacion,
+        Paciente.nombre_completo,
+        ShockroomAlerta
+    ).outerjoin(
+        ShockroomAsignacion,
+        and_(
+            ShockroomAsignacion.cama_id == ShockroomCama.id,
+            ShockroomAsignacion.fecha_salida.is_(None)
+        )
+    ).outerjoin(
+        Paciente, Paciente.id == ShockroomAsignacion.paciente_id
+    ).outerjoin(
+        ShockroomAlerta,
+        and_(
+            ShockroomAlerta.asignacion_id == ShockroomAsignacion.id,
+            ShockroomAlerta.estado == "activa"
+        )
+    ).where(ShockroomCama.hospital_id == hospital_id)
+    
+    if since:
+        query = query.where(ShockroomCama.fecha_actualizacion > _utc(since))
+    
+    filas = (await db.execute(
+        query.order_by(ShockroomCama.numero_cama, ShockroomAlerta.fecha_creacion)
+    )).all()
+    
+    # Agrupar las filas (una por alerta activa) por cama
+    camas = {}
+    for cama, asignacion, paciente_nombre, alerta in filas:
+        if cama.id not in camas:
+            camas[cama.id] = (cama, asignacion, paciente_nombre, [])
+        cama_asignacion = camas[cama.id][1]
+        if alerta is not None and cama_asignacion is not None and alerta.asignacion_id == cama_asignacion.id:
+            camas[cama.id][3].append(alerta)
+    
+    ultimas_lecturas = await _ultimas_lecturas(
+        db, [asignacion.id for _, asignacion, _, _ in camas.values() if asignacion is not None]
+    )
     
+    ahora = datetime.utcnow()
     resultado = []
-    for cama in camas:
-        # Buscar asignación activa
-        asignacion_actual = next(
-            (a for a in cama.asignaciones if a.fecha_salida is None), 
-            None
-        )
-        
-        paciente_nombre = None
+    for cama, asignacion_actual, paciente_nombre, alertas_activas in camas.values():
+        asignacion_schema = None
         tiempo_ocupacion = None
-        alertas_activas = []
         
         if asignacion_actual:
-            # Obtener información del paciente
-            paciente = db.query(Paciente).filter(
-                Paciente.id == asignacion_actual.paciente_id
-            ).first()
-            if paciente:
-                paciente_nombre = f"{paciente.nombre_completo or f'{paciente.primer_nombre} {paciente.primer_apellido}'}"
+            asignacion_schema = ShockroomAsignacionSchema.model_validate({
+                **asignacion_actual.__dict__,
+                "equipos_utilizados": _cargar_json(asignacion_actual.equipos_utilizados, []),
+                "datos_monitorizacion": ultimas_lecturas.get(asignacion_actual.id)
+                    or _cargar_json(asignacion_actual.datos_monitorizacion, None)
+            })
             
             # Calcular tiempo de ocupación
-            tiempo_ocupacion = int((datetime.utcnow() - asignacion_actual.fecha_ingreso).total_seconds() / 60)
-            
-            # Obtener alertas activas
-            alertas_activas = db.query(ShockroomAlerta).filter(
-                and_(
-                    ShockroomAlerta.asignacion_id == asignacion_actual.id,
-                    ShockroomAlerta.estado == "activa"
-                )
-            ).all()
+            tiempo_ocupacion = int((ahora - asignacion_actual.fecha_ingreso).total_seconds() / 60)
         
         resultado.append(ShockroomCamaDetallada(
-            **cama.__dict__,
-            asignacion_actual=asignacion_actual,
+            **{
+                **cama.__dict__,
+                "equipamiento": _cargar_json(cama.equipamiento, [])
+            },
+            asignacion_actual=asignacion_schema,
             paciente_nombre=paciente_nombre,
             tiempo_ocupacion=tiempo_ocupacion,
             alertas_activas=alertas_activas
@@ -87,17 +243,17 @@ async def get_shockroom_camas(
 @router.post("/camas", response_model=ShockroomCamaSchema)
 async def create_cama(
     cama_data: ShockroomCamaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear una nueva cama en el shockroom"""
     # Verificar que el número de cama no exista
-    existing = db.query(ShockroomCama).filter(
+    existing = await db.scalar(select(ShockroomCama).where(
         and_(
             ShockroomCama.hospital_id == cama_data.hospital_id,
             ShockroomCama.numero_cama == cama_data.numero_cama
         )
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -110,8 +266,9 @@ async def create_cama(
         equipamiento=json.dumps(cama_data.equipamiento or [])
     )
     db.add(cama)
-    db.commit()
-    db.refresh(cama)
+    await db.commit()
+    await db.refresh(cama)
+    await evento_cama(cama, "creada")
     
     return cama
 
@@ -119,11 +276,11 @@ async def create_cama(
 async def update_cama(
     cama_id: str,
     cama_update: ShockroomCamaUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Actualizar una cama del shockroom"""
-    cama = db.query(ShockroomCama).filter(ShockroomCama.id == cama_id).first()
+    cama = await db.scalar(select(ShockroomCama).where(ShockroomCama.id == cama_id))
     if not cama:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -136,8 +293,9 @@ async def update_cama(
         setattr(cama, field, value)
     
     cama.fecha_actualizacion = datetime.utcnow()
-    db.commit()
-    db.refresh(cama)
+    await db.commit()
+    await db.refresh(cama)
+    await evento_cama(cama, "actualizada")
     
     return cama
 
@@ -146,12 +304,12 @@ async def update_cama(
 @router.post("/asignaciones", response_model=ShockroomAsignacionSchema)
 async def crear_asignacion(
     asignacion_data: ShockroomAsignacionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Asignar un paciente a una cama del shockroom"""
     # Verificar que la cama esté disponible
-    cama = db.query(ShockroomCama).filter(ShockroomCama.id == asignacion_data.cama_id).first()
+    cama = await db.scalar(select(ShockroomCama).where(ShockroomCama.id == asignacion_data.cama_id))
     if not cama:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -165,12 +323,12 @@ async def crear_asignacion(
         )
     
     # Verificar que el episodio no esté ya asignado
-    asignacion_existente = db.query(ShockroomAsignacion).filter(
+    asignacion_existente = await db.scalar(select(ShockroomAsignacion).where(
         and_(
             ShockroomAsignacion.episodio_id == asignacion_data.episodio_id,
             ShockroomAsignacion.fecha_salida.is_(None)
         )
-    ).first()
+    ))
     
     if asignacion_existente:
         raise HTTPException(
@@ -189,25 +347,29 @@ async def crear_asignacion(
     cama.estado = "ocupada"
     
     # Actualizar estado del episodio
-    episodio = db.query(Episodio).filter(Episodio.id == asignacion_data.episodio_id).first()
+    episodio = await db.scalar(select(Episodio).where(Episodio.id == asignacion_data.episodio_id))
     if episodio:
         episodio.estado = "En shockroom"
     
-    db.commit()
-    db.refresh(asignacion)
+    await db.commit()
+    await db.refresh(asignacion)
+    await evento_cama(cama, "ocupada", asignacion_id=asignacion.id, episodio_id=asignacion.episodio_id)
+    if episodio:
+        await cola_triaje.actualizar_async(db, episodio)
+        await evento_episodio(episodio, "ingreso_shockroom")
     
     return asignacion
 
 @router.put("/asignaciones/{asignacion_id}/salida")
 async def dar_salida_shockroom(
     asignacion_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Dar salida a un paciente del shockroom"""
-    asignacion = db.query(ShockroomAsignacion).filter(
+    asignacion = await db.scalar(select(ShockroomAsignacion).where(
         ShockroomAsignacion.id == asignacion_id
-    ).first()
+    ))
     
     if not asignacion:
         raise HTTPException(
@@ -225,16 +387,21 @@ async def dar_salida_shockroom(
     asignacion.fecha_salida = datetime.utcnow()
     
     # Liberar cama
-    cama = db.query(ShockroomCama).filter(ShockroomCama.id == asignacion.cama_id).first()
+    cama = await db.scalar(select(ShockroomCama).where(ShockroomCama.id == asignacion.cama_id))
     if cama:
         cama.estado = "limpieza"  # Requiere limpieza antes de estar disponible
     
     # Actualizar estado del episodio
-    episodio = db.query(Episodio).filter(Episodio.id == asignacion.episodio_id).first()
+    episodio = await db.scalar(select(Episodio).where(Episodio.id == asignacion.episodio_id))
     if episodio:
         episodio.estado = "En espera de atención"
     
-    db.commit()
+    await db.commit()
+    if cama:
+        await evento_cama(cama, "liberada", asignacion_id=asignacion.id)
+    if episodio:
+        await cola_triaje.actualizar_async(db, episodio)
+        await evento_episodio(episodio, "salida_shockroom")
     
     return {"message": "Salida registrada exitosamente"}
 
@@ -242,82 +409,170 @@ async def dar_salida_shockroom(
 async def actualizar_monitorizacion(
     asignacion_id: str,
     datos: MonitorizacionDatos,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
-    """Actualizar datos de monitorización de un paciente"""
-    asignacion = db.query(ShockroomAsignacion).filter(
-        ShockroomAsignacion.id == asignacion_id
-    ).first()
-    
-    if not asignacion:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Asignación no encontrada"
-        )
-    
-    # Obtener datos existentes o crear nuevo dict
-    datos_existentes = json.loads(asignacion.datos_monitorizacion or "{}")
+    """Registrar una lectura de monitorización de un paciente"""
+    asignacion = await _asignacion_del_hospital(db, asignacion_id, auth_data["hospital_id"])
+    
+    timestamp = await _guardar_lecturas(db, asignacion.id, [datos])
+    # El tablero embebe la última lectura: la cama debe aparecer en ?since=
+    await _marcar_cama_actualizada(db, asignacion.id)
+    await db.commit()
+    await publicar_evento(
+        auth_data["hospital_id"], "asignacion", "monitorizacion", asignacion.id,
+        {"cama_id": asignacion.cama_id, "timestamp": timestamp.isoformat()}
+    )
     
-    # Agregar nuevo registro
-    timestamp = datos.timestamp.isoformat()
-    datos_existentes[timestamp] = datos.dict(exclude={"timestamp"})
+    return {"message": "Datos de monitorización actualizados"}
+
+@router.post("/asignaciones/{asignacion_id}/monitorizacion/lote")
+async def registrar_monitorizacion_lote(
+    asignacion_id: str,
+    lote: MonitorizacionLote,
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_current_user_token)
+):
+    """Registrar un lote de lecturas del monitor en una sola sentencia"""
+    asignacion = await _asignacion_del_hospital(db, asignacion_id, auth_data["hospital_id"])
+    
+    timestamp = await _guardar_lecturas(db, asignacion.id, lote.lecturas)
+    # El tablero embebe la última lectura: la cama debe aparecer en ?since=
+    await _marcar_cama_actualizada(db, asignacion.id)
+    await db.commit()
+    await publicar_evento(
+        auth_data["hospital_id"], "asignacion", "monitorizacion", asignacion.id,
+        {"cama_id": asignacion.cama_id, "timestamp": timestamp.isoformat(), "lecturas": len(lote.lecturas)}
+    )
     
-    asignacion.datos_monitorizacion = json.dumps(datos_existentes)
-    db.commit()
+    return {"message": "Lecturas registradas", "lecturas": len(lote.lecturas)}
+
+@router.get("/asignaciones/{asignacion_id}/monitorizacion", response_model=MonitorizacionSerie)
+async def get_monitorizacion(
+    asignacion_id: str,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    intervalo: Optional[int] = Query(
+        None, ge=1, le=86400,
+        description="Segundos por intervalo; si se indica, devuelve min/max/promedio por intervalo"
+    ),
+    limite: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
+):
+    """Consultar la serie de signos vitales de una asignación en un rango.
+    
+    Sin intervalo devuelve las lecturas originales en orden (a lo sumo
+    `limite`; para continuar, usar el último timestamp como `desde`). Con
+    intervalo la agregación se hace en la base de datos y se devuelve un
+    punto por intervalo con datos.
+    """
+    asignacion = await _asignacion_del_hospital(db, asignacion_id, auth_data["hospital_id"])
+    desde = _utc(desde) if desde else None
+    hasta = _utc(hasta) if hasta else None
+    
+    condiciones = [ShockroomLecturaVital.asignacion_id == asignacion.id]
+    if desde:
+        condiciones.append(ShockroomLecturaVital.timestamp >= desde)
+    if hasta:
+        condiciones.append(ShockroomLecturaVital.timestamp <= hasta)
+    
+    serie = MonitorizacionSerie(
+        asignacion_id=asignacion.id, desde=desde, hasta=hasta, intervalo_segundos=intervalo
+    )
     
-    return {"message": "Datos de monitorización actualizados"}
+    if intervalo is None:
+        lecturas = await db.scalars(
+            select(ShockroomLecturaVital).where(*condiciones).order_by(
+                ShockroomLecturaVital.timestamp
+            ).limit(limite)
+        )
+        serie.lecturas = [LecturaVital.model_validate(lectura) for lectura in lecturas]
+        return serie
+    
+    # El intervalo va literal para que SELECT y GROUP BY sean la misma expresión en PostgreSQL
+    grupo = (
+        segundos_epoch(ShockroomLecturaVital.timestamp) // literal_column(str(intervalo), Integer)
+    ).label("grupo")
+    columnas = [grupo, func.count().label("lecturas")]
+    for campo in SIGNOS_NUMERICOS:
+        columna = getattr(ShockroomLecturaVital, campo)
+        columnas += [func.min(columna), func.max(columna), func.avg(columna)]
+    
+    filas = await db.execute(
+        select(*columnas).where(*condiciones).group_by(grupo).order_by(grupo)
+    )
+    for fila in filas:
+        resumenes = {}
+        for posicion, campo in enumerate(SIGNOS_NUMERICOS):
+            minimo, maximo, promedio = fila[2 + posicion * 3:5 + posicion * 3]
+            if promedio is not None:
+                resumenes[campo] = ResumenSignoVital(
+                    min=minimo, max=maximo, promedio=round(float(promedio), 2)
+                )
+        serie.intervalos.append(LecturaVitalAgregada(
+            timestamp=datetime.utcfromtimestamp(fila.grupo * intervalo),
+            lecturas=fila.lecturas,
+            **resumenes
+        ))
+    return serie
 
 # ENDPOINTS PARA ALERTAS
 
 @router.post("/alertas", response_model=ShockroomAlertaSchema)
 async def crear_alerta(
     alerta_data: ShockroomAlertaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Crear una nueva alerta para el shockroom"""
     alerta = ShockroomAlerta(
-        **alerta_data.dict(),
+        **alerta_data.dict(exclude={"creada_por"}),
         creada_por=alerta_data.creada_por or auth_data.get("username")
     )
     db.add(alerta)
-    db.commit()
-    db.refresh(alerta)
+    await _marcar_cama_actualizada(db, alerta.asignacion_id)
+    await db.commit()
+    await db.refresh(alerta)
+    await _evento_alerta(auth_data["hospital_id"], alerta, "creada")
     
     return alerta
 
 @router.get("/alertas", response_model=List[ShockroomAlertaSchema])
 async def get_alertas(
+    response: Response,
     estado: Optional[str] = "activa",
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    paginacion: Paginacion = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener alertas del shockroom"""
     hospital_id = auth_data["hospital_id"]
     
-    query = db.query(ShockroomAlerta).join(
+    query = select(ShockroomAlerta).join(
         ShockroomAsignacion
     ).join(
         ShockroomCama
-    ).filter(
+    ).where(
         ShockroomCama.hospital_id == hospital_id
     )
     
     if estado:
-        query = query.filter(ShockroomAlerta.estado == estado)
+        query = query.where(ShockroomAlerta.estado == estado)
     
-    alertas = query.order_by(ShockroomAlerta.fecha_creacion.desc()).all()
-    return alertas
+    alertas = (await db.scalars(
+        paginacion.keyset(query, ShockroomAlerta.fecha_creacion, ShockroomAlerta.id)
+    )).all()
+    return paginacion.pagina(alertas, response, lambda alerta: (alerta.fecha_creacion, alerta.id))
 
 @router.put("/alertas/{alerta_id}/atender")
 async def atender_alerta(
     alerta_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     auth_data: dict = Depends(get_current_user_token)
 ):
     """Marcar una alerta como atendida"""
-    alerta = db.query(ShockroomAlerta).filter(ShockroomAlerta.id == alerta_id).first()
+    alerta = await db.scalar(select(ShockroomAlerta).where(ShockroomAlerta.id == alerta_id))
     if not alerta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -327,68 +582,23 @@ async def atender_alerta(
     alerta.estado = "atendida"
     alerta.atendida_por = auth_data.get("username")
     alerta.fecha_atencion = datetime.utcnow()
+    await _marcar_cama_actualizada(db, alerta.asignacion_id)
     
-    db.commit()
+    await db.commit()
+    await _evento_alerta(auth_data["hospital_id"], alerta, "atendida")
     return {"message": "Alerta marcada como atendida"}
 
 # ENDPOINTS DE ESTADÍSTICAS Y DATOS
 
 @router.get("/estadisticas", response_model=ShockroomEstadisticas)
 async def get_estadisticas(
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    auth_data: dict = Depends(get_verified_token)
 ):
-    """Obtener estadísticas del shockroom"""
-    hospital_id = auth_data["hospital_id"]
-    
-    # Contar camas por estado
-    estadisticas_camas = db.query(
-        ShockroomCama.estado,
-        func.count(ShockroomCama.id)
-    ).filter(
-        ShockroomCama.hospital_id == hospital_id
-    ).group_by(ShockroomCama.estado).all()
-    
-    stats = {estado: count for estado, count in estadisticas_camas}
+    """Obtener estadísticas del shockroom (contadores en memoria, app/services/estadisticas.py)"""
+    snapshot = estadisticas.snapshot(auth_data["hospital_id"])
+    stats = snapshot["camas_por_estado"]
     total_camas = sum(stats.values())
     
-    # Contar alertas activas
-    alertas_activas = db.query(ShockroomAlerta).join(
-        ShockroomAsignacion
-    ).join(
-        ShockroomCama
-    ).filter(
-        and_(
-            ShockroomCama.hospital_id == hospital_id,
-            ShockroomAlerta.estado == "activa"
-        )
-    ).count()
-    
-    # Contar pacientes críticos
-    pacientes_criticos = db.query(ShockroomAsignacion).join(
-        ShockroomCama
-    ).filter(
-        and_(
-            ShockroomCama.hospital_id == hospital_id,
-            ShockroomAsignacion.fecha_salida.is_(None),
-            ShockroomAsignacion.estado_paciente == "critico"
-        )
-    ).count()
-    
-    # Calcular tiempo promedio de estancia (últimos 30 días)
-    fecha_limite = datetime.utcnow() - timedelta(days=30)
-    tiempos_estancia = db.query(
-        func.extract('epoch', ShockroomAsignacion.fecha_salida - ShockroomAsignacion.fecha_ingreso) / 3600
-    ).join(ShockroomCama).filter(
-        and_(
-            ShockroomCama.hospital_id == hospital_id,
-            ShockroomAsignacion.fecha_salida.isnot(None),
-            ShockroomAsignacion.fecha_ingreso >= fecha_limite
-        )
-    ).all()
-    
-    tiempo_promedio = sum(tiempo[0] for tiempo in tiempos_estancia if tiempo[0]) / len(tiempos_estancia) if tiempos_estancia else None
-    
     return ShockroomEstadisticas(
         total_camas=total_camas,
         camas_disponibles=stats.get("disponible", 0),
@@ -396,67 +606,71 @@ async def get_estadisticas(
         camas_mantenimiento=stats.get("mantenimiento", 0),
         camas_limpieza=stats.get("limpieza", 0),
         tasa_ocupacion=round((stats.get("ocupada", 0) / total_camas * 100) if total_camas > 0 else 0, 2),
-        tiempo_promedio_estancia=tiempo_promedio,
-        alertas_activas=alertas_activas,
-        pacientes_criticos=pacientes_criticos
+        tiempo_promedio_estancia=snapshot["tiempo_promedio_estancia"],
+        alertas_activas=snapshot["alertas_activas"],
+        pacientes_criticos=snapshot["pacientes_criticos"]
     )
 
 @router.get("/pacientes-candidatos", response_model=List[ShockroomPacienteInfo])
 async def get_pacientes_candidatos(
-    db: Session = Depends(get_db),
-    auth_data: dict = Depends(get_current_user_token)
+    db: AsyncSession = Depends(get_async_db),
+    auth_data: dict = Depends(get_verified_token)
 ):
     """Obtener pacientes candidatos para el shockroom (triaje ROJO/NARANJA)"""
     hospital_id = auth_data["hospital_id"]
     
-    # Buscar episodios con triaje crítico que no estén en shockroom
-    episodios = db.query(Episodio).join(Paciente).filter(
+    # Episodios con asignación abierta en shockroom (anti-join)
+    ya_en_shockroom = exists().where(
         and_(
-            Episodio.hospital_id == hospital_id,
-            Episodio.estado.in_(["En espera de atención", "En atención"]),
-            or_(
-                Episodio.color_triaje == "ROJO",
-                Episodio.color_triaje == "NARANJA"
-            )
+            ShockroomAsignacion.episodio_id == Episodio.id,
+            ShockroomAsignacion.fecha_salida.is_(None)
         )
-    ).all()
-    
-    # Filtrar los que no están ya en shockroom
-    episodios_en_shockroom = db.query(ShockroomAsignacion.episodio_id).filter(
-        ShockroomAsignacion.fecha_salida.is_(None)
-    ).subquery()
+    )
     
-    candidatos = []
-    for episodio in episodios:
-        # Verificar si ya está en shockroom
-        ya_en_shockroom = db.query(ShockroomAsignacion).filter(
+    # Una sola consulta: episodios críticos que no estén en shockroom + paciente
+    filas = (await db.execute(
+        select(
+            Episodio.id.label("episodio_id"),
+            Episodio.color_triaje,
+            Episodio.motivo_consulta,
+            Episodio.fecha_inicio,
+            Paciente.id.label("paciente_id"),
+            Paciente.nombre_completo,
+            Paciente.dni,
+            Paciente.fecha_nacimiento
+        ).join(
+            Paciente, Episodio.paciente_id == Paciente.id
+        ).where(
             and_(
-                ShockroomAsignacion.episodio_id == episodio.id,
-                ShockroomAsignacion.fecha_salida.is_(None)
+                Episodio.hospital_id == hospital_id,
+                Episodio.estado.in_(ESTADOS_CANDIDATOS_SHOCKROOM),
+                Episodio.color_triaje.in_(["ROJO", "NARANJA"]),
+                ~ya_en_shockroom
             )
-        ).first()
+        ).order_by(Episodio.prioridad_triaje, Episodio.fecha_inicio)
+    )).all()
+    
+    ahora = datetime.utcnow()
+    candidatos = []
+    for fila in filas:
+        # Calcular edad
+        edad = None
+        if fila.fecha_nacimiento:
+            edad = ahora.year - fila.fecha_nacimiento.year
+        
+        # Calcular tiempo de espera
+        tiempo_espera = int((ahora - fila.fecha_inicio).total_seconds() / 60)
         
-        if not ya_en_shockroom:
-            paciente = db.query(Paciente).filter(Paciente.id == episodio.paciente_id).first()
-            if paciente:
-                # Calcular edad
-                edad = None
-                if paciente.fecha_nacimiento:
-                    edad = datetime.utcnow().year - paciente.fecha_nacimiento.year
-                
-                # Calcular tiempo de espera
-                tiempo_espera = int((datetime.utcnow() - episodio.fecha_inicio).total_seconds() / 60)
-                
-                candidatos.append(ShockroomPacienteInfo(
-                    episodio_id=episodio.id,
-                    paciente_id=paciente.id,
-                    paciente_nombre=paciente.nombre_completo or f"{paciente.primer_nombre} {paciente.primer_apellido}",
-                    paciente_dni=paciente.dni,
-                    edad=edad,
-                    triaje_color=episodio.color_triaje,
-                    motivo_consulta=episodio.motivo_consulta,
-                    tiempo_espera=tiempo_espera,
-                    puede_asignar_shockroom=True
-                ))
-    
-    return candidatos 
\ No newline at end of file
+        candidatos.append(ShockroomPacienteInfo(
+            episodio_id=fila.episodio_id,
+            paciente_id=fila.paciente_id,
+            paciente_nombre=fila.nombre_completo,
+            paciente_dni=fila.dni,
+            edad=edad,
+            triaje_color=fila.color_triaje,
+            motivo_consulta=fila.motivo_consulta,
+            tiempo_espera=tiempo_espera,
+            puede_asignar_shockroom=True
+        ))
+    
+    return candidatos
\ No newline at end of file
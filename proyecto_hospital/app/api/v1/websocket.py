@@ -1,5 +1,6 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
 from fastapi.security import HTTPBearer
+from typing import Optional
 import logging
 import sys
 import os
@@ -7,6 +8,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../..'))
 from websocket.manager import manager
 from app.core.security import decode_token
+from app.services.auth_service import AuthService
 import json
 
 logger = logging.getLogger(__name__)
@@ -34,7 +36,7 @@ async def websocket_endpoint(
     # Validar token de autenticación
     try:
         payload = decode_token(token)
-        if not payload:
+        if not payload or AuthService.esta_revocado(payload.get("user_id")):
             await websocket.close(code=4001, reason="Token inválido")
             return
             
@@ -49,19 +51,20 @@ async def websocket_endpoint(
         await websocket.close(code=4003, reason="Error de autenticación")
         return
     
-    # Conectar usuario
-    await manager.connect(websocket, user_id, role, area)
+    # Conectar usuario (las salas se indexan por hospital del token)
+    hospital_id = payload.get("hospital_id")
+    await manager.connect(websocket, user_id, role, area, hospital_id)
     
     try:
         # Enviar mensaje de bienvenida
-        await manager.send_to_user(user_id, {
+        await manager.send_local(user_id, {
             "type": "connection_success",
             "data": {
                 "message": f"Conectado exitosamente como {role} en área {area}",
                 "user_id": user_id,
                 "role": role,
                 "area": area,
-                "stats": manager.get_connection_stats()
+                "stats": manager.get_connection_stats(hospital_id)
             }
         })
         
@@ -74,14 +77,14 @@ async def websocket_endpoint(
                 
                 # Manejar diferentes tipos de mensajes
                 if message.get("type") == "ping":
-                    await manager.send_to_user(user_id, {
+                    await manager.send_local(user_id, {
                         "type": "pong",
                         "data": {"timestamp": manager.get_connection_stats()["timestamp"]}
                     })
                 elif message.get("type") == "get_stats":
-                    await manager.send_to_user(user_id, {
+                    await manager.send_local(user_id, {
                         "type": "stats",
-                        "data": manager.get_connection_stats()
+                        "data": manager.get_connection_stats(hospital_id)
                     })
                 else:
                     logger.debug(f"Mensaje recibido de {user_id}: {message}")
@@ -98,15 +101,18 @@ async def websocket_endpoint(
         await manager.disconnect(websocket, user_id, role, area)
 
 @router.get("/ws/stats")
-async def get_websocket_stats():
+async def get_websocket_stats(
+    hospital_id: Optional[str] = Query(None, description="Limitar a un hospital")
+):
     """Obtener estadísticas de conexiones WebSocket"""
-    return manager.get_connection_stats()
+    return manager.get_connection_stats(hospital_id)
 
 @router.post("/ws/broadcast")
 async def broadcast_message(
     message: dict,
     target_type: str = Query(..., description="Tipo de broadcast: all, role, area, user"),
     target_value: str = Query(None, description="Valor del target (role, area o user_id)"),
+    hospital_id: Optional[str] = Query(None, description="Hospital destino (todos si se omite)"),
     # current_user: dict = Depends(get_current_user)  # Uncomment when auth is ready
 ):
     """
@@ -120,14 +126,14 @@ async def broadcast_message(
     
     try:
         if target_type == "all":
-            await manager.broadcast_all(message)
+            await manager.broadcast_all(message, hospital_id)
         elif target_type == "role":
             if target_value == "medico":
-                await manager.broadcast_to_doctors_in_area("emergencia", message)
+                await manager.broadcast_to_doctors_in_area("emergencia", message, hospital_id)
             elif target_value == "enfermera":
-                await manager.broadcast_to_nurses(message)
+                await manager.broadcast_to_nurses(message, hospital_id)
         elif target_type == "area":
-            await manager.broadcast_to_area(target_value, message)
+            await manager.broadcast_to_area(target_value, message, hospital_id)
         elif target_type == "user":
             await manager.send_to_user(target_value, message)
         else:
@@ -140,7 +146,7 @@ async def broadcast_message(
         return {"error": str(e)}
 
 # Funciones helper para usar en otros módulos
-async def notify_patient_update(patient_id: str, action: str, data: dict):
+async def notify_patient_update(patient_id: str, action: str, data: dict, hospital_id: Optional[str] = None):
     """Notificar actualización de paciente a todos los usuarios del área"""
     message = {
         "type": "patient_update",
@@ -151,11 +157,11 @@ async def notify_patient_update(patient_id: str, action: str, data: dict):
         }
     }
     try:
-        await manager.broadcast_to_area("emergencia", message)
+        await manager.broadcast_to_area("emergencia", message, hospital_id)
     except Exception as e:
         logger.error(f"❌ Error en notify_patient_update: {e}")
 
-async def notify_prescription_update(prescription_id: str, patient_id: str, action: str, nurse_id: str = None):
+async def notify_prescription_update(prescription_id: str, patient_id: str, action: str, nurse_id: str = None, hospital_id: Optional[str] = None):
     """Notificar actualización de prescripción"""
     message = {
         "type": "prescription_update", 
@@ -169,14 +175,14 @@ async def notify_prescription_update(prescription_id: str, patient_id: str, acti
     
     try:
         # Notificar a enfermeras
-        await manager.broadcast_to_nurses(message)
+        await manager.broadcast_to_nurses(message, hospital_id)
         
         # También notificar a médicos del área
-        await manager.broadcast_to_doctors_in_area("emergencia", message)
+        await manager.broadcast_to_doctors_in_area("emergencia", message, hospital_id)
     except Exception as e:
         logger.error(f"❌ Error en notify_prescription_update: {e}")
 
-async def notify_list_update(list_type: str, action: str, item_id: str):
+async def notify_list_update(list_type: str, action: str, item_id: str, hospital_id: Optional[str] = None):
     """Notificar actualización de listas (espera, triaje, etc.)"""
     message = {
         "type": "list_update",
@@ -187,11 +193,11 @@ async def notify_list_update(list_type: str, action: str, item_id: str):
         }
     }
     try:
-        await manager.broadcast_to_area("emergencia", message)
+        await manager.broadcast_to_area("emergencia", message, hospital_id)
     except Exception as e:
         logger.error(f"❌ Error en notify_list_update: {e}")
 
-async def send_alert_to_doctors(alert_message: str, priority: str = "normal"):
+async def send_alert_to_doctors(alert_message: str, priority: str = "normal", hospital_id: Optional[str] = None):
     """Enviar alerta a todos los médicos"""
     message = {
         "type": "alert",
@@ -202,6 +208,6 @@ async def send_alert_to_doctors(alert_message: str, priority: str = "normal"):
         }
     }
     try:
-        await manager.broadcast_to_doctors_in_area("emergencia", message)
+        await manager.broadcast_to_doctors_in_area("emergencia", message, hospital_id)
     except Exception as e:
         logger.error(f"❌ Error en send_alert_to_doctors: {e}") 
\ No newline at end of file
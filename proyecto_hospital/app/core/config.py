@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,6 +7,40 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480
+    AUTH_CACHE_TTL_SECONDS: int = 60  # 0 desactiva la caché de usuarios autenticados
+    
+    # Pool de conexiones (PostgreSQL)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True
+    
+    # WebSocket: cola de salida por conexión
+    WS_COLA_MAXIMA: int = 100  # mensajes pendientes por socket
+    WS_TIMEOUT_ENVIO: float = 5.0  # segundos por envío antes de dar el socket por caído
+    WS_MAX_DESCARTES: int = 50  # descartes seguidos antes de desconectar a un cliente lento
+    WS_BROKER: str = "local"  # local (un worker) o unix (varios workers en el mismo host)
+    WS_BROKER_DIR: str = "/tmp/hospital_ws_broker"
+    
+    # CORS y logging
+    CORS_ORIGENES: List[str] = [
+        "http://localhost:3000",
+        "http://localhost:3001",
+        "http://127.0.0.1:3000",
+        "http://127.0.0.1:3001",
+        "http://192.168.0.25:3000",
+        "http://192.168.0.25:3001"
+    ]
+    LOG_LEVEL: str = "DEBUG"  # INFO en producción: DEBUG escribe cada solicitud con sus cabeceras
+    
+    # Estadísticas pre-agregadas
+    ESTADISTICAS_CONCILIACION_SEGUNDOS: int = 300  # recálculo completo desde la base de datos
+    COLA_TRIAJE_RECONSTRUCCION_SEGUNDOS: int = 60  # recarga de la cola en memoria (eventos perdidos)
+    
+    # SQLite (desarrollo)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB, 0 desactiva mmap
     
     class Config:
         env_file = ".env"
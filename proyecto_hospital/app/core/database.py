@@ -1,10 +1,175 @@
-from sqlalchemy import create_engine
+import time
+from threading import Lock
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
+from app.core.metricas import registrar_consultas
+
+class MetricasPool:
+    """Contadores de uso del pool de conexiones"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.checkouts = 0
+            self.conexiones_creadas = 0
+            self.conexiones_invalidadas = 0
+            self.timeouts = 0
+            self.espera_total_ms = 0.0
+            self.espera_max_ms = 0.0
+
+    def registrar_espera(self, segundos: float, timeout: bool = False):
+        ms = segundos * 1000
+        with self._lock:
+            self.espera_total_ms += ms
+            self.espera_max_ms = max(self.espera_max_ms, ms)
+            if timeout:
+                self.timeouts += 1
+
+    def incrementar(self, contador: str):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+metricas_pool = MetricasPool()
+
+class _EsperaMedida:
+    """Mide el tiempo de espera por una conexión libre del pool"""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except Exception:
+            metricas_pool.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        metricas_pool.registrar_espera(time.perf_counter() - inicio)
+        return conexion
+
+class QueuePoolMedido(_EsperaMedida, QueuePool):
+    # Mantener el logger bajo "sqlalchemy" (nivel WARN por defecto)
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.QueuePool"
+
+class AsyncQueuePoolMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+def _configurar_sqlite(engine, en_memoria: bool):
+    @event.listens_for(engine, "connect")
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not en_memoria:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            if settings.SQLITE_MMAP_SIZE:
+                cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+def _registrar_metricas(engine):
+    @event.listens_for(engine, "connect")
+    def al_conectar(dbapi_connection, connection_record):
+        metricas_pool.incrementar("conexiones_creadas")
+
+    @event.listens_for(engine, "checkout")
+    def al_prestar(dbapi_connection, connection_record, connection_proxy):
+        metricas_pool.incrementar("checkouts")
+
+    @event.listens_for(engine, "invalidate")
+    def al_invalidar(dbapi_connection, connection_record, exception):
+        metricas_pool.incrementar("conexiones_invalidadas")
 
-engine = create_engine(settings.DATABASE_URL)
+    # Consultas y tiempo en la base de datos por solicitud HTTP (app/core/metricas.py)
+    registrar_consultas(engine)
+
+# Driver async equivalente a cada dialecto síncrono
+DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _opciones_engine(url, poolclass) -> dict:
+    if url.get_backend_name() == "sqlite":
+        opciones = {
+            # Las conexiones del pool se usan desde distintos hilos
+            "connect_args": {"check_same_thread": False},
+        }
+        if not _sqlite_en_memoria(url):
+            opciones["poolclass"] = poolclass
+        return opciones
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _sqlite_en_memoria(url) -> bool:
+    return url.database in (None, "", ":memory:")
+
+def crear_engine(database_url: str):
+    """Crear el engine con el pool y los ajustes propios de cada dialecto"""
+    url = make_url(database_url)
+    engine = create_engine(url, **_opciones_engine(url, QueuePoolMedido))
+
+    if url.get_backend_name() == "sqlite":
+        _configurar_sqlite(engine, _sqlite_en_memoria(url))
+    _registrar_metricas(engine)
+    return engine
+
+def crear_async_engine(database_url: str):
+    """Engine async (asyncpg / aiosqlite) con la misma configuración de pool"""
+    url = make_url(database_url)
+    url = url.set(drivername=DRIVERS_ASYNC.get(url.get_backend_name(), url.drivername))
+    engine = create_async_engine(url, **_opciones_engine(url, AsyncQueuePoolMedido))
+
+    # Los eventos de pool y conexión se registran en el engine síncrono subyacente
+    if url.get_backend_name() == "sqlite":
+        _configurar_sqlite(engine.sync_engine, _sqlite_en_memoria(url))
+    _registrar_metricas(engine.sync_engine)
+    return engine
+
+def _estado_pool(pool) -> dict:
+    estado = {"tipo": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        estado.update({
+            "tamano": pool.size(),
+            "en_uso": pool.checkedout(),
+            "disponibles": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    return estado
+
+def estadisticas_pool() -> dict:
+    """Estado actual de los pools y contadores acumulados (compartidos)"""
+    return {
+        "sync": _estado_pool(engine.pool),
+        "async": _estado_pool(async_engine.sync_engine.pool),
+        "checkouts": metricas_pool.checkouts,
+        "conexiones_creadas": metricas_pool.conexiones_creadas,
+        "conexiones_invalidadas": metricas_pool.conexiones_invalidadas,
+        "timeouts": metricas_pool.timeouts,
+        "espera_total_ms": round(metricas_pool.espera_total_ms, 2),
+        "espera_max_ms": round(metricas_pool.espera_max_ms, 2),
+    }
+
+engine = crear_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Sesiones async para los routers que no deben bloquear el event loop.
+# expire_on_commit=False: los objetos siguen legibles tras el commit sin
+# recargas implícitas (que en async no están permitidas).
+async_engine = crear_async_engine(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -12,4 +177,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+def utc_sin_zona(fecha: Optional[datetime]) -> Optional[datetime]:
+    """Las columnas DateTime guardan UTC sin zona horaria.
+
+    Un parámetro con zona ("...Z", "...-03:00") se convierte a UTC y se le
+    quita la zona antes de compararlo: en SQLite la comparación sería de
+    texto con el desfase incluido y asyncpg rechaza mezclar ambos tipos.
+    Las fechas sin zona se asumen ya en UTC.
+    """
+    if fecha is not None and fecha.tzinfo is not None:
+        return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
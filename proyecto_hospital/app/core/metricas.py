@@ -0,0 +1,224 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiqueta para las solicitudes que no coinciden con ninguna ruta (404):
+# usar el path crudo dispararía la cardinalidad de las series
+SIN_RUTA = "sin_ruta"
+
+CONTENT_TYPE_METRICAS = "text/plain; version=0.0.4"  # Starlette agrega el charset
+
+class ConsumoSolicitud:
+    """Consultas SQL y tiempo en la base de datos de la solicitud en curso"""
+
+    __slots__ = ("consultas", "segundos_db")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_db = 0.0
+
+# Consumo de la solicitud actual. El objeto es mutable, así que los hilos del
+# threadpool (que reciben una copia del contexto) suman sobre el mismo.
+_solicitud_actual: ContextVar[Optional[ConsumoSolicitud]] = ContextVar("solicitud_actual", default=None)
+
+_CLAVE_INICIO = "metricas_inicio_consulta"
+
+def registrar_consultas(engine):
+    """Medir cada consulta del engine (síncrono) y acumularla en la solicitud en curso"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        conn.info[_CLAVE_INICIO] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        solicitud = _solicitud_actual.get()
+        inicio = conn.info.pop(_CLAVE_INICIO, None)
+        if solicitud is not None and inicio is not None:
+            solicitud.consultas += 1
+            solicitud.segundos_db += time.perf_counter() - inicio
+
+class Histograma:
+    __slots__ = ("cuentas", "suma", "total")
+
+    def __init__(self):
+        self.cuentas = [0] * (len(BUCKETS_LATENCIA) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect_left(BUCKETS_LATENCIA, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+def _etiquetas(**valores) -> str:
+    partes = []
+    for nombre, valor in valores.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+class Metricas:
+    """Registro de métricas del proceso, exportado en formato de texto Prometheus.
+
+    Solo el event loop escribe en él (al terminar cada solicitud), por lo que
+    no necesita lock. Cada worker expone sus propias series; Prometheus las
+    distingue por instancia.
+    """
+
+    def __init__(self):
+        self.solicitudes: Dict[Tuple[str, str, int], int] = {}
+        self.latencias: Dict[Tuple[str, str], Histograma] = {}
+        self.consultas_db: Dict[Tuple[str, str], int] = {}
+        self.segundos_db: Dict[Tuple[str, str], float] = {}
+        self.en_curso = 0
+        self.websockets: Dict[str, int] = {}
+
+    def observar(self, metodo: str, ruta: str, estado: int, duracion: float, consumo: ConsumoSolicitud):
+        clave = (metodo, ruta)
+        self.solicitudes[(metodo, ruta, estado)] = self.solicitudes.get((metodo, ruta, estado), 0) + 1
+        histograma = self.latencias.get(clave)
+        if histograma is None:
+            histograma = self.latencias[clave] = Histograma()
+        histograma.observar(duracion)
+        self.consultas_db[clave] = self.consultas_db.get(clave, 0) + consumo.consultas
+        self.segundos_db[clave] = self.segundos_db.get(clave, 0.0) + consumo.segundos_db
+
+    def exportar(self, adicionales: Iterable[Tuple[str, str, str, float]] = ()) -> str:
+        """Texto de exposición; `adicionales` son (nombre, tipo, ayuda, valor) sin etiquetas"""
+        lineas = [
+            "# HELP hospital_http_solicitudes_total Solicitudes HTTP atendidas",
+            "# TYPE hospital_http_solicitudes_total counter",
+        ]
+        for (metodo, ruta, estado), valor in self.solicitudes.items():
+            lineas.append(f"hospital_http_solicitudes_total{_etiquetas(metodo=metodo, ruta=ruta, estado=estado)} {valor}")
+
+        lineas += [
+            "# HELP hospital_http_duracion_segundos Latencia de las solicitudes HTTP hasta el envío de las cabeceras",
+            "# TYPE hospital_http_duracion_segundos histogram",
+        ]
+        for (metodo, ruta), histograma in self.latencias.items():
+            acumulado = 0
+            for limite, cuenta in zip(BUCKETS_LATENCIA + ("+Inf",), histograma.cuentas):
+                acumulado += cuenta
+                lineas.append(f"hospital_http_duracion_segundos_bucket{_etiquetas(metodo=metodo, ruta=ruta, le=limite)} {acumulado}")
+            lineas.append(f"hospital_http_duracion_segundos_sum{_etiquetas(metodo=metodo, ruta=ruta)} {histograma.suma:.6f}")
+            lineas.append(f"hospital_http_duracion_segundos_count{_etiquetas(metodo=metodo, ruta=ruta)} {histograma.total}")
+
+        lineas += [
+            "# HELP hospital_http_en_curso Solicitudes HTTP en curso",
+            "# TYPE hospital_http_en_curso gauge",
+            f"hospital_http_en_curso {self.en_curso}",
+            "# HELP hospital_db_consultas_total Consultas SQL ejecutadas por solicitudes HTTP",
+            "# TYPE hospital_db_consultas_total counter",
+        ]
+        for (metodo, ruta), valor in self.consultas_db.items():
+            lineas.append(f"hospital_db_consultas_total{_etiquetas(metodo=metodo, ruta=ruta)} {valor}")
+
+        lineas += [
+            "# HELP hospital_db_duracion_segundos_total Tiempo en la base de datos de las solicitudes HTTP",
+            "# TYPE hospital_db_duracion_segundos_total counter",
+        ]
+        for (metodo, ruta), valor in self.segundos_db.items():
+            lineas.append(f"hospital_db_duracion_segundos_total{_etiquetas(metodo=metodo, ruta=ruta)} {valor:.6f}")
+
+        lineas += [
+            "# HELP hospital_websocket_conexiones Conexiones WebSocket abiertas",
+            "# TYPE hospital_websocket_conexiones gauge",
+        ]
+        for ruta, valor in self.websockets.items():
+            lineas.append(f"hospital_websocket_conexiones{_etiquetas(ruta=ruta)} {valor}")
+
+        for nombre, tipo, ayuda, valor in adicionales:
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {valor}"]
+
+        return "\n".join(lineas) + "\n"
+
+# Registro global del proceso
+metricas = Metricas()
+
+def _ruta(scope) -> str:
+    """Plantilla de la ruta resuelta por el router (p. ej. /episodios/{episodio_id}/triaje)"""
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or SIN_RUTA
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro de instrumentación.
+
+    Por solicitud HTTP mide la latencia hasta las cabeceras de respuesta (y la
+    publica en X-Process-Time), cuenta las consultas SQL y su tiempo, y lo
+    agrega por método y plantilla de ruta. Por WebSocket mantiene el gauge de
+    conexiones aceptadas. No envuelve el cuerpo de la respuesta, así que los
+    streams siguen sin buffer.
+    """
+
+    def __init__(self, app, registro: Metricas = metricas):
+        self.app = app
+        self.metricas = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            await self._http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _http(self, scope, receive, send):
+        inicio = time.perf_counter()
+        consumo = ConsumoSolicitud()
+        token = _solicitud_actual.set(consumo)
+        estado = 500
+        duracion = None
+
+        async def enviar(mensaje):
+            nonlocal estado, duracion
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                duracion = time.perf_counter() - inicio
+                mensaje["headers"] = [
+                    *mensaje.get("headers", ()),
+                    (b"x-process-time", f"{duracion:.6f}".encode("ascii"))
+                ]
+            await send(mensaje)
+
+        self.metricas.en_curso += 1
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.metricas.en_curso -= 1
+            _solicitud_actual.reset(token)
+            if duracion is None:
+                duracion = time.perf_counter() - inicio
+            ruta = _ruta(scope)
+            self.metricas.observar(scope["method"], ruta, estado, duracion, consumo)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"📤 {scope['method']} {scope['path']} -> {estado} en {duracion * 1000:.1f} ms "
+                    f"({consumo.consultas} consultas, {consumo.segundos_db * 1000:.1f} ms en DB)"
+                )
+
+    async def _websocket(self, scope, receive, send):
+        ruta = None
+
+        async def enviar(mensaje):
+            nonlocal ruta
+            if mensaje["type"] == "websocket.accept" and ruta is None:
+                ruta = _ruta(scope)
+                self.metricas.websockets[ruta] = self.metricas.websockets.get(ruta, 0) + 1
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if ruta is not None:
+                self.metricas.websockets[ruta] -= 1
@@ -0,0 +1,102 @@
+from typing import Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras que no se escriben en el log de depuración
+CABECERAS_OCULTAS = {"authorization", "cookie"}
+
+class MiddlewareCors:
+    """Middleware ASGI puro para CORS y el log de solicitudes.
+
+    Reemplaza a CORSMiddleware y a los middlewares @app.middleware("http")
+    anteriores, que envolvían cada respuesta en BaseHTTPMiddleware. Los
+    orígenes se guardan en un frozenset y las cabeceras ya codificadas, así
+    que por solicitud solo se busca la cabecera Origin y se agregan tuplas a
+    la respuesta, que pasa sin buffer. El contexto del hospital se valida en
+    las dependencias de autenticación de cada endpoint.
+    """
+
+    def __init__(
+        self,
+        app,
+        origenes: Iterable[str],
+        metodos: Iterable[str],
+        cabeceras: Iterable[str],
+        exponer: Iterable[str] = (),
+        max_age: int = 3600
+    ):
+        self.app = app
+        self.origenes = frozenset(origen.encode("latin-1") for origen in origenes)
+        self.cabeceras_respuesta = [
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-expose-headers", ", ".join(exponer).encode("latin-1")),
+        ]
+        self.cabeceras_preflight = [
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-allow-methods", ", ".join(metodos).encode("latin-1")),
+            (b"access-control-allow-headers", ", ".join(cabeceras).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origen = None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"origin":
+                origen = valor
+                break
+        permitido = origen in self.origenes
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"📥 {scope['method']} {scope['path']}")
+            logger.debug(f"Headers: {self._cabeceras_log(scope)}")
+
+        if scope["method"] == "OPTIONS":
+            await self._preflight(send, origen if permitido else None)
+            return
+
+        if not permitido:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", ()))
+                cabeceras.append((b"access-control-allow-origin", origen))
+                cabeceras.extend(self.cabeceras_respuesta)
+                for i, (nombre, valor) in enumerate(cabeceras):
+                    if nombre.lower() == b"vary":
+                        cabeceras[i] = (nombre, valor + b", Origin")
+                        break
+                else:
+                    cabeceras.append((b"vary", b"Origin"))
+                mensaje["headers"] = cabeceras
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+    async def _preflight(self, send, origen):
+        """Responder cualquier OPTIONS sin llegar al router (con CORS solo si el origen es válido)"""
+        cuerpo = b'{"status":"ok"}'
+        cabeceras = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode("latin-1")),
+        ]
+        if origen is not None:
+            cabeceras.append((b"access-control-allow-origin", origen))
+            cabeceras.extend(self.cabeceras_preflight)
+            cabeceras.append((b"vary", b"Origin"))
+        await send({"type": "http.response.start", "status": 200, "headers": cabeceras})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    @staticmethod
+    def _cabeceras_log(scope) -> dict:
+        registro = {}
+        for nombre, valor in scope["headers"]:
+            nombre = nombre.decode("latin-1")
+            registro[nombre] = "***" if nombre in CABECERAS_OCULTAS else valor.decode("latin-1")
+        return registro
@@ -0,0 +1,84 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Callable, List, Optional
+import json
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+# Cabecera con el cursor de la página siguiente (ausente en la última página)
+CABECERA_CURSOR = "X-Next-Cursor"
+
+def codificar_cursor(*valores) -> str:
+    """Cursor opaco (base64 url-safe de una lista JSON) con la clave de la última fila"""
+    datos = json.dumps(
+        [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores],
+        separators=(",", ":")
+    )
+    return urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: str) -> list:
+    try:
+        valores = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        valores = None
+    if not isinstance(valores, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return valores
+
+class Paginacion:
+    """Contrato de paginación por keyset común a todos los listados.
+
+    El cliente pide ?limit= (por defecto 100, máximo 500) y recibe la página
+    más la cabecera X-Next-Cursor si hay más filas; para la página siguiente
+    repite la petición con ?cursor=<valor de la cabecera>. A diferencia de
+    OFFSET, la base de datos posiciona el cursor con el índice compuesto y el
+    costo de cada página no crece con la antigüedad de los datos.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO, description="Máximo de elementos por página"),
+        cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    def clave(self, *tipos) -> Optional[tuple]:
+        """Valores del cursor convertidos a `tipos` (datetime, int, str...), o None en la primera página"""
+        if not self.cursor:
+            return None
+        valores = decodificar_cursor(self.cursor)
+        try:
+            if len(valores) != len(tipos):
+                raise ValueError
+            return tuple(
+                datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+                for valor, tipo in zip(valores, tipos)
+            )
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginación inválido"
+            )
+
+    def keyset(self, query, columna_fecha, columna_id):
+        """Aplicar a una consulta (Query o select) el orden (fecha, id) descendente,
+        la condición del cursor y el límite (+1 para saber si hay otra página)"""
+        clave = self.clave(datetime, str)
+        if clave:
+            query = query.where(tuple_(columna_fecha, columna_id) < tuple_(*clave))
+        return query.order_by(columna_fecha.desc(), columna_id.desc()).limit(self.limit + 1)
+
+    def pagina(self, filas: List, response: Response, clave: Callable[[object], tuple]) -> List:
+        """Recortar a `limit` filas y publicar el cursor de la siguiente página"""
+        if len(filas) > self.limit:
+            filas = filas[:self.limit]
+            response.headers[CABECERA_CURSOR] = codificar_cursor(*clave(filas[-1]))
+        return filas
@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Integer, cast, extract, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+class segundos_epoch(FunctionElement):
+    """Segundos desde 1970-01-01 de una columna DateTime, como entero.
+
+    SQLite no tiene EXTRACT(EPOCH ...) y PostgreSQL no tiene strftime('%s'),
+    así que la expresión se compila según el dialecto. Al ser entera, la
+    división `//` agrupa en intervalos en la propia base de datos.
+    """
+    type = Integer()
+    name = "segundos_epoch"
+    inherit_cache = True
+
+@compiles(segundos_epoch)
+def _segundos_epoch_postgresql(element, compiler, **kw):
+    columna = list(element.clauses)[0]
+    return compiler.process(cast(extract("epoch", columna), BigInteger), **kw)
+
+@compiles(segundos_epoch, "sqlite")
+def _segundos_epoch_sqlite(element, compiler, **kw):
+    columna = list(element.clauses)[0]
+    return compiler.process(cast(func.strftime("%s", columna), Integer), **kw)
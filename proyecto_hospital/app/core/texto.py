@@ -0,0 +1,17 @@
+from typing import Optional
+import re
+import unicodedata
+
+_SEPARADORES = re.compile(r"[\W_]+")
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """Minúsculas, sin tildes ni signos y con un espacio entre palabras.
+
+    Es la forma guardada en Paciente.nombre_normalizado y la que se usa para
+    buscar: "  José PÉREZ-Núñez " -> "jose perez nunez".
+    """
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+    return _SEPARADORES.sub(" ", sin_tildes.casefold()).strip()
@@ -1,22 +1,28 @@
 from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import logging
 from datetime import datetime
 
-from app.api.v1 import auth, pacientes, episodios, enfermeria, websocket, shockroom, codigos_emergencia
+from app.api.v1 import auth, pacientes, episodios, enfermeria, websocket, shockroom, codigos_emergencia, reportes
 from app.api.v1 import admision as admision_api
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base, estadisticas_pool
+from app.services.cola_triaje import cola_triaje
+from app.services.estadisticas import estadisticas
+from app.services.auth_service import AuthService
+from app.core.config import settings
+from app.core.metricas import CONTENT_TYPE_METRICAS, MiddlewareMetricas, metricas
+from app.core.middleware import MiddlewareCors
+from websocket.manager import manager as ws_manager
 
 # Importar todos los modelos para que SQLAlchemy los reconozca
 from app.models import hospital, usuario, paciente, episodio, admision, enfermeria as enfermeria_model, historia_clinica
-from app.models import shockroom as shockroom_models, codigo_emergencia
+from app.models import shockroom as shockroom_models, codigo_emergencia, atencion_medica
 
 # Configurar logging detallado
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=settings.LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -34,20 +40,12 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Configurar CORS con configuración mejorada para resolver NetworkError
+# CORS y log de solicitudes en un único middleware ASGI (app/core/middleware.py)
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:3001", 
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:3001",
-        "http://192.168.0.25:3000",
-        "http://192.168.0.25:3001"
-    ],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-    allow_headers=[
+    MiddlewareCors,
+    origenes=settings.CORS_ORIGENES,
+    metodos=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    cabeceras=[
         "authorization", 
         "content-type", 
         "cache-control",
@@ -56,87 +54,53 @@ app.add_middleware(
         "x-requested-with",
         "x-csrf-token"
     ],
-    expose_headers=["*"],
+    # Con credenciales el navegador no acepta "*": las cabeceras legibles van explícitas
+    exponer=["X-Next-Cursor", "X-Process-Time", "Content-Disposition"],
     max_age=3600
 )
 
-# Middleware para logging de requests
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Middleware para loguear todas las requests"""
-    start_time = time.time()
-    
-    # Log de la request entrante
-    logger.debug(f"📥 {request.method} {request.url.path}")
-    logger.debug(f"Headers: {dict(request.headers)}")
-    
-    # Procesar la request
-    response = await call_next(request)
-    
-    # Log del response
-    process_time = time.time() - start_time
-    logger.debug(f"📤 Status: {response.status_code} - Time: {process_time:.3f}s")
-    
-    return response
-
-# Middleware para asegurar headers CORS en todas las respuestas
-@app.middleware("http")
-async def ensure_cors_headers(request: Request, call_next):
-    """Middleware para asegurar headers CORS en todas las respuestas"""
-    allowed_origins = [
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "http://127.0.0.1:3000", 
-        "http://127.0.0.1:3001",
-        "http://192.168.0.25:3000",
-        "http://192.168.0.25:3001"
-    ]
-    allowed_headers = "authorization, content-type, cache-control, accept, origin, x-requested-with, x-csrf-token"
-    allowed_methods = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-
-    # Manejar preflight OPTIONS
-    if request.method == "OPTIONS":
-        response = JSONResponse(content={"status": "ok"})
-        origin = request.headers.get("origin")
-        if origin in allowed_origins:
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Allow-Methods"] = allowed_methods
-            response.headers["Access-Control-Allow-Headers"] = allowed_headers
-            response.headers["Access-Control-Max-Age"] = "3600"
-        return response
-
-    response = await call_next(request)
-
-    # Agregar headers CORS manualmente si no están presentes
-    origin = request.headers.get("origin")
-    if origin in allowed_origins:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = allowed_methods
-        response.headers["Access-Control-Allow-Headers"] = allowed_headers
-        response.headers["Access-Control-Expose-Headers"] = "*"
-        response.headers["Access-Control-Max-Age"] = "3600"
-
-    return response
-
-# Middleware para validar hospital_id en requests autenticadas
-@app.middleware("http")
-async def validate_hospital_context(request: Request, call_next):
-    """Middleware para validar el contexto del hospital en requests autenticadas"""
-    # Excluir rutas que no requieren validación de hospital
-    excluded_paths = ["/docs", "/redoc", "/openapi.json", "/auth/login", "/", "/health"]
-    
-    if request.url.path in excluded_paths or request.url.path.startswith("/docs"):
-        response = await call_next(request)
-    else:
-        # Para rutas protegidas, la validación se hace en los dependencies
-        response = await call_next(request)
-    
-    # Agregar header de tiempo de procesamiento
-    response.headers["X-Process-Time"] = str(time.time())
-    
-    return response
+# Instrumentación (latencia por ruta, consultas SQL, WebSockets y X-Process-Time).
+# Se agrega al final para quedar por fuera del resto de los middlewares.
+app.add_middleware(MiddlewareMetricas)
+
+@app.on_event("startup")
+async def reconstruir_cola_triaje():
+    """Cargar la cola de triaje en memoria y programar su reconstrucción periódica"""
+    cola_triaje.reconstruir()
+    app.state.reconstruccion_cola_triaje = asyncio.create_task(
+        cola_triaje.ciclo_reconstruccion(settings.COLA_TRIAJE_RECONSTRUCCION_SEGUNDOS)
+    )
+
+@app.on_event("startup")
+async def iniciar_estadisticas():
+    """Calcular los contadores de los tableros y programar su conciliación"""
+    estadisticas.conciliar()
+    app.state.conciliacion_estadisticas = asyncio.create_task(
+        estadisticas.ciclo_conciliacion(settings.ESTADISTICAS_CONCILIACION_SEGUNDOS)
+    )
+
+@app.on_event("startup")
+async def cargar_usuarios_revocados():
+    """Cargar los usuarios inactivos que get_verified_token debe rechazar"""
+    AuthService.cargar_revocados()
+
+@app.on_event("startup")
+async def iniciar_broker_websocket():
+    """Iniciar el transporte de broadcasts WebSocket entre workers"""
+    await ws_manager.iniciar()
+    # Réplica de los cambios de cola hechos por otros workers
+    ws_manager.suscribir(cola_triaje.aplicar_evento)
+    ws_manager.suscribir(estadisticas.aplicar_evento)
+    # Usuarios desactivados en otros workers salen de la caché de auth y pierden el acceso
+    ws_manager.suscribir(AuthService.aplicar_evento)
+
+@app.on_event("shutdown")
+async def cerrar_conexiones_async():
+    """Cerrar los WebSockets abiertos y el pool del engine async"""
+    app.state.conciliacion_estadisticas.cancel()
+    app.state.reconstruccion_cola_triaje.cancel()
+    await ws_manager.detener()
+    await async_engine.dispose()
 
 # Incluir routers
 app.include_router(
@@ -187,6 +151,12 @@ app.include_router(
     tags=["Códigos de Emergencia"]
 )
 
+app.include_router(
+    reportes.router,
+    prefix="/reportes",
+    tags=["Reportes"]
+)
+
 # Endpoint raíz
 @app.get("/")
 async def root():
@@ -213,8 +183,9 @@ async def health_check():
     try:
         # Verificar conexión a la base de datos
         from app.core.database import SessionLocal
+        from sqlalchemy import text
         db = SessionLocal()
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         db.close()
         db_status = "healthy"
     except Exception as e:
@@ -225,10 +196,30 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "database": db_status,
+        "pool": estadisticas_pool(),
         "version": "1.0.0",
         "workflow": "nuevo_workflow_implementado"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas del worker en formato de texto Prometheus"""
+    pool = estadisticas_pool()
+    conexiones = ws_manager.salas.get(("all", None), ())
+    adicionales = [
+        ("hospital_db_pool_checkouts_total", "counter", "Conexiones prestadas por los pools", pool["checkouts"]),
+        ("hospital_db_pool_timeouts_total", "counter", "Esperas por conexión que agotaron el timeout", pool["timeouts"]),
+        ("hospital_db_pool_espera_segundos_total", "counter", "Tiempo total esperando una conexión libre", pool["espera_total_ms"] / 1000),
+        ("hospital_websocket_clientes", "gauge", "Clientes WebSocket registrados en el manager", len(conexiones)),
+        ("hospital_websocket_mensajes_en_cola", "gauge", "Mensajes pendientes de envío a clientes WebSocket", sum(cliente.cola.qsize() for cliente in conexiones)),
+        ("hospital_websocket_mensajes_descartados_total", "counter", "Mensajes descartados por clientes lentos",
+         ws_manager.mensajes_descartados + sum(cliente.descartes_totales for cliente in conexiones)),
+    ]
+    for nombre_pool in ("sync", "async"):
+        if "en_uso" in pool[nombre_pool]:
+            adicionales.append((f"hospital_db_pool_{nombre_pool}_en_uso", "gauge", f"Conexiones en uso del pool {nombre_pool}", pool[nombre_pool]["en_uso"]))
+    return PlainTextResponse(metricas.exportar(adicionales), media_type=CONTENT_TYPE_METRICAS)
+
 # Manejar errores globalmente
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
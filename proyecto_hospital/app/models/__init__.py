@@ -6,8 +6,9 @@ from .episodio import Episodio
 from .admision import RegistroAdmision
 from .enfermeria import SignosVitales, RegistroEnfermeria
 from .historia_clinica import RegistroHistoriaClinica
-from .shockroom import ShockroomCama, ShockroomAsignacion, ShockroomAlerta
+from .shockroom import ShockroomCama, ShockroomAsignacion, ShockroomAlerta, ShockroomLecturaVital
 from .codigo_emergencia import CodigoEmergencia, EpisodioEmergencia
+from .atencion_medica import Prescripcion, Procedimiento, EstudioSolicitado, EvolucionMedica, IndicacionMonitoreo
 
 # Hacer disponibles todas las clases
 __all__ = [
@@ -22,6 +23,12 @@ __all__ = [
     "ShockroomCama",
     "ShockroomAsignacion", 
     "ShockroomAlerta",
+    "ShockroomLecturaVital",
     "CodigoEmergencia",
-    "EpisodioEmergencia"
+    "EpisodioEmergencia",
+    "Prescripcion",
+    "Procedimiento",
+    "EstudioSolicitado",
+    "EvolucionMedica",
+    "IndicacionMonitoreo"
 ] 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 import uuid
 from app.core.database import Base
@@ -29,6 +29,11 @@ class RegistroAdmision(Base):
     fecha_creacion = Column(DateTime, default=datetime.utcnow)
     fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Listado paginado por keyset (fecha_admision, id)
+        Index("ix_registros_admision_hospital_fecha", "hospital_id", "fecha_admision", "id"),
+    )
+    
     # Relaciones
     paciente = relationship("Paciente")
     episodio = relationship("Episodio")
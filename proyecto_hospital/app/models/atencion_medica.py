@@ -0,0 +1,125 @@
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Boolean, Index
+from sqlalchemy.orm import relationship
+import uuid
+from app.core.database import Base
+from datetime import datetime
+
+# Tablas de solo inserción para las indicaciones médicas de un episodio.
+# Reemplazan a las listas JSON de Episodio (prescripciones, procedimientos,
+# estudios_solicitados, evoluciones_medicas, indicaciones_monitoreo): cada
+# alta es un INSERT de una fila, sin reescribir el historial del episodio.
+
+class Prescripcion(Base):
+    __tablename__ = "prescripciones"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    episodio_id = Column(String(36), ForeignKey("episodios.id", ondelete="CASCADE"), nullable=False)
+    hospital_id = Column(String(10), ForeignKey("hospitales.id", ondelete="CASCADE"), nullable=False)
+    medicamento = Column(String(200), nullable=False)
+    dosis = Column(String(100))
+    frecuencia = Column(String(100))
+    via_administracion = Column(String(50))
+    duracion = Column(String(100))
+    observaciones = Column(Text)
+    estado = Column(String(20), default='pendiente')  # pendiente, administrada, suspendida
+    prescrito_por = Column(String(255))
+    fecha_prescripcion = Column(DateTime, nullable=False, default=datetime.utcnow)
+    administrado = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_prescripciones_episodio_fecha", "episodio_id", "fecha_prescripcion"),
+        Index("ix_prescripciones_episodio_estado", "episodio_id", "estado"),
+        Index("ix_prescripciones_hospital_estado", "hospital_id", "estado", "fecha_prescripcion"),
+    )
+
+    # Relaciones
+    episodio = relationship("Episodio")
+
+class Procedimiento(Base):
+    __tablename__ = "procedimientos"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    episodio_id = Column(String(36), ForeignKey("episodios.id", ondelete="CASCADE"), nullable=False)
+    hospital_id = Column(String(10), ForeignKey("hospitales.id", ondelete="CASCADE"), nullable=False)
+    nombre = Column(String(200), nullable=False)
+    descripcion = Column(Text)
+    prioridad = Column(String(20), default='normal')  # normal, urgente, critico
+    observaciones = Column(Text)
+    estado = Column(String(20), default='pendiente')  # pendiente, completado, cancelado
+    indicado_por = Column(String(255))
+    fecha_indicacion = Column(DateTime, nullable=False, default=datetime.utcnow)
+    completado = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_procedimientos_episodio_fecha", "episodio_id", "fecha_indicacion"),
+        Index("ix_procedimientos_episodio_estado", "episodio_id", "estado"),
+        Index("ix_procedimientos_hospital_estado", "hospital_id", "estado", "fecha_indicacion"),
+    )
+
+    # Relaciones
+    episodio = relationship("Episodio")
+
+class EstudioSolicitado(Base):
+    __tablename__ = "estudios_solicitados"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    episodio_id = Column(String(36), ForeignKey("episodios.id", ondelete="CASCADE"), nullable=False)
+    hospital_id = Column(String(10), ForeignKey("hospitales.id", ondelete="CASCADE"), nullable=False)
+    tipo = Column(String(50), nullable=False)  # laboratorio, radiologia, cardiologia, etc.
+    nombre = Column(String(200), nullable=False)
+    prioridad = Column(String(20), default='normal')
+    observaciones = Column(Text)
+    estado = Column(String(20), default='pendiente')  # pendiente, completado, cancelado
+    solicitado_por = Column(String(255))
+    fecha_solicitud = Column(DateTime, nullable=False, default=datetime.utcnow)
+    completado = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_estudios_solicitados_episodio_fecha", "episodio_id", "fecha_solicitud"),
+        Index("ix_estudios_solicitados_episodio_estado", "episodio_id", "estado"),
+        Index("ix_estudios_solicitados_hospital_estado", "hospital_id", "estado", "fecha_solicitud"),
+    )
+
+    # Relaciones
+    episodio = relationship("Episodio")
+
+class EvolucionMedica(Base):
+    __tablename__ = "evoluciones_medicas"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    episodio_id = Column(String(36), ForeignKey("episodios.id", ondelete="CASCADE"), nullable=False)
+    hospital_id = Column(String(10), ForeignKey("hospitales.id", ondelete="CASCADE"), nullable=False)
+    evolucion = Column(Text, nullable=False)
+    plan = Column(Text)
+    estado_paciente = Column(String(50), default='estable')
+    medico = Column(String(255))
+    fecha = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_evoluciones_medicas_episodio_fecha", "episodio_id", "fecha"),
+    )
+
+    # Relaciones
+    episodio = relationship("Episodio")
+
+class IndicacionMonitoreo(Base):
+    __tablename__ = "indicaciones_monitoreo"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    episodio_id = Column(String(36), ForeignKey("episodios.id", ondelete="CASCADE"), nullable=False)
+    hospital_id = Column(String(10), ForeignKey("hospitales.id", ondelete="CASCADE"), nullable=False)
+    tipo_control = Column(String(50), nullable=False)  # signos_vitales, presion, temperatura, etc.
+    frecuencia_minutos = Column(Integer, nullable=False)
+    observaciones = Column(Text)
+    estado = Column(String(20), default='activa')  # activa, suspendida
+    indicado_por = Column(String(255))
+    fecha_indicacion = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_indicaciones_monitoreo_episodio_fecha", "episodio_id", "fecha_indicacion"),
+        Index("ix_indicaciones_monitoreo_episodio_estado", "episodio_id", "estado"),
+        Index("ix_indicaciones_monitoreo_hospital_estado", "hospital_id", "estado", "fecha_indicacion"),
+    )
+
+    # Relaciones
+    episodio = relationship("Episodio")
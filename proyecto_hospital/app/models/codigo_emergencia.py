@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Boolean, Index, Integer
 from sqlalchemy.orm import relationship
 import uuid
 from app.core.database import Base
@@ -19,12 +19,19 @@ class CodigoEmergencia(Base):
     personal_respondio = Column(JSON)  # Lista de personal que respondió
     notas_evento = Column(Text)  # Notas del evento
     resultado = Column(String(100))  # exitoso, traslado, etc.
-    tiempo_respuesta = Column(String(20))  # Tiempo hasta primera respuesta
+    tiempo_respuesta = Column(String(20))  # Tiempo hasta primera respuesta ("3 min", legado)
+    segundos_primera_respuesta = Column(Integer)  # Activación -> primer respondedor
+    segundos_hasta_cierre = Column(Integer)  # Activación -> cierre
     
     # Datos del paciente (pueden agregarse después)
     paciente_id = Column(String(36), ForeignKey("pacientes.id", ondelete="SET NULL"), nullable=True)
     datos_paciente_temporales = Column(JSON)  # Si no se conoce el paciente inicialmente
     
+    __table_args__ = (
+        # Historial paginado por keyset (fecha_activacion, id) y estadísticas por ventana de fechas
+        Index("ix_codigos_emergencia_hospital_activacion", "hospital_id", "fecha_activacion", "id"),
+    )
+    
     # Relaciones
     hospital = relationship("Hospital")
     paciente = relationship("Paciente")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Float, Integer
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Float, Integer, Index
 from sqlalchemy.orm import relationship
 import uuid
 from app.core.database import Base
@@ -63,4 +63,18 @@ class RegistroEnfermeria(Base):
     
     # Relaciones
     episodio = relationship("Episodio")
-    hospital = relationship("Hospital") 
\ No newline at end of file
+    hospital = relationship("Hospital")
+
+# Índices para "último registro por episodio" (dashboard de enfermería)
+Index(
+    "ix_signos_vitales_episodio_hospital_fecha",
+    SignosVitales.episodio_id,
+    SignosVitales.hospital_id,
+    SignosVitales.fecha_hora_registro.desc()
+)
+Index(
+    "ix_registros_enfermeria_episodio_hospital_fecha",
+    RegistroEnfermeria.episodio_id,
+    RegistroEnfermeria.hospital_id,
+    RegistroEnfermeria.fecha_hora_registro.desc()
+)
\ No newline at end of file
@@ -1,9 +1,19 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Boolean, Integer, Index
+from sqlalchemy.orm import relationship, validates
 import uuid
 from app.core.database import Base
 from datetime import datetime
 
+# Prioridad clínica del color de triaje (menor = más urgente)
+PRIORIDAD_TRIAJE = {
+    "ROJO": 1,
+    "NARANJA": 2,
+    "AMARILLO": 3,
+    "VERDE": 4,
+    "AZUL": 5
+}
+SIN_TRIAJE = 6
+
 class Episodio(Base):
     __tablename__ = "episodios"
     
@@ -21,6 +31,7 @@ class Episodio(Base):
     
     # CAMPOS DE TRIAJE
     color_triaje = Column(String(20))  # ROJO, NARANJA, AMARILLO, VERDE, AZUL
+    prioridad_triaje = Column(Integer, default=SIN_TRIAJE)  # Derivada de color_triaje (1 = ROJO ... 6 = sin triaje)
     triaje_realizado_por = Column(String(255))  # Enfermera que hizo el triaje
     fecha_triaje = Column(DateTime)
     signos_vitales_triaje = Column(JSON)  # Signos vitales del triaje
@@ -39,6 +50,8 @@ class Episodio(Base):
     resumen_clinico = Column(Text)
     
     # PRESCRIPCIONES Y PROCEDIMIENTOS
+    # Legado: las altas nuevas van a las tablas de app/models/atencion_medica.py
+    # (ver migrar_atencion_medica.py). Estas columnas ya no se escriben.
     prescripciones = Column(JSON)  # Lista de medicamentos prescritos
     procedimientos = Column(JSON)  # Lista de procedimientos indicados
     estudios_solicitados = Column(JSON)  # Laboratorio, radiología, etc.
@@ -46,7 +59,7 @@ class Episodio(Base):
     evoluciones_enfermeria = Column(JSON)  # Evoluciones de enfermería
     
     # MONITOREO
-    indicaciones_monitoreo = Column(JSON)  # Frecuencia de signos vitales
+    indicaciones_monitoreo = Column(JSON)  # Legado: ver tabla indicaciones_monitoreo
     registros_signos_vitales = Column(JSON)  # Historial de signos vitales
     
     # SHOCKROOM
@@ -75,6 +88,19 @@ class Episodio(Base):
     # Campo JSON para datos adicionales
     datos_json = Column(JSON)
     
+    __table_args__ = (
+        # Lista médica / colas: rango por hospital y estado ya ordenado por prioridad
+        # y llegada, el mismo ORDER BY que las consultas y la cola en memoria
+        Index("ix_episodios_hospital_estado_prioridad_inicio", "hospital_id", "estado", "prioridad_triaje", "fecha_inicio"),
+        # Exportaciones y reportes por rango de fechas
+        Index("ix_episodios_hospital_fecha_inicio", "hospital_id", "fecha_inicio"),
+    )
+    
     # Relaciones
     paciente = relationship("Paciente", back_populates="episodios")
-    hospital = relationship("Hospital", back_populates="episodios") 
\ No newline at end of file
+    hospital = relationship("Hospital", back_populates="episodios")
+    
+    @validates("color_triaje")
+    def _sincronizar_prioridad_triaje(self, key, color):
+        self.prioridad_triaje = PRIORIDAD_TRIAJE.get(color, SIN_TRIAJE)
+        return color 
\ No newline at end of file
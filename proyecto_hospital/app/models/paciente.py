@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Date, DateTime, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import DDL, Column, String, Date, DateTime, Text, ForeignKey, Index, event, text
+from sqlalchemy.orm import relationship, validates
 import uuid
 from app.core.database import Base
+from app.core.texto import normalizar_texto
 from datetime import datetime
 
 class Paciente(Base):
@@ -10,6 +11,7 @@ class Paciente(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     dni = Column(String(20), unique=True, nullable=False, index=True)
     nombre_completo = Column(String(255), nullable=False)
+    nombre_normalizado = Column(String(255), index=True)  # nombre_completo sin tildes ni mayúsculas (búsqueda)
     fecha_nacimiento = Column(Date)
     sexo = Column(String(1))
     tipo_sangre = Column(String(5))
@@ -20,6 +22,19 @@ class Paciente(Base):
     # Relaciones
     episodios = relationship("Episodio", back_populates="paciente", cascade="all, delete-orphan")
     hospitales = relationship("PacienteHospital", back_populates="paciente", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Búsqueda aproximada por trigramas en PostgreSQL; en SQLite la cubre la tabla FTS5 pacientes_fts
+        Index(
+            "ix_pacientes_nombre_trigramas", "nombre_normalizado",
+            postgresql_using="gin", postgresql_ops={"nombre_normalizado": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+    
+    @validates("nombre_completo")
+    def _normalizar_nombre(self, clave, nombre):
+        self.nombre_normalizado = normalizar_texto(nombre)
+        return nombre
 
 class PacienteHospital(Base):
     __tablename__ = "pacientes_hospital"
@@ -43,5 +58,62 @@ class PacienteHospital(Base):
     contacto_emergencia_telefono = Column(String(30), nullable=True)
     contacto_emergencia_parentesco = Column(String(50), nullable=True)  # Padre, Madre, Cónyuge, etc.
     
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)  # Alta del paciente en el hospital
+    
+    __table_args__ = (
+        # Listado paginado por keyset (fecha_creacion, id)
+        Index("ix_pacientes_hospital_hospital_creacion", "hospital_id", "fecha_creacion", "id"),
+    )
+    
     paciente = relationship("Paciente", back_populates="hospitales")
-    hospital = relationship("Hospital", back_populates="pacientes_hospital") 
\ No newline at end of file
+    hospital = relationship("Hospital", back_populates="pacientes_hospital") 
+
+# Índice de texto completo de SQLite: tabla FTS5 con el contenido en pacientes
+# (se indexa por rowid) y triggers que la mantienen al día, incluso con
+# inserciones masivas. Después de un VACUUM ejecutar crear_indices_busqueda,
+# que la reconstruye.
+DDL_BUSQUEDA_SQLITE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pacientes_fts USING fts5(
+        nombre_normalizado, content='pacientes', prefix='2 3', tokenize='unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pacientes_fts_insertar AFTER INSERT ON pacientes BEGIN
+        INSERT INTO pacientes_fts(rowid, nombre_normalizado) VALUES (new.rowid, new.nombre_normalizado);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pacientes_fts_borrar AFTER DELETE ON pacientes BEGIN
+        INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre_normalizado)
+        VALUES ('delete', old.rowid, old.nombre_normalizado);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pacientes_fts_actualizar AFTER UPDATE OF nombre_normalizado ON pacientes BEGIN
+        INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre_normalizado)
+        VALUES ('delete', old.rowid, old.nombre_normalizado);
+        INSERT INTO pacientes_fts(rowid, nombre_normalizado) VALUES (new.rowid, new.nombre_normalizado);
+    END
+    """,
+]
+DDL_EXTENSION_TRIGRAMAS = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+event.listen(Paciente.__table__, "before_create", DDL(DDL_EXTENSION_TRIGRAMAS).execute_if(dialect="postgresql"))
+for _sentencia in DDL_BUSQUEDA_SQLITE:
+    event.listen(Paciente.__table__, "after_create", DDL(_sentencia).execute_if(dialect="sqlite"))
+event.listen(Paciente.__table__, "before_drop", DDL("DROP TABLE IF EXISTS pacientes_fts").execute_if(dialect="sqlite"))
+
+def crear_indices_busqueda(conexion):
+    """Crear (si faltan) los índices de búsqueda de pacientes en una base existente.
+
+    En SQLite además reconstruye pacientes_fts desde la tabla pacientes. El
+    índice de trigramas de PostgreSQL se crea con los demás índices del modelo.
+    """
+    dialecto = conexion.dialect.name
+    if dialecto == "postgresql":
+        conexion.execute(text(DDL_EXTENSION_TRIGRAMAS))
+    elif dialecto == "sqlite":
+        for sentencia in DDL_BUSQUEDA_SQLITE:
+            conexion.execute(text(sentencia))
+        conexion.execute(text("INSERT INTO pacientes_fts(pacientes_fts) VALUES ('rebuild')"))
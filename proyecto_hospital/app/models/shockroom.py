@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, JSON, Integer, Float, Boolean, Index
 from sqlalchemy.orm import relationship
 import uuid
 from app.core.database import Base
@@ -19,6 +19,11 @@ class ShockroomCama(Base):
     fecha_creacion = Column(DateTime, default=datetime.utcnow)
     fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Tablero de camas y modo delta (?since=)
+        Index("ix_shockroom_camas_hospital_actualizacion", "hospital_id", "fecha_actualizacion"),
+    )
+    
     # Relaciones
     hospital = relationship("Hospital", back_populates="shockroom_camas")
     asignaciones = relationship("ShockroomAsignacion", back_populates="cama")
@@ -40,12 +45,18 @@ class ShockroomAsignacion(Base):
     monitoreo_continuo = Column(Boolean, default=True)
     equipos_utilizados = Column(JSON)  # Lista de equipos en uso
     observaciones = Column(Text)
-    datos_monitorizacion = Column(JSON)  # Signos vitales y monitoreo
+    datos_monitorizacion = Column(JSON)  # Legado: ver ShockroomLecturaVital
+    
+    __table_args__ = (
+        # Búsqueda de asignaciones abiertas (fecha_salida IS NULL) por episodio
+        Index("ix_shockroom_asignaciones_episodio_salida", "episodio_id", "fecha_salida"),
+    )
     
     # Relaciones
     cama = relationship("ShockroomCama", back_populates="asignaciones")
     episodio = relationship("Episodio")
     paciente = relationship("Paciente")
+    lecturas = relationship("ShockroomLecturaVital", back_populates="asignacion", lazy="noload")
 
 class ShockroomAlerta(Base):
     __tablename__ = "shockroom_alertas"
@@ -63,5 +74,34 @@ class ShockroomAlerta(Base):
     fecha_atencion = Column(DateTime)
     fecha_cierre = Column(DateTime)
     
+    __table_args__ = (
+        Index("ix_shockroom_alertas_asignacion_estado", "asignacion_id", "estado"),
+        # Listado paginado por keyset (fecha_creacion, id) filtrado por estado
+        Index("ix_shockroom_alertas_estado_creacion", "estado", "fecha_creacion", "id"),
+    )
+    
+    # Relaciones
+    asignacion = relationship("ShockroomAsignacion")
+
+class ShockroomLecturaVital(Base):
+    """Serie temporal de signos vitales del monitor de cabecera.
+
+    Solo se agregan filas: la clave (asignacion_id, timestamp) hace que
+    reenviar una lectura la reemplace en lugar de duplicarla, y sirve de
+    índice para las consultas por rango.
+    """
+    __tablename__ = "shockroom_lecturas_vitales"
+    
+    asignacion_id = Column(String(36), ForeignKey("shockroom_asignaciones.id", ondelete="CASCADE"), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    presion_arterial_sistolica = Column(Integer)  # mmHg
+    presion_arterial_diastolica = Column(Integer)  # mmHg
+    frecuencia_cardiaca = Column(Integer)  # latidos por minuto
+    frecuencia_respiratoria = Column(Integer)  # respiraciones por minuto
+    temperatura = Column(Float)  # grados Celsius
+    saturacion_oxigeno = Column(Integer)  # porcentaje
+    escala_dolor = Column(Integer)  # 0 a 10
+    estado_conciencia = Column(String(50))
+    
     # Relaciones
-    asignacion = relationship("ShockroomAsignacion") 
\ No newline at end of file
+    asignacion = relationship("ShockroomAsignacion", back_populates="lecturas")
@@ -13,4 +13,16 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     hospital_id: Optional[str] = None
     username: Optional[str] = None
-    user_id: Optional[str] = None 
\ No newline at end of file
+    user_id: Optional[str] = None 
+
+class UsuarioActual(BaseModel):
+    """Datos del usuario autenticado que se guardan en la caché de sesión"""
+    id: str
+    username: str
+    hospital_id: str
+    rol: str
+    nombre: str
+    apellido: str
+    
+    class Config:
+        from_attributes = True
\ No newline at end of file
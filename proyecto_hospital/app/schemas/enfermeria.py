@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # Schemas para Signos Vitales
@@ -35,6 +35,52 @@ class SignosVitalesResponse(SignosVitalesBase):
             datetime: lambda v: v.isoformat() if v else None
         }
 
+# Schemas para carga masiva de signos vitales (rondas de enfermería, gateways de dispositivos)
+class SignosVitalesLoteItem(SignosVitalesCreate):
+    fecha_hora_registro: Optional[datetime] = Field(
+        None, description="Hora de la toma; si se omite, la hora de recepción"
+    )
+
+class SignosVitalesLote(BaseModel):
+    registros: List[SignosVitalesLoteItem] = Field(..., min_length=1, max_length=1000)
+
+class ResultadoSignosVitalesLote(BaseModel):
+    indice: int  # posición en la lista enviada
+    episodio_id: str
+    creado: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class SignosVitalesLoteResponse(BaseModel):
+    creados: int
+    rechazados: int
+    resultados: List[ResultadoSignosVitalesLote]
+
+# Schemas para tendencias de signos vitales (gráficos)
+class ResumenSignoVital(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    promedio: Optional[float] = None
+
+class IntervaloSignosVitales(BaseModel):
+    timestamp: datetime  # inicio del intervalo
+    registros: int
+    valores: Dict[str, ResumenSignoVital] = {}
+
+class PuntoTendencia(BaseModel):
+    timestamp: datetime
+    valor: float
+
+class TendenciaSignosVitales(BaseModel):
+    episodio_id: str
+    modo: str  # "agregado" o "lttb"
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    bucket_segundos: Optional[int] = None  # modo agregado
+    puntos: Optional[int] = None  # modo lttb
+    intervalos: List[IntervaloSignosVitales] = []
+    series: Dict[str, List[PuntoTendencia]] = {}
+
 # Schemas para Registro de Enfermería
 class RegistroEnfermeriaBase(BaseModel):
     tipo_registro: str = Field(..., example="Nota", description="Tipo: Nota, Procedimiento, Medicacion, Observacion")
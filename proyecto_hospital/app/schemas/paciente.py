@@ -63,6 +63,10 @@ class PacienteHospitalResponse(PacienteHospitalBase):
             datetime: lambda v: v.isoformat() if v else None
         }
 
+class PacienteBusquedaResponse(PacienteResponse):
+    puntaje: int  # Relevancia del resultado (mayor es mejor)
+    en_hospital: bool  # Ya registrado en el hospital del usuario
+
 # Nuevo schema para creación completa de paciente con episodio
 class PacienteCompletoCreate(PacienteBase):
     # Campos del episodio
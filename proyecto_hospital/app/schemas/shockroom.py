@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -133,4 +133,35 @@ class MonitorizacionDatos(BaseModel):
     saturacion_oxigeno: Optional[int] = None
     escala_dolor: Optional[int] = None
     estado_conciencia: Optional[str] = None
-    timestamp: datetime 
\ No newline at end of file
+    timestamp: datetime 
+class MonitorizacionLote(BaseModel):
+    """Lecturas acumuladas por el monitor o el gateway de dispositivos"""
+    lecturas: List[MonitorizacionDatos] = Field(..., min_length=1, max_length=5000)
+
+class LecturaVital(MonitorizacionDatos):
+    class Config:
+        from_attributes = True
+
+class ResumenSignoVital(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    promedio: Optional[float] = None
+
+class LecturaVitalAgregada(BaseModel):
+    timestamp: datetime  # inicio del intervalo
+    lecturas: int
+    presion_arterial_sistolica: Optional[ResumenSignoVital] = None
+    presion_arterial_diastolica: Optional[ResumenSignoVital] = None
+    frecuencia_cardiaca: Optional[ResumenSignoVital] = None
+    frecuencia_respiratoria: Optional[ResumenSignoVital] = None
+    temperatura: Optional[ResumenSignoVital] = None
+    saturacion_oxigeno: Optional[ResumenSignoVital] = None
+    escala_dolor: Optional[ResumenSignoVital] = None
+
+class MonitorizacionSerie(BaseModel):
+    asignacion_id: str
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    intervalo_segundos: Optional[int] = None
+    lecturas: List[LecturaVital] = []  # sin intervalo: lecturas originales
+    intervalos: List[LecturaVitalAgregada] = []  # con intervalo: min/max/promedio
@@ -1,10 +1,26 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from typing import Dict, Optional, Set, Tuple
+import time
 from app.models.usuario import Usuario
+from app.core.config import settings
+from app.core.database import SessionLocal
 from app.core.security import verify_password, create_access_token
-from app.schemas.auth import LoginRequest, Token
+from app.schemas.auth import LoginRequest, Token, UsuarioActual
 from datetime import timedelta, datetime
 
+# Caché local al proceso: user_id -> (expira_en, usuario). Evita el SELECT
+# sobre usuarios en cada request autenticada durante AUTH_CACHE_TTL_SECONDS.
+# Los cambios de usuario publican un evento (eventos.evento_usuario) y
+# aplicar_evento() descarta la entrada en cada worker.
+_usuarios_cache: Dict[str, Tuple[float, UsuarioActual]] = {}
+
+# Usuarios inactivos, por worker: se carga al iniciar la app y se mantiene con
+# los eventos 'usuario'. get_verified_token lo consulta sin ir a la base de
+# datos, así que un usuario desactivado pierde también el acceso de lectura
+# aunque su JWT siga vigente.
+_usuarios_revocados: Set[str] = set()
+
 class AuthService:
     @staticmethod
     def authenticate_user(db: Session, login_data: LoginRequest) -> Token:
@@ -26,6 +42,10 @@ class AuthService:
         user.ultimo_acceso = datetime.utcnow()
         db.commit()
         
+        # Un nuevo login refresca los datos cacheados (rol, nombre, etc.)
+        AuthService.invalidar_usuario(str(user.id))
+        _usuarios_revocados.discard(str(user.id))
+        
         # Crear token con información del usuario
         access_token_expires = timedelta(minutes=480)
         access_token = create_access_token(
@@ -41,19 +61,100 @@ class AuthService:
         return Token(access_token=access_token, token_type="bearer")
     
     @staticmethod
-    def get_current_user(db: Session, token_data: dict) -> Usuario:
-        """Obtiene el usuario actual basado en el token"""
-        user = db.query(Usuario).filter(
-            Usuario.id == token_data.get("user_id"),  # No convertir a int, es un UUID
-            Usuario.hospital_id == token_data.get("hospital_id"),
-            Usuario.activo == True
-        ).first()
+    def get_current_user(db: Session, token_data: dict) -> UsuarioActual:
+        """Obtiene el usuario actual basado en el token (con caché por user_id)"""
+        user_id = token_data.get("user_id")
+        hospital_id = token_data.get("hospital_id")
         
-        if not user:
+        user = AuthService._get_cached_user(user_id)
+        if user is None:
+            db_user = db.query(Usuario).filter(
+                Usuario.id == user_id,  # No convertir a int, es un UUID
+                Usuario.hospital_id == hospital_id,
+                Usuario.activo == True
+            ).first()
+            
+            if db_user:
+                user = UsuarioActual.model_validate(db_user)
+                AuthService._cache_user(user)
+        
+        if not user or user.hospital_id != hospital_id:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token inválido",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        return user 
\ No newline at end of file
+        return user
+    
+    @staticmethod
+    def desactivar_usuario(db: Session, user_id: str, hospital_id: str) -> Usuario:
+        """Desactiva un usuario del hospital y lo expulsa de la caché local de inmediato"""
+        user = db.query(Usuario).filter(
+            Usuario.id == user_id,
+            Usuario.hospital_id == hospital_id
+        ).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuario no encontrado"
+            )
+        
+        user.activo = False
+        db.commit()
+        db.refresh(user)
+        AuthService.invalidar_usuario(user_id)
+        _usuarios_revocados.add(str(user.id))
+        return user
+    
+    @staticmethod
+    def invalidar_usuario(user_id: Optional[str] = None) -> None:
+        """Elimina un usuario de la caché (o toda la caché si no se indica user_id)"""
+        if user_id is None:
+            _usuarios_cache.clear()
+        else:
+            _usuarios_cache.pop(user_id, None)
+    
+    @staticmethod
+    def esta_revocado(user_id: Optional[str]) -> bool:
+        """True si el usuario fue desactivado (consulta en memoria, sin base de datos)"""
+        return user_id in _usuarios_revocados
+    
+    @staticmethod
+    def cargar_revocados() -> None:
+        """Cargar los usuarios inactivos al iniciar el worker"""
+        db = SessionLocal()
+        try:
+            inactivos = db.query(Usuario.id).filter(Usuario.activo == False).all()
+            _usuarios_revocados.clear()
+            _usuarios_revocados.update(str(fila.id) for fila in inactivos)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def aplicar_evento(evento: dict) -> None:
+        """Suscriptor de eventos de dominio: invalidar usuarios modificados en cualquier worker"""
+        if evento.get("entity") != "usuario":
+            return
+        AuthService.invalidar_usuario(evento["id"])
+        if (evento.get("data") or {}).get("activo") is False:
+            _usuarios_revocados.add(evento["id"])
+        else:
+            _usuarios_revocados.discard(evento["id"])
+    
+    @staticmethod
+    def _get_cached_user(user_id: Optional[str]) -> Optional[UsuarioActual]:
+        entrada = _usuarios_cache.get(user_id)
+        if entrada is None:
+            return None
+        
+        expira_en, user = entrada
+        if expira_en < time.monotonic():
+            _usuarios_cache.pop(user_id, None)
+            return None
+        return user
+    
+    @staticmethod
+    def _cache_user(user: UsuarioActual) -> None:
+        if settings.AUTH_CACHE_TTL_SECONDS > 0:
+            _usuarios_cache[user.id] = (time.monotonic() + settings.AUTH_CACHE_TTL_SECONDS, user)
\ No newline at end of file
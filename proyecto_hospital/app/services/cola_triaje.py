@@ -0,0 +1,265 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.episodio import Episodio, PRIORIDAD_TRIAJE, SIN_TRIAJE
+from app.models.paciente import Paciente
+
+logger = logging.getLogger(__name__)
+
+# Estados cuyas listas se sirven desde memoria
+ESTADOS_COLA = ("espera_triaje", "en_lista_medica")
+
+def calcular_edad(fecha_nacimiento) -> Optional[int]:
+    if not fecha_nacimiento:
+        return None
+    today = datetime.now().date()
+    edad = today.year - fecha_nacimiento.year
+    if (today.month, today.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
+        edad -= 1
+    return edad
+
+class ColaTriaje:
+    """Proyección en memoria de las colas de espera por hospital.
+
+    Cada (hospital_id, estado) mantiene una lista ordenada por prioridad de
+    triaje y luego por hora de llegada. Los endpoints de escritura llaman a
+    actualizar() después del commit y las lecturas no tocan la base de datos.
+    La proyección es local al proceso: se reconstruye al iniciar la app y
+    luego periódicamente (ciclo_reconstruccion), lo que corrige los eventos
+    de otros workers que se hayan perdido. Los cambios que llegan mientras se
+    lee la base de datos se guardan y se reaplican sobre la cola nueva.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        # (hospital_id, estado) -> lista ordenada de claves (prioridad, fecha_inicio, id)
+        self._orden: Dict[Tuple[str, str], List[tuple]] = {}
+        # episodio_id -> (clave, (hospital_id, estado), datos)
+        self._episodios: Dict[str, Tuple[tuple, Tuple[str, str], dict]] = {}
+        # Cambios recibidos durante una reconstrucción: episodio_id -> datos (None = fuera de cola)
+        self._pendientes: Optional[List[Tuple[str, Optional[dict]]]] = None
+        self.construida = False
+
+    def reconstruir(self, db: Optional[Session] = None):
+        """Cargar desde la base de datos todos los episodios en cola"""
+        propia = db is None
+        if propia:
+            db = SessionLocal()
+        with self._lock:
+            self._pendientes = []
+        try:
+            filas = db.query(Episodio, Paciente).join(
+                Paciente, Episodio.paciente_id == Paciente.id
+            ).filter(Episodio.estado.in_(ESTADOS_COLA)).order_by(
+                Episodio.hospital_id,
+                Episodio.estado,
+                Episodio.prioridad_triaje,
+                Episodio.fecha_inicio
+            ).all()
+
+            with self._lock:
+                self._orden = {}
+                self._episodios = {}
+                for episodio, paciente in filas:
+                    self._insertar(self._snapshot(episodio, paciente))
+                # Lo que cambió mientras se leía la base de datos gana sobre la lectura
+                for episodio_id, datos in self._pendientes:
+                    self._reemplazar(episodio_id, datos)
+                self.construida = True
+
+            logger.info(f"Cola de triaje reconstruida con {len(filas)} episodios")
+        finally:
+            with self._lock:
+                self._pendientes = None
+            if propia:
+                db.close()
+
+    async def ciclo_reconstruccion(self, intervalo: int):
+        """Tarea de fondo: reconstruir cada `intervalo` segundos sin bloquear el event loop"""
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await asyncio.to_thread(self.reconstruir)
+            except Exception as e:
+                logger.error(f"❌ Error reconstruyendo la cola de triaje: {e}")
+
+    def actualizar(self, episodio: Episodio, paciente: Optional[Paciente] = None):
+        """Reflejar el estado actual de un episodio (llamar después del commit)"""
+        with self._lock:
+            anterior = self._episodios.get(episodio.id)
+
+            if episodio.estado not in ESTADOS_COLA:
+                self._aplicar(episodio.id, None)
+                return
+
+            if paciente is None and anterior is not None:
+                datos_paciente = {
+                    campo: anterior[2][campo]
+                    for campo in ("paciente_dni", "paciente_nombre", "paciente_edad")
+                }
+            else:
+                paciente = paciente or episodio.paciente
+                datos_paciente = self._datos_paciente(paciente)
+
+            self._aplicar(episodio.id, {**self._datos_episodio(episodio), **datos_paciente})
+
+    async def actualizar_async(self, db: AsyncSession, episodio: Episodio):
+        """Variante de actualizar() para sesiones async.
+
+        En async no hay carga perezosa de relaciones: si el episodio entra a
+        la cola por primera vez, el paciente se consulta explícitamente.
+        """
+        paciente = None
+        if episodio.estado in ESTADOS_COLA and not self.contiene(episodio.id):
+            paciente = await db.get(Paciente, episodio.paciente_id)
+        self.actualizar(episodio, paciente)
+
+    def contiene(self, episodio_id: str) -> bool:
+        with self._lock:
+            return episodio_id in self._episodios
+
+    def quitar(self, episodio_id: str):
+        with self._lock:
+            self._aplicar(episodio_id, None)
+
+    def snapshot(self, episodio_id: str) -> Optional[dict]:
+        """Datos del episodio en la cola (serializables a JSON), o None si no está"""
+        with self._lock:
+            entrada = self._episodios.get(episodio_id)
+        if entrada is None:
+            return None
+        return {
+            campo: valor.isoformat() if isinstance(valor, datetime) else valor
+            for campo, valor in entrada[2].items()
+        }
+
+    def aplicar_evento(self, evento: dict):
+        """Suscriptor de eventos de dominio: replica en este worker los cambios
+        de cola hechos por cualquier otro (ver app/services/eventos.py)"""
+        if evento.get("entity") != "episodio":
+            return
+
+        datos = evento.get("cola")
+        with self._lock:
+            if not self.construida and self._pendientes is None:
+                return
+            if datos and datos.get("estado") in ESTADOS_COLA:
+                for campo in ("fecha_inicio", "fecha_triaje"):
+                    if isinstance(datos.get(campo), str):
+                        datos[campo] = datetime.fromisoformat(datos[campo])
+            else:
+                datos = None
+            self._aplicar(evento["id"], datos)
+
+    def listar(
+        self,
+        hospital_id: str,
+        estado: str,
+        con_triaje: Optional[bool] = None,
+        despues_de: Optional[tuple] = None,
+        limite: Optional[int] = None
+    ) -> List[dict]:
+        """Episodios de la cola en orden de atención, con tiempo de espera actualizado
+
+        Para paginar, `despues_de` es la clave (ver clave()) del último
+        episodio de la página anterior: la posición se busca por bisección y
+        se recorren solo los `limite` episodios siguientes. La cola se carga
+        al iniciar la app: acá nunca se consulta la base de datos.
+        """
+        ahora = datetime.utcnow()
+        datos = []
+        with self._lock:
+            orden = self._orden.get((hospital_id, estado), [])
+            inicio = bisect_right(orden, despues_de) if despues_de else 0
+            for posicion in range(inicio, len(orden)):
+                episodio = self._episodios[orden[posicion][2]][2]
+                if con_triaje is not None and (episodio["color_triaje"] is not None) != con_triaje:
+                    continue
+                datos.append(episodio)
+                if limite is not None and len(datos) >= limite:
+                    break
+
+        return [
+            {
+                **episodio,
+                "tiempo_espera_minutos": int((ahora - episodio["fecha_inicio"]).total_seconds() / 60)
+            }
+            for episodio in datos
+        ]
+
+    @staticmethod
+    def clave(datos: dict) -> tuple:
+        """Clave de orden de un episodio en su cola: (prioridad, fecha_inicio, id)"""
+        return (
+            PRIORIDAD_TRIAJE.get(datos["color_triaje"], SIN_TRIAJE),
+            datos["fecha_inicio"],
+            datos["id"]
+        )
+
+    def _aplicar(self, episodio_id: str, datos: Optional[dict]):
+        """Reemplazar la entrada de un episodio (con el lock tomado), recordándolo si se está reconstruyendo"""
+        self._reemplazar(episodio_id, datos)
+        if self._pendientes is not None:
+            self._pendientes.append((episodio_id, datos))
+
+    def _reemplazar(self, episodio_id: str, datos: Optional[dict]):
+        self._quitar(episodio_id)
+        if datos is not None:
+            self._insertar(datos)
+
+    def _insertar(self, datos: dict):
+        grupo = (datos["hospital_id"], datos["estado"])
+        clave = self.clave(datos)
+        insort(self._orden.setdefault(grupo, []), clave)
+        self._episodios[datos["id"]] = (clave, grupo, datos)
+
+    def _quitar(self, episodio_id: str):
+        entrada = self._episodios.pop(episodio_id, None)
+        if entrada is None:
+            return
+        clave, grupo, _ = entrada
+        orden = self._orden[grupo]
+        posicion = bisect_left(orden, clave)
+        if posicion < len(orden) and orden[posicion] == clave:
+            del orden[posicion]
+
+    def _snapshot(self, episodio: Episodio, paciente: Paciente) -> dict:
+        return {**self._datos_episodio(episodio), **self._datos_paciente(paciente)}
+
+    @staticmethod
+    def _datos_episodio(episodio: Episodio) -> dict:
+        return {
+            "id": episodio.id,
+            "paciente_id": episodio.paciente_id,
+            "hospital_id": episodio.hospital_id,
+            "tipo": episodio.tipo,
+            "estado": episodio.estado,
+            "color_triaje": episodio.color_triaje,
+            "motivo_consulta": episodio.motivo_consulta,
+            "fecha_inicio": episodio.fecha_inicio,
+            "triaje_realizado_por": episodio.triaje_realizado_por,
+            "fecha_triaje": episodio.fecha_triaje,
+            "decision_post_triaje": episodio.decision_post_triaje,
+            "medico_responsable": episodio.medico_responsable,
+            "en_shockroom": bool(episodio.en_shockroom),
+            "cama_shockroom": episodio.cama_shockroom
+        }
+
+    @staticmethod
+    def _datos_paciente(paciente: Paciente) -> dict:
+        return {
+            "paciente_dni": paciente.dni,
+            "paciente_nombre": paciente.nombre_completo,
+            "paciente_edad": calcular_edad(paciente.fecha_nacimiento)
+        }
+
+# Instancia global de la cola
+cola_triaje = ColaTriaje()
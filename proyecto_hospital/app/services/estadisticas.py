@@ -0,0 +1,320 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.sql import segundos_epoch
+from app.models.codigo_emergencia import CodigoEmergencia
+from app.models.episodio import Episodio
+from app.models.shockroom import ShockroomAlerta, ShockroomAsignacion, ShockroomCama
+
+logger = logging.getLogger(__name__)
+
+# Episodios que ya no cuentan para los tableros
+ESTADOS_CERRADOS = ("finalizado", "cerrado", "alta_enfermeria")
+# Episodios en espera (cuentan para triaje y tiempo de espera); "activo" es del workflow anterior
+ESTADOS_ESPERA = ("espera_triaje", "en_lista_medica", "activo")
+ESTADOS_CODIGO_ACTIVO = ("activo", "atendido")
+# Ventana del tiempo promedio de estancia en shockroom
+DIAS_ESTANCIA = 30
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _segundos(fecha: Optional[datetime]) -> float:
+    return (fecha - _EPOCH).total_seconds() if fecha else 0.0
+
+def _fecha(valor) -> Optional[datetime]:
+    if isinstance(valor, str):
+        try:
+            return datetime.fromisoformat(valor)
+        except ValueError:
+            return None
+    return valor
+
+@dataclass
+class ContadoresHospital:
+    episodios_por_estado: Counter = field(default_factory=Counter)
+    espera_por_color: Counter = field(default_factory=Counter)
+    espera_total: int = 0
+    espera_suma_inicio: float = 0.0  # suma de fecha_inicio (segundos epoch) de los episodios en espera
+    camas_por_estado: Counter = field(default_factory=Counter)
+    alertas_activas: int = 0
+    codigos_activos_por_tipo: Counter = field(default_factory=Counter)
+    # Solo se recalculan al conciliar
+    pacientes_criticos: int = 0
+    tiempo_promedio_estancia: Optional[float] = None  # horas
+
+def _restar(contador: Counter, clave):
+    contador[clave] -= 1
+    if contador[clave] <= 0:
+        del contador[clave]
+
+class EstadisticasHospitales:
+    """Contadores por hospital mantenidos en memoria.
+
+    Cada transición publica un evento de dominio (app/services/eventos.py);
+    aplicar_evento() resta la contribución anterior de la entidad y suma la
+    nueva, así que aplicar dos veces el mismo evento no altera los totales.
+    conciliar() recalcula todo desde la base de datos al iniciar y luego
+    periódicamente, corrigiendo cualquier deriva (p. ej. cambios hechos por
+    rutas que no publican eventos). Los deltas que llegan mientras conciliar()
+    lee la base de datos se guardan y se reaplican después del reemplazo, para
+    que la lectura (anterior a ellos) no los pise. Los tableros leen
+    snapshot() sin consultar la base de datos.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._contadores: Dict[str, ContadoresHospital] = {}
+        # Estado conocido de cada entidad abierta, para calcular deltas
+        self._episodios: Dict[str, Tuple[str, str, Optional[str], float]] = {}  # id -> (hospital, estado, color, inicio)
+        self._camas: Dict[str, Tuple[str, str]] = {}  # id -> (hospital, estado)
+        self._alertas: Dict[str, str] = {}  # id activa -> hospital
+        self._codigos: Dict[str, Tuple[str, str]] = {}  # id activo -> (hospital, tipo)
+        # Deltas recibidos durante una conciliación: (método de delta, id, nuevo)
+        self._pendientes: Optional[List[Tuple[Callable, str, object]]] = None
+        self.construida = False
+        self.ultima_conciliacion: Optional[datetime] = None
+
+    def _hospital(self, hospital_id: str) -> ContadoresHospital:
+        return self._contadores.setdefault(hospital_id, ContadoresHospital())
+
+    # ---- deltas por entidad (llamar con el lock tomado) ----
+
+    def _episodio(self, episodio_id: str, nuevo: Optional[Tuple[str, str, Optional[str], float]]):
+        anterior = self._episodios.pop(episodio_id, None)
+        for datos, signo in ((anterior, -1), (nuevo, 1)):
+            if datos is None:
+                continue
+            hospital_id, estado, color, inicio = datos
+            contadores = self._hospital(hospital_id)
+            if signo > 0:
+                contadores.episodios_por_estado[estado] += 1
+            else:
+                _restar(contadores.episodios_por_estado, estado)
+            if estado in ESTADOS_ESPERA:
+                contadores.espera_total += signo
+                contadores.espera_suma_inicio += signo * inicio
+                if color:
+                    if signo > 0:
+                        contadores.espera_por_color[color] += 1
+                    else:
+                        _restar(contadores.espera_por_color, color)
+        if nuevo is not None:
+            self._episodios[episodio_id] = nuevo
+
+    def _cama(self, cama_id: str, nuevo: Optional[Tuple[str, str]]):
+        anterior = self._camas.pop(cama_id, None)
+        if anterior is not None:
+            _restar(self._hospital(anterior[0]).camas_por_estado, anterior[1])
+        if nuevo is not None:
+            self._hospital(nuevo[0]).camas_por_estado[nuevo[1]] += 1
+            self._camas[cama_id] = nuevo
+
+    def _alerta(self, alerta_id: str, hospital_id: Optional[str]):
+        anterior = self._alertas.pop(alerta_id, None)
+        if anterior is not None:
+            self._hospital(anterior).alertas_activas -= 1
+        if hospital_id is not None:
+            self._hospital(hospital_id).alertas_activas += 1
+            self._alertas[alerta_id] = hospital_id
+
+    def _codigo(self, codigo_id: str, nuevo: Optional[Tuple[str, str]]):
+        anterior = self._codigos.pop(codigo_id, None)
+        if anterior is not None:
+            _restar(self._hospital(anterior[0]).codigos_activos_por_tipo, anterior[1])
+        if nuevo is not None:
+            self._hospital(nuevo[0]).codigos_activos_por_tipo[nuevo[1]] += 1
+            self._codigos[codigo_id] = nuevo
+
+    def _aplicar(self, delta: Callable, entidad_id: str, nuevo):
+        """Aplicar un delta, recordándolo si hay una conciliación en curso"""
+        delta(entidad_id, nuevo)
+        if self._pendientes is not None:
+            self._pendientes.append((delta, entidad_id, nuevo))
+
+    @staticmethod
+    def _clave_episodio(hospital_id, estado, color, fecha_inicio, fecha_cierre=None):
+        if fecha_cierre or estado in ESTADOS_CERRADOS:
+            return None
+        return (hospital_id, estado, color, _segundos(fecha_inicio))
+
+    # ---- actualización incremental ----
+
+    def actualizar_episodio(self, episodio: Episodio):
+        """Reflejar un episodio modificado por una ruta que no publica eventos"""
+        with self._lock:
+            self._aplicar(self._episodio, episodio.id, self._clave_episodio(
+                episodio.hospital_id, episodio.estado, episodio.color_triaje,
+                episodio.fecha_inicio, episodio.fecha_cierre
+            ))
+
+    def aplicar_evento(self, evento: dict):
+        """Suscriptor de eventos de dominio (de este y de los demás workers)"""
+        entidad = evento.get("entity")
+        hospital_id = evento.get("hospital_id")
+        datos = evento.get("data") or {}
+        with self._lock:
+            if not self.construida and self._pendientes is None:
+                return
+            if entidad == "episodio":
+                anterior = self._episodios.get(evento["id"])
+                fecha_inicio = _fecha(datos.get("fecha_inicio"))
+                if fecha_inicio is None and anterior is not None:
+                    fecha_inicio = _EPOCH + timedelta(seconds=anterior[3])
+                self._aplicar(self._episodio, evento["id"], self._clave_episodio(
+                    hospital_id, datos.get("estado"), datos.get("color_triaje"),
+                    fecha_inicio, datos.get("fecha_cierre")
+                ))
+            elif entidad == "cama" and datos.get("estado"):
+                self._aplicar(self._cama, evento["id"], (hospital_id, datos["estado"]))
+            elif entidad == "alerta":
+                self._aplicar(self._alerta, evento["id"], hospital_id if datos.get("estado") == "activa" else None)
+            elif entidad == "codigo_emergencia" and datos.get("estado"):
+                activo = datos["estado"] in ESTADOS_CODIGO_ACTIVO
+                self._aplicar(self._codigo, evento["id"], (hospital_id, datos.get("tipo_codigo")) if activo else None)
+
+    # ---- conciliación con la base de datos ----
+
+    def conciliar(self, db: Optional[Session] = None):
+        """Recalcular todos los contadores desde la base de datos"""
+        propia = db is None
+        if propia:
+            db = SessionLocal()
+        with self._lock:
+            self._pendientes = []
+        try:
+            episodios = db.execute(select(
+                Episodio.id, Episodio.hospital_id, Episodio.estado,
+                Episodio.color_triaje, Episodio.fecha_inicio
+            ).where(
+                Episodio.fecha_cierre.is_(None),
+                Episodio.estado.notin_(ESTADOS_CERRADOS)
+            )).all()
+            camas = db.execute(select(ShockroomCama.id, ShockroomCama.hospital_id, ShockroomCama.estado)).all()
+            alertas = db.execute(select(ShockroomAlerta.id, ShockroomCama.hospital_id).join(
+                ShockroomAsignacion, ShockroomAsignacion.id == ShockroomAlerta.asignacion_id
+            ).join(
+                ShockroomCama, ShockroomCama.id == ShockroomAsignacion.cama_id
+            ).where(ShockroomAlerta.estado == "activa")).all()
+            codigos = db.execute(select(
+                CodigoEmergencia.id, CodigoEmergencia.hospital_id, CodigoEmergencia.tipo_codigo
+            ).where(CodigoEmergencia.estado.in_(ESTADOS_CODIGO_ACTIVO))).all()
+
+            # Agregados que no tienen evento propio: se calculan en SQL (portable)
+            criticos = db.execute(select(
+                ShockroomCama.hospital_id, func.count(ShockroomAsignacion.id)
+            ).join(
+                ShockroomCama, ShockroomCama.id == ShockroomAsignacion.cama_id
+            ).where(
+                ShockroomAsignacion.fecha_salida.is_(None),
+                ShockroomAsignacion.estado_paciente == "critico"
+            ).group_by(ShockroomCama.hospital_id)).all()
+            estancias = db.execute(select(
+                ShockroomCama.hospital_id,
+                func.avg(
+                    segundos_epoch(ShockroomAsignacion.fecha_salida)
+                    - segundos_epoch(ShockroomAsignacion.fecha_ingreso)
+                )
+            ).join(
+                ShockroomCama, ShockroomCama.id == ShockroomAsignacion.cama_id
+            ).where(
+                ShockroomAsignacion.fecha_salida.isnot(None),
+                ShockroomAsignacion.fecha_ingreso >= datetime.utcnow() - timedelta(days=DIAS_ESTANCIA)
+            ).group_by(ShockroomCama.hospital_id)).all()
+
+            anteriores = self._contadores if self.construida else None
+            with self._lock:
+                self._contadores = {}
+                self._episodios = {}
+                self._camas = {}
+                self._alertas = {}
+                self._codigos = {}
+                for fila in episodios:
+                    self._episodio(fila.id, self._clave_episodio(
+                        fila.hospital_id, fila.estado, fila.color_triaje, fila.fecha_inicio
+                    ))
+                for fila in camas:
+                    self._cama(fila.id, (fila.hospital_id, fila.estado))
+                for fila in alertas:
+                    self._alerta(fila.id, fila.hospital_id)
+                for fila in codigos:
+                    self._codigo(fila.id, (fila.hospital_id, fila.tipo_codigo))
+                for hospital_id, cantidad in criticos:
+                    self._hospital(hospital_id).pacientes_criticos = cantidad
+                for hospital_id, segundos in estancias:
+                    if segundos is not None:
+                        self._hospital(hospital_id).tiempo_promedio_estancia = round(float(segundos) / 3600, 2)
+                # Los deltas posteriores a la lectura ganan sobre ella
+                for delta, entidad_id, nuevo in self._pendientes:
+                    delta(entidad_id, nuevo)
+                self.construida = True
+                self.ultima_conciliacion = datetime.utcnow()
+
+            if anteriores is not None:
+                self._registrar_deriva(anteriores)
+            logger.debug(f"Estadísticas conciliadas: {len(episodios)} episodios abiertos, {len(camas)} camas")
+        finally:
+            with self._lock:
+                self._pendientes = None
+            if propia:
+                db.close()
+
+    def _registrar_deriva(self, anteriores: Dict[str, ContadoresHospital]):
+        for hospital_id, contadores in self._contadores.items():
+            previos = anteriores.get(hospital_id, ContadoresHospital())
+            if (+previos.episodios_por_estado != +contadores.episodios_por_estado
+                    or +previos.camas_por_estado != +contadores.camas_por_estado
+                    or previos.alertas_activas != contadores.alertas_activas
+                    or +previos.codigos_activos_por_tipo != +contadores.codigos_activos_por_tipo):
+                logger.info(f"📊 Contadores del hospital {hospital_id} corregidos al conciliar")
+
+    async def ciclo_conciliacion(self, intervalo: int):
+        """Tarea de fondo: conciliar cada `intervalo` segundos"""
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await asyncio.to_thread(self.conciliar)
+            except Exception as e:
+                logger.error(f"❌ Error conciliando estadísticas: {e}")
+
+    # ---- lectura ----
+
+    def snapshot(self, hospital_id: str) -> dict:
+        """Estadísticas actuales del hospital (O(1) respecto del volumen de datos).
+
+        Los contadores se cargan al iniciar la app: acá nunca se consulta la
+        base de datos (antes de la primera conciliación todo vale cero).
+        """
+        ahora = _segundos(datetime.utcnow())
+        with self._lock:
+            contadores = self._contadores.get(hospital_id, ContadoresHospital())
+            promedio_espera = None
+            if contadores.espera_total > 0:
+                promedio_espera = round(
+                    (ahora - contadores.espera_suma_inicio / contadores.espera_total) / 60, 1
+                )
+            return {
+                "hospital_id": hospital_id,
+                "episodios_por_estado": dict(contadores.episodios_por_estado),
+                "espera_por_color": dict(contadores.espera_por_color),
+                "total_pacientes_espera": contadores.espera_total,
+                "promedio_tiempo_espera": promedio_espera,  # minutos
+                "camas_por_estado": dict(contadores.camas_por_estado),
+                "alertas_activas": contadores.alertas_activas,
+                "pacientes_criticos": contadores.pacientes_criticos,
+                "tiempo_promedio_estancia": contadores.tiempo_promedio_estancia,  # horas
+                "codigos_activos": sum(contadores.codigos_activos_por_tipo.values()),
+                "codigos_activos_por_tipo": dict(contadores.codigos_activos_por_tipo),
+                "ultima_conciliacion": self.ultima_conciliacion.isoformat() if self.ultima_conciliacion else None
+            }
+
+# Instancia global de las estadísticas
+estadisticas = EstadisticasHospitales()
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Optional
+import logging
+
+from app.models.episodio import Episodio
+from app.models.shockroom import ShockroomCama
+from app.models.usuario import Usuario
+from app.services.cola_triaje import cola_triaje
+from websocket.manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Eventos de dominio emitidos después de cada commit.
+#
+# Cada evento es un delta compacto que el frontend aplica sobre su estado
+# local en lugar de volver a consultar las listas:
+#   {"entity": "episodio", "action": "triaje", "id": "...", "hospital_id": "...",
+#    "data": {...campos cambiados...}, "at": "..."}
+# Se publica al área del hospital a través del manager de WebSocket (y por lo
+# tanto a todos los workers vía el broker).
+
+def _serializable(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+def _evento(hospital_id: str, entidad: str, accion: str, entidad_id: str,
+            datos: Optional[dict] = None, **extra) -> dict:
+    return {
+        "entity": entidad,
+        "action": accion,
+        "id": entidad_id,
+        "hospital_id": hospital_id,
+        "data": {campo: _serializable(valor) for campo, valor in (datos or {}).items()},
+        "at": datetime.utcnow().isoformat(),
+        **extra
+    }
+
+async def publicar_evento(hospital_id: str, entidad: str, accion: str, entidad_id: str,
+                          datos: Optional[dict] = None, **extra):
+    """Publicar un evento de dominio; nunca propaga errores al endpoint"""
+    evento = _evento(hospital_id, entidad, accion, entidad_id, datos, **extra)
+    try:
+        await manager.publicar_evento(hospital_id, evento)
+    except Exception as e:
+        logger.error(f"❌ Error publicando evento {entidad}.{accion}: {e}")
+
+async def evento_episodio(episodio: Episodio, accion: str):
+    """Delta de un episodio tras un cambio de estado.
+
+    Incluye la entrada de la cola de triaje para que el resto de los workers
+    actualice su proyección en memoria sin consultar la base de datos.
+    """
+    await publicar_evento(
+        episodio.hospital_id,
+        "episodio",
+        accion,
+        episodio.id,
+        {
+            "paciente_id": episodio.paciente_id,
+            "estado": episodio.estado,
+            "color_triaje": episodio.color_triaje,
+            "prioridad_triaje": episodio.prioridad_triaje,
+            "medico_responsable": episodio.medico_responsable,
+            "en_shockroom": bool(episodio.en_shockroom),
+            "cama_shockroom": episodio.cama_shockroom,
+            "fecha_inicio": episodio.fecha_inicio,
+            "fecha_cierre": episodio.fecha_cierre
+        },
+        cola=cola_triaje.snapshot(episodio.id)
+    )
+
+async def evento_cama(cama: ShockroomCama, accion: str, **datos):
+    """Delta de una cama del shockroom (estado y ocupación)"""
+    await publicar_evento(cama.hospital_id, "cama", accion, cama.id, {
+        "numero_cama": cama.numero_cama,
+        "estado": cama.estado,
+        "fecha_actualizacion": cama.fecha_actualizacion,
+        **datos
+    })
+
+async def evento_usuario(usuario: Usuario, accion: str):
+    """Cambio de un usuario: cada worker descarta su entrada en la caché de auth.
+
+    Se envía solo a las conexiones del propio usuario (no al área), pero los
+    suscriptores de todos los workers lo reciben igual vía el broker.
+    """
+    evento = _evento(usuario.hospital_id, "usuario", accion, str(usuario.id), {"activo": usuario.activo})
+    try:
+        await manager.publicar_evento_usuario(str(usuario.id), usuario.hospital_id, evento)
+    except Exception as e:
+        logger.error(f"❌ Error publicando evento usuario.{accion}: {e}")
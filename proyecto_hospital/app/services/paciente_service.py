@@ -1,16 +1,21 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, case
+from sqlalchemy import Integer, and_, case, cast, column, func, literal, literal_column, select, table, tuple_
 from fastapi import HTTPException, status
 from typing import Optional, List
 from datetime import datetime, timedelta
 from uuid import UUID
 import json
+import re
 
+from app.core.paginacion import Paginacion
+from app.core.texto import normalizar_texto
 from app.models.paciente import Paciente, PacienteHospital
 from app.models.episodio import Episodio
 from app.models.hospital import Hospital  # Importar para resolver relaciones SQLAlchemy
+from app.services.cola_triaje import cola_triaje, ESTADOS_COLA
+from app.services.estadisticas import estadisticas
 from app.schemas.paciente import (
-    PacienteCreate, PacienteHospitalCreate, PacienteResponse, 
+    PacienteCreate, PacienteHospitalCreate, PacienteResponse, PacienteBusquedaResponse,
     PacienteHospitalResponse, PacienteCompletoCreate, PacienteCompletoResponse
 )
 from app.schemas.episodio import (
@@ -18,13 +23,22 @@ from app.schemas.episodio import (
     EstadisticasTriaje, EstadisticasHospital
 )
 
+# Tabla FTS5 de SQLite con el nombre normalizado (ver app/models/paciente.py)
+pacientes_fts = table("pacientes_fts", column("rowid"))
+
+# Texto con forma de DNI: una sola palabra con al menos un dígito
+_DNI = re.compile(r"^(?=.*\d)[0-9A-Za-z.\-]+$")
+
 class PacienteService:
     @staticmethod
-    def get_all_pacientes(db: Session, hospital_id: str) -> List[PacienteHospitalResponse]:
-        """Obtiene todos los pacientes de un hospital"""
-        pacientes_hospital = db.query(PacienteHospital).filter(
+    def get_all_pacientes(db: Session, hospital_id: str, paginacion: Optional[Paginacion] = None) -> List[PacienteHospitalResponse]:
+        """Obtiene los pacientes de un hospital (una página si se indica paginación)"""
+        query = db.query(PacienteHospital).filter(
             PacienteHospital.hospital_id == hospital_id
-        ).all()
+        )
+        if paginacion:
+            query = paginacion.keyset(query, PacienteHospital.fecha_creacion, PacienteHospital.id)
+        pacientes_hospital = query.all()
         
         return pacientes_hospital
     
@@ -43,6 +57,84 @@ class PacienteService:
             
         return paciente_hospital
     
+    @staticmethod
+    def buscar_pacientes(db: Session, texto: str, hospital_id: str, paginacion: Paginacion) -> List[PacienteBusquedaResponse]:
+        """Buscar en el registro de pacientes de todos los hospitales, ordenado por relevancia.
+
+        Un texto con forma de DNI busca por prefijo del DNI tal como se
+        registró; el resto busca por nombre normalizado: prefijo de cada
+        palabra con FTS5 en SQLite y similitud por trigramas (tolera errores
+        de tipeo) en PostgreSQL. La página siguiente se posiciona por keyset
+        sobre (puntaje, id).
+        """
+        consulta = PacienteService._coincidencias(db, texto)
+        if consulta is None:
+            return []
+        coincidencias = consulta.subquery()
+        
+        query = db.query(Paciente, coincidencias.c.puntaje).join(coincidencias, coincidencias.c.id == Paciente.id)
+        clave = paginacion.clave(int, str)
+        if clave:
+            query = query.filter(tuple_(coincidencias.c.puntaje, coincidencias.c.id) < tuple_(*clave))
+        filas = query.order_by(
+            coincidencias.c.puntaje.desc(), coincidencias.c.id.desc()
+        ).limit(paginacion.limit + 1).all()
+        
+        registrados = {
+            paciente_id for (paciente_id,) in db.query(PacienteHospital.paciente_id).filter(
+                PacienteHospital.hospital_id == hospital_id,
+                PacienteHospital.paciente_id.in_([paciente.id for paciente, _ in filas])
+            )
+        } if filas else set()
+        
+        return [
+            PacienteBusquedaResponse(
+                **PacienteResponse.model_validate(paciente).model_dump(),
+                puntaje=puntaje,
+                en_hospital=paciente.id in registrados
+            )
+            for paciente, puntaje in filas
+        ]
+    
+    @staticmethod
+    def _coincidencias(db: Session, texto: str):
+        """select (id, puntaje) de los pacientes que coinciden con el texto, o None si no hay qué buscar"""
+        texto = texto.strip()
+        if _DNI.match(texto):
+            dni = texto
+            # Rango en lugar de LIKE: usa el índice de dni en cualquier dialecto y collation
+            return select(
+                Paciente.id.label("id"),
+                case((Paciente.dni == dni, 1000), else_=900).label("puntaje")
+            ).where(Paciente.dni >= dni, Paciente.dni < dni + "\uffff")
+        
+        normalizado = normalizar_texto(texto)
+        if not normalizado:
+            return None
+        
+        dialecto = db.get_bind().dialect.name
+        if dialecto == "postgresql":
+            # texto <% nombre: alguna porción del nombre se parece a lo tipeado (índice GIN de trigramas)
+            return select(
+                Paciente.id.label("id"),
+                cast(func.word_similarity(normalizado, Paciente.nombre_normalizado) * 1000, Integer).label("puntaje")
+            ).where(literal(normalizado).op("<%")(Paciente.nombre_normalizado))
+        if dialecto == "sqlite":
+            # Cada palabra como prefijo ("gonz" encuentra "gonzalez"); bm25 es más negativo cuanto más relevante
+            expresion = " AND ".join(f'"{palabra}"*' for palabra in normalizado.split())
+            return select(
+                Paciente.id.label("id"),
+                cast(-func.bm25(literal_column("pacientes_fts")) * 1000, Integer).label("puntaje")
+            ).join(pacientes_fts, pacientes_fts.c.rowid == literal_column("pacientes.rowid")).where(
+                literal_column("pacientes_fts").op("MATCH")(expresion)
+            )
+        
+        # Otros dialectos: prefijo del nombre completo sobre el índice de nombre_normalizado
+        return select(Paciente.id.label("id"), literal(500).label("puntaje")).where(
+            Paciente.nombre_normalizado >= normalizado,
+            Paciente.nombre_normalizado < normalizado + "\uffff"
+        )
+    
     @staticmethod
     def create_paciente(db: Session, paciente_data: PacienteCreate, hospital_id: str) -> PacienteResponse:
         """Crea un nuevo paciente"""
@@ -54,8 +146,10 @@ class PacienteService:
                 detail="Ya existe un paciente con este DNI"
             )
         
-        # Crear paciente
-        db_paciente = Paciente(**paciente_data.dict())
+        # Crear paciente (numero_afiliado pertenece a la relación con el hospital)
+        datos_paciente = paciente_data.dict()
+        numero_afiliado = datos_paciente.pop("numero_afiliado", None)
+        db_paciente = Paciente(**datos_paciente)
         db.add(db_paciente)
         db.flush()  # Para obtener el ID
         
@@ -63,7 +157,8 @@ class PacienteService:
         paciente_hospital = PacienteHospital(
             paciente_id=db_paciente.id,
             hospital_id=hospital_id,
-            fecha_primera_atencion=datetime.utcnow()
+            fecha_primera_atencion=datetime.utcnow(),
+            numero_afiliado=numero_afiliado
         )
         db.add(paciente_hospital)
         db.commit()
@@ -182,6 +277,8 @@ class PacienteService:
         
         db.commit()
         db.refresh(db_episodio)
+        cola_triaje.actualizar(db_episodio)
+        estadisticas.actualizar_episodio(db_episodio)
         
         return db_episodio
     
@@ -190,19 +287,14 @@ class PacienteService:
         """
         Obtiene la lista de espera de episodios para un hospital.
         Permite filtrar para obtener pacientes CON o SIN triaje asignado.
+        Los estados del workflow con cola en memoria se sirven sin consultar la DB.
         """
-        from sqlalchemy import case
-
-        # 🔧 REFACTORIZACIÓN: Mapeo de colores usando columna explícita
-        triage_order = case(
-            (Episodio.color_triaje == 'ROJO', 1),
-            (Episodio.color_triaje == 'NARANJA', 2),
-            (Episodio.color_triaje == 'AMARILLO', 3),
-            (Episodio.color_triaje == 'VERDE', 4),
-            (Episodio.color_triaje == 'AZUL', 5),
-            else_=6
-        )
-
+        if estado in ESTADOS_COLA:
+            return [
+                EpisodioListaEspera(**episodio)
+                for episodio in cola_triaje.listar(hospital_id, estado, con_triaje=con_triaje)
+            ]
+        
         query = db.query(
             Episodio.id,
             Paciente.dni.label('paciente_dni'),
@@ -230,7 +322,7 @@ class PacienteService:
             # Incluir solo los que NO tienen un color_triaje
             query = query.filter(Episodio.color_triaje == None)
 
-        episodios = query.order_by(triage_order, Episodio.fecha_inicio).all()
+        episodios = query.order_by(Episodio.prioridad_triaje, Episodio.fecha_inicio).all()
         
         resultado = []
         for episodio in episodios:
@@ -265,35 +357,16 @@ class PacienteService:
     
     @staticmethod
     def get_estadisticas_hospital(db: Session, hospital_id: str) -> EstadisticasHospital:
-        """Obtiene estadísticas reales del hospital usando queries SQL optimizadas."""
-        
-        # Query para contar episodios activos totales y calcular tiempo promedio
-        base_query = db.query(Episodio).filter(
-            and_(
-                Episodio.hospital_id == hospital_id,
-                Episodio.estado == 'activo'
-            )
-        )
-        
-        total_pacientes = base_query.count()
-        
-        # Calcular tiempo de espera promedio en minutos
-        avg_wait_time_seconds = base_query.with_entities(
-            func.avg(func.strftime('%s', datetime.utcnow()) - func.strftime('%s', Episodio.fecha_inicio))
-        ).scalar() or 0
-        promedio_tiempo = avg_wait_time_seconds / 60
+        """Obtiene estadísticas del hospital desde los contadores pre-agregados (app/services/estadisticas.py)."""
+        snapshot = estadisticas.snapshot(hospital_id)
         
-        # 🔧 REFACTORIZACIÓN: Query para contar por color de triaje usando columna explícita
-        triage_counts_query = base_query.with_entities(
-            Episodio.color_triaje.label('color'),
-            func.count(Episodio.id).label('count')
-        ).group_by(Episodio.color_triaje).all()
+        total_pacientes = snapshot["total_pacientes_espera"]
+        promedio_tiempo = snapshot["promedio_tiempo_espera"] or 0
         
-        # Inicializar estadísticas
         stats = EstadisticasTriaje()
-        for row in triage_counts_query:
-            if row.color and hasattr(stats, row.color):
-                setattr(stats, row.color, row.count)
+        for color, cantidad in snapshot["espera_por_color"].items():
+            if hasattr(stats, color):
+                setattr(stats, color, cantidad)
         
         # Generar alertas si es necesario
         alerts = []
@@ -338,6 +411,8 @@ class PacienteService:
         episodio.color_triaje = color
         db.commit()
         db.refresh(episodio)
+        cola_triaje.actualizar(episodio)
+        estadisticas.actualizar_episodio(episodio)
         
         # Preparar datos_json para compatibilidad (puede contener otros datos)
         datos_json = {}
@@ -0,0 +1,55 @@
+from typing import List, Optional, Sequence
+import re
+
+UNIDADES_INTERVALO = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parsear_intervalo(valor: str) -> Optional[int]:
+    """'30s', '5m', '1h', '1d' -> segundos; None si el formato no es válido"""
+    coincidencia = re.fullmatch(r"(\d+)([smhd])", valor.strip().lower())
+    if not coincidencia:
+        return None
+    segundos = int(coincidencia.group(1)) * UNIDADES_INTERVALO[coincidencia.group(2)]
+    return segundos or None
+
+def lttb(puntos: Sequence[tuple], umbral: int) -> List[tuple]:
+    """Submuestreo Largest-Triangle-Three-Buckets.
+
+    `puntos` son tuplas ordenadas cuyo primer elemento es x (numérico) y el
+    segundo y; el resto de la tupla se conserva. Devuelve `umbral` puntos
+    que mantienen la forma de la curva (picos y valles incluidos), siempre
+    con el primero y el último.
+    """
+    n = len(puntos)
+    if umbral >= n or umbral < 3:
+        return list(puntos)
+
+    resultado = [puntos[0]]
+    tamano = (n - 2) / (umbral - 2)
+    anterior = 0
+
+    for i in range(umbral - 2):
+        # Promedio del intervalo siguiente (tercer vértice del triángulo)
+        inicio_siguiente = int((i + 1) * tamano) + 1
+        fin_siguiente = min(int((i + 2) * tamano) + 1, n)
+        siguiente = puntos[inicio_siguiente:fin_siguiente]
+        promedio_x = sum(p[0] for p in siguiente) / len(siguiente)
+        promedio_y = sum(p[1] for p in siguiente) / len(siguiente)
+
+        # Punto del intervalo actual que forma el triángulo de mayor área
+        ax, ay = puntos[anterior][0], puntos[anterior][1]
+        elegido = inicio = int(i * tamano) + 1
+        area_maxima = -1.0
+        for j in range(inicio, int((i + 1) * tamano) + 1):
+            area = abs(
+                (ax - promedio_x) * (puntos[j][1] - ay)
+                - (ax - puntos[j][0]) * (promedio_y - ay)
+            )
+            if area > area_maxima:
+                area_maxima = area
+                elegido = j
+
+        resultado.append(puntos[elegido])
+        anterior = elegido
+
+    resultado.append(puntos[-1])
+    return resultado
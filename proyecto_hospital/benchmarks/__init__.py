@@ -0,0 +1,20 @@
+"""
+Banco de pruebas de rendimiento del workflow de emergencias.
+
+    python -m benchmarks --pacientes 5000 --episodios 20000 --flujos 300 --concurrencia 20
+
+Siembra un hospital sintético (pacientes, episodios, camas de shockroom y
+signos vitales) en la base de DATABASE_URL (SQLite o PostgreSQL), recorre el
+workflow admisión -> triaje -> decisión -> tomar paciente -> decisión final
+con httpx.AsyncClient contra la app ASGI y escribe un JSON con throughput y
+p50/p95/p99 por endpoint, para comparar resultados entre commits.
+
+Los datos históricos salen de benchmarks.generador, que también se usa
+solo para cargar una base a escala de producción:
+
+    python -m benchmarks.generador --episodios 1000000 --frecuencia-signos 10
+
+Con SQLite los escritores se serializan: con --concurrencia > 1 las
+esperas por el lock (SQLITE_BUSY_TIMEOUT_MS) dominan las latencias. Para
+medir concurrencia usar PostgreSQL (--db postgresql://...).
+"""
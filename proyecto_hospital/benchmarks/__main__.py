@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _argumentos():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark del workflow de emergencias contra la app ASGI"
+    )
+    parser.add_argument("--db", default=os.environ.get("DATABASE_URL", "sqlite:///./benchmark.db"),
+                        help="URL de la base (SQLite o PostgreSQL); por defecto DATABASE_URL o ./benchmark.db")
+    parser.add_argument("--url", help="Servidor en ejecución (p. ej. http://localhost:8000); sin esto se usa la app en proceso")
+    parser.add_argument("--pacientes", type=int, default=2000)
+    parser.add_argument("--episodios", type=int, default=10000)
+    parser.add_argument("--camas", type=int, default=8)
+    parser.add_argument("--frecuencia-signos", type=float, default=1.0,
+                        help="Multiplicador de la cadencia de signos vitales (ver benchmarks.generador)")
+    parser.add_argument("--flujos", type=int, default=200, help="Pacientes que recorren el workflow completo")
+    parser.add_argument("--concurrencia", type=int, default=10)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-siembra", action="store_true", help="Reutilizar los datos ya sembrados")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    return parser.parse_args()
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+async def _correr(args, credenciales: dict) -> dict:
+    import httpx
+    from benchmarks.carga import ejecutar
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as cliente:
+            return await ejecutar(cliente, credenciales, args.flujos, args.concurrencia, args.semilla)
+
+    from app.main import app
+    # ASGITransport no emite los eventos lifespan: startup/shutdown a mano
+    await app.router.startup()
+    try:
+        # Los 500 se cuentan como errores del flujo en lugar de propagarse
+        transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=60) as cliente:
+            return await ejecutar(cliente, credenciales, args.flujos, args.concurrencia, args.semilla)
+    finally:
+        await app.router.shutdown()
+
+def main():
+    args = _argumentos()
+    # La configuración se lee al importar app.*: fijarla antes
+    os.environ["DATABASE_URL"] = args.db
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, RAIZ)
+
+    from app.core.database import Base, SessionLocal, engine
+    import app.models  # Registrar todos los modelos en Base.metadata
+    from benchmarks.semilla import sembrar, HOSPITAL_ID, USUARIO, PASSWORD
+
+    Base.metadata.create_all(bind=engine)
+    credenciales = {"hospital_code": HOSPITAL_ID, "username": USUARIO, "password": PASSWORD}
+    siembra = {"camas": args.camas, "frecuencia_signos": args.frecuencia_signos, "duracion_s": None}
+    if not args.sin_siembra:
+        inicio = time.perf_counter()
+        db = SessionLocal()
+        try:
+            sembrado = sembrar(db, args.pacientes, args.episodios, args.camas, args.frecuencia_signos, args.semilla)
+        finally:
+            db.close()
+        credenciales = sembrado["credenciales"]
+        siembra.update(sembrado["totales"], duracion_s=round(time.perf_counter() - inicio, 2))
+
+    resultado = asyncio.run(_correr(args, credenciales))
+    reporte = {
+        "commit": _commit(),
+        "fecha": datetime.utcnow().isoformat(),
+        "base_de_datos": engine.dialect.name,
+        "destino": args.url or "asgi",
+        "siembra": siembra,
+        **resultado
+    }
+
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from typing import Dict, List, Optional
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+# Percentiles reportados por endpoint
+PERCENTILES = (50, 95, 99)
+
+COLORES = ["ROJO", "NARANJA", "AMARILLO", "VERDE", "AZUL"]
+
+class ErrorFlujo(Exception):
+    pass
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenados:
+        return 0.0
+    indice = max(0, min(len(ordenados) - 1, int(-(-p * len(ordenados) // 100)) - 1))
+    return ordenados[indice]
+
+class Medidor:
+    """Latencias por endpoint (clave = método y plantilla de la ruta)"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = {}
+        self.errores: Dict[str, int] = {}
+
+    async def solicitud(self, cliente: httpx.AsyncClient, metodo: str, plantilla: str,
+                        url: Optional[str] = None, **kwargs) -> httpx.Response:
+        clave = f"{metodo} {plantilla}"
+        inicio = time.perf_counter()
+        respuesta = await cliente.request(metodo, url or plantilla, **kwargs)
+        self.latencias.setdefault(clave, []).append(time.perf_counter() - inicio)
+        if respuesta.status_code >= 400:
+            self.errores[clave] = self.errores.get(clave, 0) + 1
+            raise ErrorFlujo(f"{clave} -> {respuesta.status_code}: {respuesta.text[:200]}")
+        return respuesta
+
+    def reporte(self, duracion: float) -> Dict[str, dict]:
+        resultado = {}
+        for clave in sorted(self.latencias):
+            ordenadas = sorted(self.latencias[clave])
+            resultado[clave] = {
+                "solicitudes": len(ordenadas),
+                "errores": self.errores.get(clave, 0),
+                "por_segundo": round(len(ordenadas) / duracion, 1),
+                "promedio_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 2),
+                **{f"p{p}_ms": round(percentil(ordenadas, p) * 1000, 2) for p in PERCENTILES},
+                "max_ms": round(ordenadas[-1] * 1000, 2)
+            }
+        return resultado
+
+async def flujo_emergencia(cliente: httpx.AsyncClient, medidor: Medidor, rng: random.Random):
+    """Un paciente completo: admisión -> triaje -> decisión -> tomar -> decisión final"""
+    paciente = (await medidor.solicitud(cliente, "POST", "/pacientes/", json={
+        "dni": f"F{uuid.uuid4().hex[:15]}",
+        "nombre_completo": f"Paciente flujo {rng.randint(1, 10**6)}",
+        "sexo": rng.choice("MF")
+    })).json()
+    episodio = (await medidor.solicitud(cliente, "POST", "/episodios/", json={
+        "paciente_id": paciente["id"],
+        "tipo": "consulta",
+        "motivo_consulta": "Dolor abdominal"
+    })).json()
+    episodio_id = episodio["id"]
+    await medidor.solicitud(cliente, "POST", "/admision/", json={
+        "paciente_id": paciente["id"],
+        "episodio_id": episodio_id,
+        "tipo_admision": "Guardia",
+        "motivo_consulta": "Dolor abdominal"
+    })
+
+    await medidor.solicitud(cliente, "GET", "/episodios/espera-triaje", params={"limit": 50})
+    await medidor.solicitud(cliente, "PUT", "/episodios/{episodio_id}/triaje", f"/episodios/{episodio_id}/triaje", json={
+        "color_triaje": rng.choices(COLORES, weights=[3, 12, 35, 40, 10])[0],
+        "signos_vitales": {"frecuencia_cardiaca": rng.randint(60, 120), "saturacion_oxigeno": rng.randint(90, 100)},
+        "evaluacion_enfermeria": "Evaluación de benchmark"
+    })
+    await medidor.solicitud(
+        cliente, "PUT", "/episodios/{episodio_id}/decision-post-triaje",
+        f"/episodios/{episodio_id}/decision-post-triaje", json={"decision": "lista_medica"}
+    )
+
+    await medidor.solicitud(cliente, "GET", "/episodios/lista-medica", params={"limit": 50})
+    await medidor.solicitud(cliente, "PUT", "/episodios/{episodio_id}/tomar-paciente", f"/episodios/{episodio_id}/tomar-paciente")
+    await medidor.solicitud(cliente, "GET", "/reportes/estadisticas")
+    await medidor.solicitud(
+        cliente, "PUT", "/episodios/{episodio_id}/decision-final",
+        f"/episodios/{episodio_id}/decision-final", json={"decision": "alta", "indicaciones_alta": "Control en 48 h"}
+    )
+
+async def ejecutar(cliente: httpx.AsyncClient, credenciales: dict, flujos: int, concurrencia: int, semilla: int = 1) -> dict:
+    """Correr `flujos` pacientes con `concurrencia` flujos simultáneos"""
+    respuesta = await cliente.post("/auth/login", json=credenciales)
+    respuesta.raise_for_status()
+    cliente.headers["Authorization"] = f"Bearer {respuesta.json()['access_token']}"
+
+    medidor = Medidor()
+    pendientes = iter(range(flujos))
+    fallidos: List[str] = []
+
+    async def trabajador(numero: int):
+        rng = random.Random(semilla * 1000 + numero)
+        for _ in pendientes:
+            try:
+                await flujo_emergencia(cliente, medidor, rng)
+            except ErrorFlujo as e:
+                fallidos.append(str(e))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(n) for n in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "flujos": flujos,
+        "flujos_fallidos": len(fallidos),
+        "concurrencia": concurrencia,
+        "duracion_s": round(duracion, 3),
+        "flujos_por_segundo": round((flujos - len(fallidos)) / duracion, 2),
+        "solicitudes_por_segundo": round(sum(map(len, medidor.latencias.values())) / duracion, 1),
+        "endpoints": medidor.reporte(duracion),
+        "primeros_errores": fallidos[:5]
+    }
@@ -0,0 +1,379 @@
+"""
+Generador de datos sintéticos a escala de producción.
+
+    python -m benchmarks.generador --db postgresql://... --episodios 1000000 --frecuencia-signos 10
+
+Escribe pacientes, episodios y signos vitales con distribuciones realistas
+(mezcla de colores de triaje, curva de llegadas por hora, estancia según el
+color, cadencia de controles) en lotes: COPY FROM STDIN en PostgreSQL
+(psycopg2) y un executemany de Core (insert() de la tabla) en el resto. Nada se arma entero en
+memoria: cada lote de episodios y sus signos se escribe y se descarta.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import csv
+import io
+import logging
+import math
+import os
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 20000
+
+# Mezcla de colores de triaje de una guardia típica
+COLORES_TRIAJE = {"ROJO": 0.03, "NARANJA": 0.12, "AMARILLO": 0.35, "VERDE": 0.40, "AZUL": 0.10}
+
+# Llegadas por hora del día (peso relativo): valle de madrugada, picos a media mañana y al anochecer
+LLEGADAS_POR_HORA = (
+    2.0, 1.5, 1.2, 1.0, 1.0, 1.2, 2.0, 3.5, 5.0, 6.0, 6.5, 6.5,
+    6.0, 5.5, 5.5, 5.5, 5.5, 6.0, 6.5, 6.0, 5.0, 4.0, 3.5, 2.5
+)
+
+# Espera desde la llegada hasta el triaje (minutos, media de una exponencial)
+ESPERA_TRIAJE_MINUTOS = 8
+# Espera desde el triaje hasta la atención médica según el color (minutos, media)
+ESPERA_MEDICO_MINUTOS = {"ROJO": 2, "NARANJA": 10, "AMARILLO": 45, "VERDE": 90, "AZUL": 150}
+# Estancia desde la atención médica hasta el cierre: lognormal (mediana en horas, sigma)
+ESTANCIA_HORAS = {
+    "ROJO": (10.0, 0.7), "NARANJA": (6.0, 0.6), "AMARILLO": (3.5, 0.6), "VERDE": (1.5, 0.5), "AZUL": (0.8, 0.5)
+}
+# Cada cuántos minutos se controlan los signos vitales según el color
+CADENCIA_SIGNOS_MINUTOS = {"ROJO": 15, "NARANJA": 30, "AMARILLO": 60, "VERDE": 120, "AZUL": 240}
+# Probabilidad de que el episodio termine en internación (el resto es alta)
+PROBABILIDAD_INTERNACION = {"ROJO": 0.55, "NARANJA": 0.30, "AMARILLO": 0.12, "VERDE": 0.03, "AZUL": 0.01}
+# Valores medios de los signos según el color: (FC, FR, TAS, TAD, SatO2, temperatura)
+SIGNOS_BASE = {
+    "ROJO": (118, 26, 95, 58, 89.0, 37.9),
+    "NARANJA": (104, 22, 140, 88, 93.0, 37.6),
+    "AMARILLO": (92, 18, 132, 82, 96.0, 37.2),
+    "VERDE": (82, 16, 124, 78, 97.5, 36.9),
+    "AZUL": (76, 15, 120, 76, 98.0, 36.7),
+}
+
+MOTIVOS_CONSULTA = {
+    "ROJO": ["Paro cardiorrespiratorio", "Politraumatismo", "Shock séptico", "Insuficiencia respiratoria"],
+    "NARANJA": ["Dolor torácico", "Disnea", "Déficit neurológico agudo", "Hemorragia digestiva"],
+    "AMARILLO": ["Dolor abdominal", "Fiebre persistente", "Traumatismo de miembro", "Vómitos"],
+    "VERDE": ["Cefalea", "Lumbalgia", "Odinofagia", "Mareos"],
+    "AZUL": ["Control de presión", "Receta", "Curación", "Certificado"],
+}
+NOMBRES = [
+    "Juan", "María", "Carlos", "Ana", "Pedro", "Laura", "Diego", "Sofía", "Miguel", "Elena",
+    "José", "Lucía", "Martín", "Valentina", "Jorge", "Camila", "Andrés", "Florencia", "Raúl", "Mónica"
+]
+APELLIDOS = [
+    "González", "Rodríguez", "López", "Martínez", "García", "Fernández", "Pérez", "Sánchez", "Romero", "Torres",
+    "Díaz", "Álvarez", "Ruiz", "Gómez", "Acuña", "Benítez", "Muñoz", "Ibáñez", "Núñez", "Peña"
+]
+
+_HORAS = list(range(24))
+_COLORES = list(COLORES_TRIAJE)
+_PESOS_COLORES = list(COLORES_TRIAJE.values())
+
+class EscritorBulk:
+    """Inserción por lotes con un executemany de Core (cualquier dialecto).
+
+    Mismo resultado que bulk_insert_mappings pero sin la capa del ORM, que
+    con millones de filas cuesta más que generar los datos.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        if db.get_bind().dialect.name == "sqlite":
+            # Caché de páginas de 256 MB: los índices por uuid reciben claves al azar
+            db.execute(text("PRAGMA cache_size=-262144"))
+
+    def escribir(self, modelo, filas: List[dict]):
+        if filas:
+            self.db.execute(modelo.__table__.insert(), filas)
+        self.db.commit()
+
+    def cerrar(self):
+        pass
+
+class EscritorCopy:
+    """COPY ... FROM STDIN de PostgreSQL sobre la conexión psycopg2 del engine"""
+
+    def __init__(self, engine):
+        self.conexion = engine.raw_connection()
+
+    def escribir(self, modelo, filas: List[dict]):
+        if not filas:
+            return
+        columnas = list(filas[0])
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for fila in filas:
+            # En formato csv el campo vacío sin comillas es NULL
+            escritor.writerow([fila[columna] for columna in columnas])
+        buffer.seek(0)
+
+        cursor = self.conexion.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {modelo.__tablename__} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+        self.conexion.commit()
+
+    def cerrar(self):
+        self.conexion.close()
+
+def crear_escritor(db):
+    """COPY si el driver lo soporta (psycopg2); si no, executemany de Core"""
+    engine = db.get_bind()
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+        return EscritorCopy(engine)
+    return EscritorBulk(db)
+
+class GeneradorSintetico:
+    """Pacientes, episodios y signos vitales sintéticos de un hospital.
+
+    Los tiempos de cada episodio se encadenan (llegada -> triaje -> médico ->
+    cierre) y el estado sale de comparar esos tiempos con `ahora`: los
+    episodios recientes quedan abiertos en la etapa que les toca. Con la
+    misma semilla se generan los mismos datos (incluidos los ids): para sumar
+    datos a una base ya cargada usar otra semilla.
+    """
+
+    def __init__(self, hospital_id: str, semilla: int = 1, tamano_lote: int = TAMANO_LOTE,
+                 ahora: Optional[datetime] = None):
+        self.hospital_id = hospital_id
+        self.rng = random.Random(semilla)
+        self.tamano_lote = tamano_lote
+        self.ahora = ahora or datetime.utcnow()
+        self.ids_pacientes: List[str] = []
+        self.totales: Dict[str, int] = {"pacientes": 0, "episodios": 0, "signos_vitales": 0}
+        self._acumulado_horas = list(_acumulado(LLEGADAS_POR_HORA))
+        self._acumulado_colores = list(_acumulado(_PESOS_COLORES))
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def pacientes(self, cantidad: int, escritor):
+        """Pacientes con su relación al hospital"""
+        from app.core.texto import normalizar_texto
+        from app.models.paciente import Paciente, PacienteHospital
+
+        rng = self.rng
+        prefijo = f"{rng.getrandbits(24):06x}"
+        for inicio_lote in range(0, cantidad, self.tamano_lote):
+            filas_pacientes = []
+            filas_relacion = []
+            for i in range(inicio_lote, min(cantidad, inicio_lote + self.tamano_lote)):
+                paciente_id = self._uuid()
+                nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+                # Edad: mezcla de adultos jóvenes y mayores, acotada a 0-100 años
+                edad = min(100, max(0, int(rng.gauss(45, 22))))
+                alta = self.ahora - timedelta(days=rng.randint(0, 3650))
+                filas_pacientes.append({
+                    "id": paciente_id,
+                    "dni": f"S{prefijo}{i:09d}",
+                    "nombre_completo": nombre,
+                    # La inserción masiva no pasa por el validador del modelo
+                    "nombre_normalizado": normalizar_texto(nombre),
+                    "fecha_nacimiento": date.fromordinal(self.ahora.date().toordinal() - edad * 365 - rng.randint(0, 364)),
+                    "sexo": rng.choice("MF"),
+                    "fecha_creacion": alta,
+                    "fecha_ultima_actualizacion": alta
+                })
+                filas_relacion.append({
+                    "id": self._uuid(),
+                    "paciente_id": paciente_id,
+                    "hospital_id": self.hospital_id,
+                    "fecha_primera_atencion": alta,
+                    "fecha_creacion": alta
+                })
+                self.ids_pacientes.append(paciente_id)
+            escritor.escribir(Paciente, filas_pacientes)
+            escritor.escribir(PacienteHospital, filas_relacion)
+            self.totales["pacientes"] += len(filas_pacientes)
+            logger.info(f"👥 Pacientes: {self.totales['pacientes']}/{cantidad}")
+
+    def episodios(self, cantidad: int, escritor, dias: int = 365, frecuencia_signos: float = 1.0):
+        """Episodios repartidos en los últimos `dias` días con sus signos vitales.
+
+        `frecuencia_signos` multiplica la cadencia de controles: 1 es el
+        control manual de enfermería (~5 por episodio), 10 se parece a un
+        monitor multiparamétrico (~50 por episodio).
+        """
+        from app.models.enfermeria import SignosVitales
+        from app.models.episodio import Episodio
+
+        if not self.ids_pacientes:
+            raise ValueError("Generar los pacientes antes que los episodios")
+
+        # La ventana arranca a medianoche para que la hora de llegada respete la curva
+        inicio_ventana = datetime.combine(self.ahora.date(), datetime.min.time()) - timedelta(days=dias - 1)
+        for inicio_lote in range(0, cantidad, self.tamano_lote):
+            filas_episodios = []
+            filas_signos = []
+            for _ in range(min(self.tamano_lote, cantidad - inicio_lote)):
+                fila, signos = self._episodio(inicio_ventana, dias, frecuencia_signos)
+                filas_episodios.append(fila)
+                filas_signos.extend(signos)
+            # Los episodios van antes que sus signos vitales (clave foránea)
+            escritor.escribir(Episodio, filas_episodios)
+            for inicio_signos in range(0, len(filas_signos), self.tamano_lote):
+                escritor.escribir(SignosVitales, filas_signos[inicio_signos:inicio_signos + self.tamano_lote])
+            self.totales["episodios"] += len(filas_episodios)
+            self.totales["signos_vitales"] += len(filas_signos)
+            logger.info(
+                f"🚑 Episodios: {self.totales['episodios']}/{cantidad} "
+                f"(signos vitales: {self.totales['signos_vitales']})"
+            )
+
+    def _episodio(self, inicio_ventana: datetime, dias: int, frecuencia_signos: float):
+        from app.models.episodio import PRIORIDAD_TRIAJE, SIN_TRIAJE
+
+        rng = self.rng
+        hora = rng.choices(_HORAS, cum_weights=self._acumulado_horas)[0]
+        llegada = inicio_ventana + timedelta(days=rng.randrange(dias), hours=hora, seconds=rng.random() * 3600)
+        if llegada > self.ahora:
+            # Hora de hoy que todavía no llegó: la misma hora del día anterior
+            llegada -= timedelta(days=1)
+        color = rng.choices(_COLORES, cum_weights=self._acumulado_colores)[0]
+        triaje = llegada + timedelta(minutes=rng.expovariate(1 / ESPERA_TRIAJE_MINUTOS))
+        atencion = triaje + timedelta(minutes=rng.expovariate(1 / ESPERA_MEDICO_MINUTOS[color]))
+        mediana, sigma = ESTANCIA_HORAS[color]
+        cierre = atencion + timedelta(hours=rng.lognormvariate(math.log(mediana), sigma))
+
+        fila = {
+            "id": self._uuid(),
+            "paciente_id": rng.choice(self.ids_pacientes),
+            "hospital_id": self.hospital_id,
+            "tipo": "emergencia" if color in ("ROJO", "NARANJA") else "consulta",
+            "estado": "finalizado",
+            "color_triaje": color,
+            "prioridad_triaje": PRIORIDAD_TRIAJE[color],
+            "motivo_consulta": rng.choice(MOTIVOS_CONSULTA[color]),
+            "fecha_inicio": llegada,
+            "fecha_triaje": triaje,
+            "decision_post_triaje": "lista_medica",
+            "fecha_inicio_atencion": atencion,
+            "fecha_cierre": cierre,
+            "decision_final": None,
+            "fecha_decision_final": cierre,
+            "en_shockroom": color == "ROJO",
+            "creado_por": "generador",
+            "ultima_modificacion": cierre
+        }
+        if self.ahora < cierre:
+            # Episodio todavía abierto: queda en la etapa que corresponde a `ahora`
+            fila.update(fecha_cierre=None, fecha_decision_final=None, ultima_modificacion=self.ahora)
+            if self.ahora < triaje:
+                fila.update(
+                    estado="espera_triaje", color_triaje=None, prioridad_triaje=SIN_TRIAJE, fecha_triaje=None,
+                    decision_post_triaje=None, fecha_inicio_atencion=None, en_shockroom=False
+                )
+                return fila, []
+            if self.ahora < atencion:
+                fila.update(estado="en_lista_medica", fecha_inicio_atencion=None, en_shockroom=False)
+            else:
+                fila["estado"] = "en_shockroom" if color == "ROJO" else "en_atencion"
+        else:
+            fila["decision_final"] = "internacion" if rng.random() < PROBABILIDAD_INTERNACION[color] else "alta"
+
+        return fila, self._signos(fila["id"], color, triaje, min(cierre, self.ahora), frecuencia_signos)
+
+    def _signos(self, episodio_id: str, color: str, desde: datetime, hasta: datetime, frecuencia: float) -> List[dict]:
+        """Controles desde el triaje hasta el cierre con la cadencia del color (±20 %)"""
+        rng = self.rng
+        fc, fr, tas, tad, sat, temp = SIGNOS_BASE[color]
+        cadencia = CADENCIA_SIGNOS_MINUTOS[color] / frecuencia
+        filas = []
+        momento = desde
+        while momento <= hasta:
+            filas.append({
+                "id": self._uuid(),
+                "episodio_id": episodio_id,
+                "hospital_id": self.hospital_id,
+                "presion_arterial_sistolica": int(rng.gauss(tas, 15)),
+                "presion_arterial_diastolica": int(rng.gauss(tad, 10)),
+                "frecuencia_cardiaca": int(rng.gauss(fc, 10)),
+                "frecuencia_respiratoria": int(rng.gauss(fr, 3)),
+                "temperatura": round(rng.gauss(temp, 0.4), 1),
+                "saturacion_oxigeno": round(min(100.0, rng.gauss(sat, 2)), 1),
+                "fecha_hora_registro": momento,
+                "usuario_registro": "generador"
+            })
+            momento += timedelta(minutes=cadencia * rng.uniform(0.8, 1.2))
+        return filas
+
+def _acumulado(pesos):
+    total = 0.0
+    for peso in pesos:
+        total += peso
+        yield total
+
+def actualizar_estadisticas_planificador(db):
+    """ANALYZE para que el planificador vea los volúmenes recién cargados"""
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+def _argumentos():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generador",
+        description="Generar datos sintéticos a escala de producción"
+    )
+    parser.add_argument("--db", default=os.environ.get("DATABASE_URL", "sqlite:///./benchmark.db"),
+                        help="URL de la base (SQLite o PostgreSQL); por defecto DATABASE_URL o ./benchmark.db")
+    parser.add_argument("--hospital", default=None, help="Id del hospital (por defecto el del benchmark)")
+    parser.add_argument("--episodios", type=int, default=100000)
+    parser.add_argument("--pacientes", type=int, help="Por defecto un tercio de los episodios (reconsultas)")
+    parser.add_argument("--dias", type=int, default=365, help="Ventana de llegadas hacia atrás desde hoy")
+    parser.add_argument("--frecuencia-signos", type=float, default=1.0,
+                        help="Multiplicador de la cadencia de signos vitales (10 ≈ 50 por episodio)")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--semilla", type=int, default=1)
+    return parser.parse_args()
+
+def main():
+    args = _argumentos()
+    # La configuración se lee al importar app.*: fijarla antes
+    os.environ["DATABASE_URL"] = args.db
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    from app.core.database import Base, SessionLocal, engine
+    import app.models  # Registrar todos los modelos en Base.metadata
+    from benchmarks.semilla import HOSPITAL_ID, preparar_hospital
+
+    Base.metadata.create_all(bind=engine)
+    hospital_id = args.hospital or HOSPITAL_ID
+    db = SessionLocal()
+    escritor = None
+    try:
+        credenciales = preparar_hospital(db, hospital_id)
+        escritor = crear_escritor(db)
+        generador = GeneradorSintetico(hospital_id, args.semilla, args.lote)
+
+        inicio = time.perf_counter()
+        generador.pacientes(args.pacientes or max(1, args.episodios // 3), escritor)
+        generador.episodios(args.episodios, escritor, args.dias, args.frecuencia_signos)
+        actualizar_estadisticas_planificador(db)
+        duracion = time.perf_counter() - inicio
+
+        filas = sum(generador.totales.values())
+        logger.info(
+            f"✅ {generador.totales} en {duracion:.1f} s ({filas / duracion:,.0f} filas/s, "
+            f"{type(escritor).__name__}); login: {credenciales}"
+        )
+    finally:
+        if escritor is not None:
+            escritor.cerrar()
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import uuid
+
+from app.core.security import get_password_hash
+from app.models.hospital import Hospital
+from app.models.shockroom import ShockroomCama
+from app.models.usuario import Usuario
+from benchmarks.generador import EscritorBulk, GeneradorSintetico, crear_escritor
+
+HOSPITAL_ID = "BENCH"
+USUARIO = "bench"
+PASSWORD = "bench"
+
+def preparar_hospital(db, hospital_id: str = HOSPITAL_ID) -> dict:
+    """Crear (si no existen) el hospital y el usuario médico del benchmark.
+
+    Devuelve las credenciales para iniciar sesión en la app.
+    """
+    db.merge(Hospital(id=hospital_id, nombre="Hospital de benchmark", tipo="publico"))
+    if not db.query(Usuario).filter(Usuario.username == USUARIO, Usuario.hospital_id == hospital_id).first():
+        db.add(Usuario(
+            username=USUARIO, password_hash=get_password_hash(PASSWORD), hospital_id=hospital_id,
+            nombre="Bench", apellido="Mark", rol="medico"
+        ))
+    db.commit()
+    return {"hospital_code": hospital_id, "username": USUARIO, "password": PASSWORD}
+
+def sembrar(db, pacientes: int, episodios: int, camas: int, frecuencia_signos: float = 1.0, semilla: int = 1) -> dict:
+    """Crear el hospital de prueba con su usuario y datos históricos.
+
+    Los datos salen de benchmarks.generador. Devuelve las credenciales y los
+    totales generados.
+    """
+    credenciales = preparar_hospital(db)
+    generador = GeneradorSintetico(HOSPITAL_ID, semilla)
+    escritor = crear_escritor(db)
+    try:
+        generador.pacientes(pacientes, escritor)
+        generador.episodios(episodios, escritor, frecuencia_signos=frecuencia_signos)
+    finally:
+        escritor.cerrar()
+
+    existentes = db.query(ShockroomCama).filter(ShockroomCama.hospital_id == HOSPITAL_ID).count()
+    EscritorBulk(db).escribir(ShockroomCama, [
+        {
+            "id": str(uuid.uuid4()),
+            "hospital_id": HOSPITAL_ID,
+            "numero_cama": f"SR-{n:02d}",
+            "posicion_x": n % 4,
+            "posicion_y": n // 4,
+            "estado": "disponible",
+            "tipo_cama": "critica"
+        }
+        for n in range(existentes + 1, camas + 1)
+    ])
+
+    return {"credenciales": credenciales, "totales": generador.totales}
@@ -1,11 +1,12 @@
 import sys
 import os
-from collections import defaultdict
+from itertools import groupby
 
 # Add the project root to the Python path to allow imports from 'app'
 # This ensures that the script can find the necessary modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.models.paciente import Paciente
@@ -16,26 +17,27 @@ from app.models.usuario import Usuario
 def find_duplicate_patients():
     """
     Connects to the database to detect and report duplicate patients based on their full name,
-    ignoring case and leading/trailing whitespace.
+    ignoring case, accents, punctuation and extra whitespace (Paciente.nombre_normalizado).
     """
     db: Session = SessionLocal()
     try:
-        all_patients = db.query(Paciente).all()
-        
-        # Group patients by their normalized full name to find duplicates
-        grouped_by_name = defaultdict(list)
-        for patient in all_patients:
-            if patient.nombre_completo:
-                # Normalize the name for accurate comparison
-                normalized_name = patient.nombre_completo.strip().lower()
-                grouped_by_name[normalized_name].append(patient)
+        # The database groups by the indexed normalized name; only duplicated rows are read,
+        # streamed in name order instead of loading every patient into memory
+        duplicated_names = db.query(Paciente.nombre_normalizado).filter(
+            Paciente.nombre_normalizado.isnot(None),
+            Paciente.nombre_normalizado != ""
+        ).group_by(Paciente.nombre_normalizado).having(func.count() > 1).subquery()
+        duplicated_patients = db.query(Paciente).join(
+            duplicated_names, duplicated_names.c.nombre_normalizado == Paciente.nombre_normalizado
+        ).order_by(Paciente.nombre_normalizado, Paciente.fecha_creacion).yield_per(1000)
         
         print("="*60)
         print("      Análisis de Pacientes Duplicados por Nombre")
         print("="*60)
         
         duplicates_found = False
-        for normalized_name, patients_list in grouped_by_name.items():
+        for normalized_name, patients in groupby(duplicated_patients, key=lambda p: p.nombre_normalizado):
+            patients_list = list(patients)
             if len(patients_list) > 1:
                 if not duplicates_found:
                     print("Se han detectado los siguientes pacientes duplicados:")
@@ -63,6 +65,7 @@ def find_duplicate_patients():
     except Exception as e:
         print(f"\n❌ Error durante el análisis: {e}")
         print("  - Asegúrese de que la base de datos 'hospital_db.sqlite' exista y sea accesible.")
+        print("  - Ejecute actualizar_db_workflow.py para crear y completar la columna 'nombre_normalizado'.")
         print("  - Verifique que el script se está ejecutando desde el directorio 'proyecto_hospital'.")
     finally:
         db.close()
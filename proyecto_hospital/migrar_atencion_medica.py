@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Script para migrar las listas JSON de Episodio a las tablas de atención médica
+(prescripciones, procedimientos, estudios_solicitados, evoluciones_medicas,
+indicaciones_monitoreo).
+
+Es idempotente y se puede correr con la app en servicio: la deduplicación es
+por item legado (su id, o episodio + fecha si no tiene id), así que las filas
+que los endpoints ya insertaron para un episodio no impiden migrar el resto de
+su historial. Las columnas JSON originales no se modifican.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from datetime import datetime
+from sqlalchemy import select, or_
+from app.core.database import engine, SessionLocal, Base
+from app.models import *  # Importar todos los modelos
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+
+def cargar_lista(valor):
+    """Las columnas JSON se guardaron como texto serializado o como lista"""
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            return []
+    return valor if isinstance(valor, list) else []
+
+def parsear_fecha(valor, por_defecto):
+    if isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+
+def filas_prescripciones(episodio, items):
+    for item in items:
+        yield {
+            "id": item.get("id"),
+            "episodio_id": episodio.id,
+            "hospital_id": episodio.hospital_id,
+            "medicamento": item.get("medicamento") or "",
+            "dosis": item.get("dosis") or "",
+            "frecuencia": item.get("frecuencia") or "",
+            "via_administracion": item.get("via_administracion") or "",
+            "duracion": item.get("duracion") or "",
+            "observaciones": item.get("observaciones") or "",
+            "estado": item.get("estado") or "pendiente",
+            "prescrito_por": item.get("prescrito_por"),
+            "fecha_prescripcion": parsear_fecha(item.get("fecha_prescripcion"), episodio.fecha_inicio),
+            "administrado": bool(item.get("administrado", False))
+        }
+
+def filas_procedimientos(episodio, items):
+    for item in items:
+        yield {
+            "id": item.get("id"),
+            "episodio_id": episodio.id,
+            "hospital_id": episodio.hospital_id,
+            "nombre": item.get("nombre") or "",
+            "descripcion": item.get("descripcion") or "",
+            "prioridad": item.get("prioridad") or "normal",
+            "observaciones": item.get("observaciones") or "",
+            "estado": item.get("estado") or "pendiente",
+            "indicado_por": item.get("indicado_por"),
+            "fecha_indicacion": parsear_fecha(item.get("fecha_indicacion"), episodio.fecha_inicio),
+            "completado": bool(item.get("completado", False))
+        }
+
+def filas_estudios(episodio, items):
+    for item in items:
+        yield {
+            "id": item.get("id"),
+            "episodio_id": episodio.id,
+            "hospital_id": episodio.hospital_id,
+            "tipo": item.get("tipo") or "",
+            "nombre": item.get("nombre") or "",
+            "prioridad": item.get("prioridad") or "normal",
+            "observaciones": item.get("observaciones") or "",
+            "estado": item.get("estado") or "pendiente",
+            "solicitado_por": item.get("solicitado_por"),
+            "fecha_solicitud": parsear_fecha(item.get("fecha_solicitud"), episodio.fecha_inicio),
+            "completado": bool(item.get("completado", False))
+        }
+
+def filas_evoluciones(episodio, items):
+    for item in items:
+        yield {
+            "id": item.get("id"),
+            "episodio_id": episodio.id,
+            "hospital_id": episodio.hospital_id,
+            "evolucion": item.get("evolucion") or "",
+            "plan": item.get("plan") or "",
+            "estado_paciente": item.get("estado_paciente") or "estable",
+            "medico": item.get("medico"),
+            "fecha": parsear_fecha(item.get("fecha"), episodio.fecha_inicio)
+        }
+
+def filas_indicaciones(episodio, items):
+    for item in items:
+        yield {
+            "id": item.get("id"),
+            "episodio_id": episodio.id,
+            "hospital_id": episodio.hospital_id,
+            "tipo_control": item.get("tipo_control") or "",
+            "frecuencia_minutos": int(item.get("frecuencia_minutos") or 0),
+            "observaciones": item.get("observaciones") or "",
+            "estado": item.get("estado") or "activa",
+            "indicado_por": item.get("indicado_por"),
+            "fecha_indicacion": parsear_fecha(item.get("fecha_indicacion"), episodio.fecha_inicio)
+        }
+
+# (columna JSON en Episodio, modelo destino, columna de fecha, conversor de filas)
+MIGRACIONES = [
+    ("prescripciones", Prescripcion, "fecha_prescripcion", filas_prescripciones),
+    ("procedimientos", Procedimiento, "fecha_indicacion", filas_procedimientos),
+    ("estudios_solicitados", EstudioSolicitado, "fecha_solicitud", filas_estudios),
+    ("evoluciones_medicas", EvolucionMedica, "fecha", filas_evoluciones),
+    ("indicaciones_monitoreo", IndicacionMonitoreo, "fecha_indicacion", filas_indicaciones),
+]
+
+def ya_migrado(fila, campo_fecha, ids_existentes, fechas_existentes) -> bool:
+    """Un item legado ya está en la tabla si su id existe o, sin id, si hay una fila del episodio con su fecha"""
+    if fila["id"]:
+        return fila["id"] in ids_existentes
+    return (fila["episodio_id"], fila[campo_fecha]) in fechas_existentes
+
+def migrar_atencion_medica():
+    """Copiar los items de las columnas JSON de episodios a sus tablas"""
+    logger.info("🔄 Iniciando migración de atención médica...")
+
+    # Crea las tablas nuevas y sus índices si no existen
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+
+    try:
+        for columna, modelo, campo_fecha, conversor in MIGRACIONES:
+            # Estado previo de la tabla: lo insertado en esta corrida no se compara
+            # (dos items sin id pueden compartir la fecha por defecto del episodio)
+            ids_existentes = set(db.scalars(select(modelo.id)))
+            fechas_existentes = set(db.execute(select(modelo.episodio_id, getattr(modelo, campo_fecha))))
+            columna_json = getattr(Episodio, columna)
+
+            episodios = db.query(
+                Episodio.id, Episodio.hospital_id, Episodio.fecha_inicio, columna_json
+            ).filter(columna_json.isnot(None)).yield_per(TAMANO_LOTE)
+
+            lote = []
+            total = 0
+            for episodio in episodios:
+                for fila in conversor(episodio, cargar_lista(getattr(episodio, columna))):
+                    if ya_migrado(fila, campo_fecha, ids_existentes, fechas_existentes):
+                        continue
+                    # Conservar el id legado (pre_..., evo_...) para deduplicar en la próxima corrida
+                    if fila["id"]:
+                        ids_existentes.add(fila["id"])
+                    else:
+                        fila.pop("id")
+                    lote.append(fila)
+
+                if len(lote) >= TAMANO_LOTE:
+                    db.bulk_insert_mappings(modelo, lote)
+                    total += len(lote)
+                    lote = []
+
+            if lote:
+                db.bulk_insert_mappings(modelo, lote)
+                total += len(lote)
+
+            db.commit()
+            logger.info(f"✅ {total} registros migrados a '{modelo.__tablename__}'")
+
+        logger.info("🎉 Migración de atención médica completada")
+
+    except Exception as e:
+        logger.error(f"❌ Error migrando atención médica: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        migrar_atencion_medica()
+    except Exception as e:
+        logger.error(f"💥 Error durante la migración: {e}")
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
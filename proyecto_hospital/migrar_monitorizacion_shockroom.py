@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script para migrar ShockroomAsignacion.datos_monitorizacion (JSON con una
+entrada por timestamp) a la tabla shockroom_lecturas_vitales.
+
+Es idempotente: las asignaciones que ya tienen lecturas en la tabla se
+omiten. La columna JSON original no se modifica.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from datetime import datetime, timezone
+from sqlalchemy import select
+from app.core.database import engine, SessionLocal, Base
+from app.models import *  # Importar todos los modelos
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 1000
+
+CAMPOS_LECTURA = [
+    "presion_arterial_sistolica", "presion_arterial_diastolica",
+    "frecuencia_cardiaca", "frecuencia_respiratoria",
+    "temperatura", "saturacion_oxigeno", "escala_dolor", "estado_conciencia"
+]
+
+def cargar_lecturas(valor):
+    """La columna se guardó como texto serializado (json.dumps) o como dict"""
+    if not valor:
+        return {}
+    if isinstance(valor, str):
+        try:
+            valor = json.loads(valor)
+        except ValueError:
+            return {}
+    return valor if isinstance(valor, dict) else {}
+
+def parsear_timestamp(valor):
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+def migrar_monitorizacion_shockroom():
+    """Copiar las lecturas JSON de cada asignación a la serie temporal"""
+    logger.info("🔄 Iniciando migración de monitorización del shockroom...")
+
+    # Crea la tabla nueva si no existe
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+
+    try:
+        ya_migradas = set(db.scalars(select(ShockroomLecturaVital.asignacion_id).distinct()))
+
+        asignaciones = db.query(
+            ShockroomAsignacion.id, ShockroomAsignacion.datos_monitorizacion
+        ).filter(ShockroomAsignacion.datos_monitorizacion.isnot(None)).yield_per(TAMANO_LOTE)
+
+        lote = []
+        total = 0
+        for asignacion in asignaciones:
+            if asignacion.id in ya_migradas:
+                continue
+            for clave, datos in cargar_lecturas(asignacion.datos_monitorizacion).items():
+                timestamp = parsear_timestamp(clave)
+                if timestamp is None or not isinstance(datos, dict):
+                    logger.warning(f"⚠️ Lectura inválida '{clave}' en asignación {asignacion.id}, omitida")
+                    continue
+                lote.append({
+                    "asignacion_id": asignacion.id,
+                    "timestamp": timestamp,
+                    **{campo: datos.get(campo) for campo in CAMPOS_LECTURA}
+                })
+
+            if len(lote) >= TAMANO_LOTE:
+                db.bulk_insert_mappings(ShockroomLecturaVital, lote)
+                total += len(lote)
+                lote = []
+
+        if lote:
+            db.bulk_insert_mappings(ShockroomLecturaVital, lote)
+            total += len(lote)
+
+        db.commit()
+        logger.info(f"✅ {total} lecturas migradas a 'shockroom_lecturas_vitales'")
+        logger.info("🎉 Migración de monitorización completada")
+
+    except Exception as e:
+        logger.error(f"❌ Error migrando monitorización: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    try:
+        migrar_monitorizacion_shockroom()
+    except Exception as e:
+        logger.error(f"💥 Error durante la migración: {e}")
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script para verificar que las consultas de estadísticas son válidas en PostgreSQL.
+
+SQLite acepta columnas sueltas junto a agregados sin GROUP BY; PostgreSQL las
+rechaza ("must appear in the GROUP BY clause"). Este script compila las
+consultas de tiempos de códigos de emergencia con el dialecto de PostgreSQL y
+controla que, sin GROUP BY, solo se seleccionen agregados. Si DATABASE_URL
+apunta a PostgreSQL además las ejecuta con EXPLAIN contra esa base.
+
+    python verificar_sql_postgresql.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.core.database import engine
+from app.api.v1.codigos_emergencia import _consulta_tiempos
+from app.models.codigo_emergencia import CodigoEmergencia
+
+AGREGADOS = {"count", "avg", "min", "max", "sum"}
+
+def es_agregado(columna) -> bool:
+    elemento = getattr(columna, "element", columna)  # Label -> expresión
+    return isinstance(elemento, FunctionElement) and elemento.name in AGREGADOS
+
+def consultas():
+    filtros = [
+        CodigoEmergencia.hospital_id == "verificacion",
+        CodigoEmergencia.fecha_activacion >= datetime.utcnow() - timedelta(days=30)
+    ]
+    for columna in (CodigoEmergencia.segundos_primera_respuesta, CodigoEmergencia.segundos_hasta_cierre):
+        yield f"{columna.key} total", _consulta_tiempos(filtros, columna)
+        yield f"{columna.key} por tipo", _consulta_tiempos(filtros, columna, CodigoEmergencia.tipo_codigo)
+
+def main() -> int:
+    errores = 0
+    en_postgresql = engine.dialect.name == "postgresql"
+
+    for nombre, query in consultas():
+        sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        sueltas = [] if query._group_by_clauses else [
+            columna.key for columna in query.selected_columns if not es_agregado(columna)
+        ]
+        if sueltas:
+            print(f"❌ {nombre}: columnas sin GROUP BY {sueltas}\n{sql}")
+            errores += 1
+            continue
+
+        if en_postgresql:
+            try:
+                with engine.connect() as conexion:
+                    conexion.execute(text(f"EXPLAIN {sql}"))
+            except Exception as e:
+                print(f"❌ {nombre}: PostgreSQL rechazó la consulta: {e}")
+                errores += 1
+                continue
+        print(f"✅ {nombre}")
+
+    if not en_postgresql:
+        print("ℹ️ DATABASE_URL no es PostgreSQL: solo se verificó la compilación con su dialecto")
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
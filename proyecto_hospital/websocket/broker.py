@@ -0,0 +1,120 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import json
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+# Un "sobre" describe un broadcast ya serializado:
+# {"destino": "area" | "role" | "role_area" | "user" | "all", "valor": ..., "texto": "<json>"}
+Entrega = Callable[[dict], Awaitable[int]]
+
+class BrokerLocal:
+    """Entrega en el mismo proceso (un solo worker de uvicorn)"""
+
+    def __init__(self, entregar: Entrega):
+        self.entregar = entregar
+
+    async def iniciar(self):
+        pass
+
+    async def detener(self):
+        pass
+
+    async def publicar(self, sobre: dict):
+        await self.entregar(sobre)
+
+class _ProtocoloBroker(asyncio.DatagramProtocol):
+    def __init__(self, broker: "BrokerUnix"):
+        self.broker = broker
+
+    def datagram_received(self, data: bytes, addr):
+        try:
+            sobre = json.loads(data)
+        except ValueError:
+            logger.warning("⚠️ Mensaje de broker inválido descartado")
+            return
+        asyncio.create_task(self.broker.entregar(sobre))
+
+    def error_received(self, exc):
+        logger.error(f"❌ Error en socket del broker: {exc}")
+
+class BrokerUnix:
+    """Entrega entre workers del mismo host mediante sockets Unix de datagramas.
+
+    Cada worker escucha en <directorio>/worker-<pid>.sock. Publicar entrega
+    localmente y envía un datagrama a cada otro socket del directorio; los
+    sockets de workers muertos se eliminan al fallar el envío.
+    """
+
+    def __init__(self, entregar: Entrega, directorio: str):
+        self.entregar = entregar
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, f"worker-{os.getpid()}.sock")
+        self._transporte: Optional[asyncio.DatagramTransport] = None
+        self._envio: Optional[socket.socket] = None
+
+    async def iniciar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        if os.path.exists(self.ruta):
+            os.unlink(self.ruta)
+
+        loop = asyncio.get_running_loop()
+        self._transporte, _ = await loop.create_datagram_endpoint(
+            lambda: _ProtocoloBroker(self),
+            local_addr=self.ruta,
+            family=socket.AF_UNIX
+        )
+        self._envio = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._envio.setblocking(False)
+        logger.info(f"📮 Broker unix escuchando en {self.ruta}")
+
+    async def detener(self):
+        if self._transporte:
+            self._transporte.close()
+            self._transporte = None
+        if self._envio:
+            self._envio.close()
+            self._envio = None
+        if os.path.exists(self.ruta):
+            os.unlink(self.ruta)
+
+    def _pares(self):
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directorio, nombre)
+            for nombre in nombres
+            if nombre.endswith(".sock") and os.path.join(self.directorio, nombre) != self.ruta
+        ]
+
+    async def publicar(self, sobre: dict):
+        if self._envio is not None:
+            datos = json.dumps(sobre, ensure_ascii=False).encode("utf-8")
+            for ruta in self._pares():
+                try:
+                    self._envio.sendto(datos, ruta)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker terminado sin limpiar su socket
+                    try:
+                        os.unlink(ruta)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    logger.warning(f"⚠️ Buffer lleno hacia {ruta}, broadcast descartado para ese worker")
+                except OSError as e:
+                    logger.error(f"❌ Error publicando en {ruta}: {e}")
+
+        await self.entregar(sobre)
+
+def crear_broker(tipo: str, entregar: Entrega, directorio: str):
+    """Construir el backend configurado en WS_BROKER"""
+    if tipo == "unix":
+        return BrokerUnix(entregar, directorio)
+    if tipo != "local":
+        logger.warning(f"⚠️ Broker '{tipo}' desconocido, usando 'local'")
+    return BrokerLocal(entregar)
@@ -1,104 +1,303 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import asyncio
 import json
 import logging
 from datetime import datetime
 
+from app.core.config import settings
+from websocket.broker import crear_broker
+
 logger = logging.getLogger(__name__)
 
+def serializar_mensaje(message: dict) -> str:
+    """Serializar una sola vez el mensaje (con timestamp) para todos los destinatarios"""
+    return json.dumps(
+        {**message, "timestamp": datetime.now().isoformat()},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+
+class ConexionCliente:
+    """Un socket con su cola de salida acotada y su tarea escritora.
+
+    Los broadcasts solo encolan el texto ya serializado; la tarea escritora
+    envía en orden. Si el cliente no consume, la cola se llena y se descarta
+    el mensaje más antiguo; tras demasiados descartes seguidos se cierra la
+    conexión para que el cliente se reconecte y recargue su estado.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, role: str, area: str, hospital_id: Optional[str] = None):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.role = role
+        self.area = area
+        self.hospital_id = hospital_id
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_COLA_MAXIMA)
+        self.descartes_consecutivos = 0
+        self.descartes_totales = 0
+        self.activa = True
+        self.tarea: Optional[asyncio.Task] = None
+
+    def encolar(self, texto: str) -> bool:
+        """Encolar sin bloquear; devuelve False si el cliente debe desconectarse"""
+        if not self.activa:
+            return False
+        try:
+            self.cola.put_nowait(texto)
+            self.descartes_consecutivos = 0
+            return True
+        except asyncio.QueueFull:
+            # Política de consumidor lento: descartar el más antiguo
+            self.cola.get_nowait()
+            self.cola.put_nowait(texto)
+            self.descartes_consecutivos += 1
+            self.descartes_totales += 1
+            return self.descartes_consecutivos < settings.WS_MAX_DESCARTES
+
+    def salas(self):
+        """Salas a las que pertenece la conexión.
+
+        Cada clave existe con el hospital de la conexión y con None (todos los
+        hospitales), de modo que cualquier broadcast se resuelve con un solo
+        acceso al diccionario de salas.
+        """
+        for hospital_id in (self.hospital_id, None):
+            yield ("all", hospital_id)
+            yield ("area", hospital_id, self.area)
+            yield ("role", hospital_id, self.role)
+            yield ("role_area", hospital_id, self.role, self.area)
+
 class ConnectionManager:
     def __init__(self):
         # Conexiones por usuario
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-        # Usuarios por rol (para broadcast por rol)
-        self.users_by_role: Dict[str, Set[str]] = {
-            "medico": set(),
-            "enfermera": set(),
-            "admin": set()
-        }
-        # Usuarios por área/sala
-        self.users_by_area: Dict[str, Set[str]] = {}
-    
-    async def connect(self, websocket: WebSocket, user_id: str, role: str, area: str):
+        self.active_connections: Dict[str, List[ConexionCliente]] = {}
+        # Salas precalculadas: ("area", hospital_id, area), ("role", hospital_id, role),
+        # ("role_area", hospital_id, role, area), ("all", hospital_id) -> conexiones
+        self.salas: Dict[tuple, Set[ConexionCliente]] = {}
+        # Contadores para estadísticas
+        self.mensajes_descartados = 0
+        self.desconexiones_lentas = 0
+        # Cierres en curso: el event loop solo guarda referencias débiles a las tareas
+        self._cierres: Set[asyncio.Task] = set()
+        # Suscriptores de eventos de dominio en este worker (p. ej. la cola de triaje)
+        self.suscriptores: List[Callable[[dict], None]] = []
+        # Transporte de broadcasts entre workers (local o socket unix)
+        self.broker = crear_broker(settings.WS_BROKER, self._entregar, settings.WS_BROKER_DIR)
+
+    async def connect(self, websocket: WebSocket, user_id: str, role: str, area: str, hospital_id: Optional[str] = None):
         await websocket.accept()
-        
-        # Agregar conexión
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
-        
-        # Registrar en grupos
-        self.users_by_role[role].add(user_id)
-        if area not in self.users_by_area:
-            self.users_by_area[area] = set()
-        self.users_by_area[area].add(user_id)
-        
-        logger.info(f"✅ Usuario {user_id} ({role}) conectado al área {area}")
+
+        # Agregar conexión con su tarea escritora
+        cliente = ConexionCliente(websocket, user_id, role, area, hospital_id)
+        cliente.tarea = asyncio.create_task(self._escritor(cliente))
+        self.active_connections.setdefault(user_id, []).append(cliente)
+
+        # Registrar en sus salas
+        for sala in cliente.salas():
+            self.salas.setdefault(sala, set()).add(cliente)
+
+        logger.info(f"✅ Usuario {user_id} ({role}) conectado al área {area} del hospital {hospital_id}")
         logger.info(f"📊 Conexiones activas: {len(self.active_connections)}")
-    
+
     async def disconnect(self, websocket: WebSocket, user_id: str, role: str, area: str):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-                self.users_by_role[role].discard(user_id)
-                if area in self.users_by_area:
-                    self.users_by_area[area].discard(user_id)
-        
+        for cliente in list(self.active_connections.get(user_id, [])):
+            if cliente.websocket is websocket:
+                self._quitar(cliente)
+
         logger.info(f"❌ Usuario {user_id} ({role}) desconectado del área {area}")
         logger.info(f"📊 Conexiones activas: {len(self.active_connections)}")
-    
-    # Enviar a un usuario específico
-    async def send_to_user(self, user_id: str, message: dict):
-        if user_id in self.active_connections:
-            message_with_timestamp = {
-                **message,
-                "timestamp": datetime.now().isoformat()
-            }
-            for connection in self.active_connections[user_id]:
+
+    def _quitar(self, cliente: ConexionCliente):
+        """Sacar la conexión de los índices y detener su escritor.
+
+        Es el único punto de salida de una conexión (desconexión normal, error
+        de envío, cliente lento o apagado): acá sus descartes pasan al total.
+        """
+        cliente.activa = False
+        conexiones = self.active_connections.get(cliente.user_id)
+        if conexiones and cliente in conexiones:
+            conexiones.remove(cliente)
+            self.mensajes_descartados += cliente.descartes_totales
+            if not conexiones:
+                del self.active_connections[cliente.user_id]
+
+            for sala in cliente.salas():
+                miembros = self.salas.get(sala)
+                if miembros is not None:
+                    miembros.discard(cliente)
+                    if not miembros:
+                        del self.salas[sala]
+
+        if cliente.tarea and cliente.tarea is not asyncio.current_task():
+            cliente.tarea.cancel()
+
+    async def _escritor(self, cliente: ConexionCliente):
+        """Enviar en orden los mensajes encolados para un socket"""
+        try:
+            while True:
+                texto = await cliente.cola.get()
+                await asyncio.wait_for(
+                    cliente.websocket.send_text(texto),
+                    timeout=settings.WS_TIMEOUT_ENVIO
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket caído o bloqueado: eliminarlo para no volver a intentarlo
+            logger.warning(f"⚠️ Eliminando conexión de {cliente.user_id}: {e!r}")
+            self._quitar(cliente)
+            await self._cerrar(cliente)
+
+    async def _cerrar(self, cliente: ConexionCliente, code: int = 1011):
+        try:
+            await cliente.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _encolar(self, cliente: ConexionCliente, texto: str):
+        if cliente.encolar(texto):
+            return
+        # Consumidor lento: se cierra para que se reconecte con estado fresco
+        self.desconexiones_lentas += 1
+        logger.warning(f"🐢 Cliente lento {cliente.user_id}: desconectado tras {cliente.descartes_consecutivos} descartes")
+        self._quitar(cliente)
+        tarea = asyncio.create_task(self._cerrar(cliente, code=1013))
+        self._cierres.add(tarea)
+        tarea.add_done_callback(self._cierres.discard)
+
+    async def _enviar_texto(self, conexiones: Iterable[ConexionCliente], texto: str) -> int:
+        """Encolar un mensaje ya serializado para un conjunto de conexiones"""
+        enviados = 0
+        for cliente in list(conexiones):
+            self._encolar(cliente, texto)
+            enviados += 1
+        # Ceder el loop para que los escritores drenen ante ráfagas de broadcasts
+        await asyncio.sleep(0)
+        return enviados
+
+    def _destinatarios(self, sobre: dict) -> Iterable[ConexionCliente]:
+        """Conexiones locales de este worker para un destino de broadcast"""
+        destino = sobre["destino"]
+        hospital_id = sobre.get("hospital_id")
+        valor = sobre.get("valor")
+
+        if destino == "user":
+            return [
+                cliente for cliente in self.active_connections.get(valor, ())
+                if hospital_id is None or cliente.hospital_id == hospital_id
+            ]
+        if destino == "role_area":
+            return self.salas.get(("role_area", hospital_id, *valor), ())
+        if destino in ("area", "role"):
+            return self.salas.get((destino, hospital_id, valor), ())
+        return self.salas.get(("all", hospital_id), ())
+
+    async def _entregar(self, sobre: dict) -> int:
+        """Entregar a las conexiones locales un broadcast recibido del broker"""
+        evento = sobre.get("evento")
+        if evento is not None:
+            for suscriptor in self.suscriptores:
                 try:
-                    await connection.send_json(message_with_timestamp)
-                    logger.debug(f"📤 Mensaje enviado a usuario {user_id}")
+                    suscriptor(evento)
                 except Exception as e:
-                    logger.error(f"❌ Error enviando mensaje a {user_id}: {e}")
-    
+                    logger.error(f"❌ Error en suscriptor de eventos: {e}")
+        enviados = await self._enviar_texto(self._destinatarios(sobre), sobre["texto"])
+        logger.debug(f"📬 Broadcast {sobre['destino']}={sobre.get('valor')} entregado a {enviados} conexiones locales")
+        return enviados
+
+    async def _publicar(self, destino: str, valor, message: dict, hospital_id: Optional[str] = None, evento: Optional[dict] = None):
+        """Publicar en el broker para que cada worker entregue a sus conexiones"""
+        sobre = {
+            "destino": destino,
+            "hospital_id": hospital_id,
+            "valor": valor,
+            "texto": serializar_mensaje(message)
+        }
+        if evento is not None:
+            sobre["evento"] = evento
+        await self.broker.publicar(sobre)
+
+    def suscribir(self, suscriptor: Callable[[dict], None]):
+        """Registrar un callback síncrono para los eventos de dominio de todos los workers"""
+        self.suscriptores.append(suscriptor)
+
+    async def publicar_evento(self, hospital_id: str, evento: dict, area: str = "emergencia"):
+        """Emitir un evento de dominio al área del hospital y a los suscriptores"""
+        await self._publicar("area", area, {"type": "domain_event", "data": evento}, hospital_id, evento)
+
+    async def publicar_evento_usuario(self, user_id: str, hospital_id: str, evento: dict):
+        """Emitir un evento de dominio solo a las conexiones del usuario (y a los suscriptores de todos los workers)"""
+        await self._publicar("user", user_id, {"type": "domain_event", "data": evento}, hospital_id, evento)
+
+    async def iniciar(self):
+        await self.broker.iniciar()
+
+    async def detener(self):
+        await self.close_all()
+        await self.broker.detener()
+
+    # Enviar solo a las conexiones de este worker (respuestas del propio socket)
+    async def send_local(self, user_id: str, message: dict):
+        if user_id in self.active_connections:
+            await self._enviar_texto(self.active_connections[user_id], serializar_mensaje(message))
+
+    # Enviar a un usuario específico
+    async def send_to_user(self, user_id: str, message: dict):
+        await self._publicar("user", user_id, message)
+        logger.debug(f"📤 Mensaje publicado para usuario {user_id}")
+
     # Broadcast a todos los médicos en un área
-    async def broadcast_to_doctors_in_area(self, area: str, message: dict):
-        if area in self.users_by_area:
-            doctors_in_area = self.users_by_role["medico"] & self.users_by_area[area]
-            for doctor_id in doctors_in_area:
-                await self.send_to_user(doctor_id, message)
-            logger.info(f"📡 Broadcast a {len(doctors_in_area)} médicos en área {area}")
-    
+    async def broadcast_to_doctors_in_area(self, area: str, message: dict, hospital_id: Optional[str] = None):
+        await self._publicar("role_area", ["medico", area], message, hospital_id)
+        logger.info(f"📡 Broadcast a médicos en área {area} (hospital {hospital_id or 'todos'})")
+
     # Broadcast a todas las enfermeras
-    async def broadcast_to_nurses(self, message: dict):
-        for nurse_id in self.users_by_role["enfermera"]:
-            await self.send_to_user(nurse_id, message)
-        logger.info(f"📡 Broadcast a {len(self.users_by_role['enfermera'])} enfermeras")
-    
+    async def broadcast_to_nurses(self, message: dict, hospital_id: Optional[str] = None):
+        await self._publicar("role", "enfermera", message, hospital_id)
+        logger.info(f"📡 Broadcast a enfermeras (hospital {hospital_id or 'todos'})")
+
     # Broadcast a todos en un área (médicos + enfermeras)
-    async def broadcast_to_area(self, area: str, message: dict):
-        if area in self.users_by_area:
-            for user_id in self.users_by_area[area]:
-                await self.send_to_user(user_id, message)
-            logger.info(f"📡 Broadcast a {len(self.users_by_area[area])} usuarios en área {area}")
-    
-    # Broadcast a todos los usuarios conectados
-    async def broadcast_all(self, message: dict):
-        total_sent = 0
-        for user_id in self.active_connections:
-            await self.send_to_user(user_id, message)
-            total_sent += 1
-        logger.info(f"📡 Broadcast global a {total_sent} usuarios")
-    
+    async def broadcast_to_area(self, area: str, message: dict, hospital_id: Optional[str] = None):
+        await self._publicar("area", area, message, hospital_id)
+        logger.info(f"📡 Broadcast a usuarios en área {area} (hospital {hospital_id or 'todos'})")
+
+    # Broadcast a todos los usuarios conectados (de un hospital o de todos)
+    async def broadcast_all(self, message: dict, hospital_id: Optional[str] = None):
+        await self._publicar("all", None, message, hospital_id)
+        logger.info(f"📡 Broadcast global (hospital {hospital_id or 'todos'})")
+
+    async def close_all(self):
+        """Cerrar todas las conexiones en paralelo (apagado del servidor)"""
+        clientes = [cliente for conexiones in self.active_connections.values() for cliente in conexiones]
+        for cliente in clientes:
+            self._quitar(cliente)
+        await asyncio.gather(
+            *(self._cerrar(cliente, code=1001) for cliente in clientes),
+            return_exceptions=True
+        )
+
     # Obtener estadísticas de conexiones
-    def get_connection_stats(self):
+    def get_connection_stats(self, hospital_id: Optional[str] = None):
+        conexiones = self.salas.get(("all", hospital_id), set())
         return {
-            "total_users": len(self.active_connections),
-            "users_by_role": {role: len(users) for role, users in self.users_by_role.items()},
-            "users_by_area": {area: len(users) for area, users in self.users_by_area.items()},
+            "total_users": len({cliente.user_id for cliente in conexiones}),
+            "total_connections": len(conexiones),
+            "users_by_role": {
+                sala[2]: len(miembros) for sala, miembros in self.salas.items()
+                if sala[0] == "role" and sala[1] == hospital_id
+            },
+            "users_by_area": {
+                sala[2]: len(miembros) for sala, miembros in self.salas.items()
+                if sala[0] == "area" and sala[1] == hospital_id
+            },
+            "queued_messages": sum(cliente.cola.qsize() for cliente in conexiones),
+            "dropped_messages": self.mensajes_descartados + sum(cliente.descartes_totales for cliente in conexiones),
+            "slow_disconnects": self.desconexiones_lentas,
+            "broker": type(self.broker).__name__,
             "timestamp": datetime.now().isoformat()
         }
 
 # Instancia global del manager
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()